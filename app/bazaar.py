@@ -3,22 +3,28 @@ from datetime import datetime
 from pathlib import Path
 import requests
 
+from app.profiler import span
+
 class Bazaar:
     BAZAAR_URL = "https://api.hypixel.net/v2/skyblock/bazaar"
     ITEMS_URL  = "https://api.hypixel.net/resources/skyblock/items"
 
     def fetch_bazaar(self) -> dict:
-        r = requests.get(self.BAZAAR_URL, timeout=15)
-        r.raise_for_status()
-        data = r.json()
+        with span("scan.fetch"):
+            r = requests.get(self.BAZAAR_URL, timeout=15)
+            r.raise_for_status()
+        with span("scan.parse"):
+            data = r.json()
         if not data.get("success"):
             raise RuntimeError("Bazaar API 'success' false")
         return data.get("products", {})
 
     def fetch_items_meta(self) -> dict:
-        r = requests.get(self.ITEMS_URL, timeout=15)
-        r.raise_for_status()
-        data = r.json()
+        with span("scan.fetch_meta"):
+            r = requests.get(self.ITEMS_URL, timeout=15)
+            r.raise_for_status()
+        with span("scan.parse_meta"):
+            data = r.json()
         out = {}
         for it in data.get("items", []):
             item_id = it.get("id")
@@ -38,6 +44,10 @@ class Bazaar:
         products = self.fetch_bazaar()
         meta = self.fetch_items_meta()
 
+        with span("scan.analyze"):
+            return self._build_rows(products, meta, ts, iso)
+
+    def _build_rows(self, products: dict, meta: dict, ts: int, iso: str) -> list[dict]:
         rows = []
         for item_id, body in products.items():
             buy_summary = body.get("buy_summary") or []
@@ -0,0 +1,230 @@
+"""
+Uygulama ayarları (app/data/config.json) için önbellekli, değişiklik bildirimli servis.
+
+- Dosya bir kez okunur; get()/interval() bellekteki kopyadan döner (tık başına I/O yok).
+- Arka plan thread'i dosyayı izler: Linux'ta inotify (ctypes, ek bağımlılık yok),
+  diğer platformlarda mtime yoklaması. İçerik değişince aboneler yeni config ile çağrılır.
+- Yol bu dosyanın konumundan türetilir (çalışma dizininden bağımsız);
+  fastsell.interval varsayılanı tek yerde: 0.3. fastsell.adaptive (varsayılan kapalı) /
+  min_interval / max_interval uyarlanır tıklama temposunun (app.services.pacing) ayarlarıdır;
+  buy.max_orders / window_seconds buy order hız limitidir (app.services.scheduler).
+
+Abone geri çağrıları izleyici thread'inden gelir; Qt tarafı bir sinyal köprüsüyle
+UI thread'ine taşımalıdır.
+"""
+from __future__ import annotations
+
+import copy
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+CONFIG_PATH = Path(__file__).resolve().parent / "data" / "config.json"
+DEFAULT_INTERVAL = 0.3
+DEFAULT_MIN_INTERVAL = 0.05
+DEFAULT_MAX_INTERVAL = 1.0
+DEFAULT_BUY_ORDERS = 5
+DEFAULT_BUY_WINDOW = 65.0
+DEFAULTS = {"fastsell": {"interval": DEFAULT_INTERVAL, "adaptive": False,
+                         "min_interval": DEFAULT_MIN_INTERVAL, "max_interval": DEFAULT_MAX_INTERVAL},
+            "buy": {"max_orders": DEFAULT_BUY_ORDERS, "window_seconds": DEFAULT_BUY_WINDOW}}
+
+# inotify sabitleri (linux/inotify.h)
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_EVENT = struct.Struct("iIII")
+
+
+def _inotify(directory: Path):
+    """(libc, fd) ya da inotify yoksa None."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+        if libc.inotify_add_watch(fd, str(directory).encode(), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except Exception:
+        return None
+
+
+class ConfigService:
+    def __init__(self, path: Path = CONFIG_PATH, poll: float = 1.0):
+        self.path = Path(path)
+        self.poll = float(poll)
+        self._lock = threading.Lock()
+        self._cfg: dict = copy.deepcopy(DEFAULTS)
+        self._stamp = None
+        self._subs: list[Callable[[dict], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.reloads = 0
+        self.reload()
+
+    # ---------- okuma ----------
+    def _read(self) -> Optional[dict]:
+        try:
+            cfg = json.loads(self.path.read_text(encoding="utf-8"))
+            return cfg if isinstance(cfg, dict) else None
+        except FileNotFoundError:
+            return copy.deepcopy(DEFAULTS)
+        except Exception:
+            return None   # yarım yazılmış / bozuk dosya → eski değer kalır
+
+    def _file_stamp(self):
+        try:
+            st = self.path.stat()
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def reload(self) -> bool:
+        """Dosya değiştiyse yeniden okur; içerik farklıysa abonelere bildirir."""
+        stamp = self._file_stamp()
+        if stamp == self._stamp and self.reloads:
+            return False
+        cfg = self._read()
+        if cfg is None:
+            return False
+        with self._lock:
+            self._stamp = stamp
+            self.reloads += 1
+            if cfg == self._cfg:
+                return False
+            self._cfg = cfg
+            subs = list(self._subs)
+        self._notify(subs, cfg)
+        return True
+
+    def _notify(self, subs, cfg: dict):
+        for cb in subs:
+            try:
+                cb(copy.deepcopy(cfg))
+            except Exception:
+                pass
+
+    def get(self) -> dict:
+        with self._lock:
+            return copy.deepcopy(self._cfg)
+
+    def _snapshot(self) -> dict:
+        """Güncel config'e referans (reload sözlüğü değiştirmez, yenisini atar; kopya gerekmez)."""
+        with self._lock:
+            return self._cfg
+
+    @staticmethod
+    def _interval_of(cfg: dict) -> float:
+        try:
+            val = float((cfg.get("fastsell") or {}).get("interval", DEFAULT_INTERVAL))
+        except (TypeError, ValueError):
+            return DEFAULT_INTERVAL
+        return max(0.0, val)
+
+    def interval(self) -> float:
+        """fastsell.interval (saniye, >= 0); yoksa/hatalıysa 0.3."""
+        return self._interval_of(self._snapshot())
+
+    def pacing(self) -> tuple[bool, float, float]:
+        """(adaptive, min_interval, max_interval) — uyarlanır tempo ayarları.
+        max_interval en az interval kadardır (sabit tempodan yavaş kalmasın diye)."""
+        cfg = self._snapshot()
+        sec = cfg.get("fastsell") or {}
+        interval = self._interval_of(cfg)
+        try:
+            lo = max(0.0, float(sec.get("min_interval", DEFAULT_MIN_INTERVAL)))
+            hi = max(lo, float(sec.get("max_interval", DEFAULT_MAX_INTERVAL)), interval)
+        except (TypeError, ValueError):
+            lo, hi = DEFAULT_MIN_INTERVAL, max(DEFAULT_MAX_INTERVAL, interval)
+        return bool(sec.get("adaptive", False)), lo, hi
+
+    def buy_limits(self) -> tuple[float, float]:
+        """(max_orders, window_seconds) — son buy.window_seconds saniyede en fazla buy.max_orders order."""
+        sec = self._snapshot().get("buy") or {}
+        try:
+            n = max(1.0, float(sec.get("max_orders", DEFAULT_BUY_ORDERS)))
+            window = max(1.0, float(sec.get("window_seconds", DEFAULT_BUY_WINDOW)))
+        except (TypeError, ValueError):
+            n, window = DEFAULT_BUY_ORDERS, DEFAULT_BUY_WINDOW
+        return n, window
+
+    # ---------- yazma ----------
+    def save(self, cfg: dict) -> bool:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(json.dumps(cfg, indent=2), encoding="utf-8")
+            tmp.replace(self.path)
+        except Exception:
+            return False
+        self.reload()
+        return True
+
+    # ---------- abonelik ----------
+    def subscribe(self, cb: Callable[[dict], None]) -> Callable[[], None]:
+        """cb(config) her değişiklikte (izleyici thread'inden) çağrılır. Dönüş: abonelikten çık."""
+        with self._lock:
+            self._subs.append(cb)
+        self.start()
+
+        def _unsubscribe():
+            with self._lock:
+                if cb in self._subs:
+                    self._subs.remove(cb)
+        return _unsubscribe
+
+    # ---------- izleme ----------
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="config-watch", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        fd = _inotify(self.path.parent)
+        if fd is None:
+            while not self._stop.wait(self.poll):
+                self.reload()
+            return
+        name = self.path.name.encode()
+        try:
+            while not self._stop.is_set():
+                r, _, _ = select.select([fd], [], [], self.poll)
+                if not r:
+                    continue
+                try:
+                    buf = os.read(fd, 4096)
+                except BlockingIOError:
+                    continue
+                hit, off = False, 0
+                while off + _EVENT.size <= len(buf):
+                    _, _, _, ln = _EVENT.unpack_from(buf, off)
+                    ev_name = buf[off + _EVENT.size:off + _EVENT.size + ln].rstrip(b"\0")
+                    hit = hit or ev_name == name
+                    off += _EVENT.size + ln
+                if hit:
+                    self.reload()
+        finally:
+            os.close(fd)
+
+
+CONFIG = ConfigService()
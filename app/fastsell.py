@@ -1,34 +1,68 @@
 # fast.py
-# JITTER YOK — Bekleme süresi sadece data/config.json → fastsell.interval'dan okunur.
-# Kullanıcı config.json'ı manuel değiştirdiğinde, worker her adımda dosyayı yeniden okuyup uygular.
+# JITTER YOK — Bekleme süresi sadece app/data/config.json → fastsell.interval'dan okunur.
+# Kullanıcı config.json'ı değiştirdiğinde ConfigService worker'a bildirir; tık başına dosya okunmaz.
+# Tıklamadan önce envanter bir kez yakalanır; boş slotlar (düz renk) atlanır.
+# fastsell.adaptive açıksa (varsayılan kapalı) interval başlangıç değeridir: imleç slota
+# götürülüp hover durulduktan sonra tıklanır, slotun boşalması beklenir ve bekleme AIMD
+# ile [min_interval, max_interval] içinde uyarlanır.
 
 import json
 import time
 from pathlib import Path
 from PySide6.QtCore import QObject, Signal, Slot
 
-CONFIG_PATH = Path("data/config.json")
+from app.config import CONFIG
+from app.profiler import span
+from app.services.input_driver import get_input
+from app.services.capture import get_capture
+from app.services.pacing import make_pacer
+
+try:
+    import cv2        # type: ignore
+    import numpy as np
+except Exception:
+    cv2 = None        # type: ignore
+    np = None         # type: ignore
+
 COORDS_PATH_DEFAULT = "data/coordinates.json"
 
-def _safe_read_interval() -> float:
-    """
-    data/config.json içinden fastsell.interval'ı güvenle okur.
-    Bulunamazsa veya hatalıysa 0.0 döner (bekleme yok).
-    {
-      "fastsell": { "interval": 0.3 }
-    }
-    """
+def _slot_half(points: list[tuple[int, int]]) -> int:
+    """Slot iç bölgesinin yarı boyu: en yakın komşu uzaklıklarının medyanının ~%30'u."""
+    if np is None or len(points) < 2:
+        return 8
+    pts = np.array(points, dtype=np.float32)
+    d = np.sqrt(((pts[:, None, :] - pts[None, :, :]) ** 2).sum(-1))
+    np.fill_diagonal(d, np.inf)
+    return max(4, int(np.median(d.min(1)) * 0.3))
+
+
+def _cell_empty(frame, min_std: float = 4.0) -> bool:
+    """Slot iç bölgesi düz renk mi (item yok)."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return float(gray.std()) < min_std
+
+
+def _occupied_slots(points: list[tuple[int, int]], min_std: float = 4.0) -> list[bool]:
+    """Slot merkezlerini kapsayan bölgeyi tek seferde yakalar; her slotun iç
+    kısmındaki gri std-sapma min_std'nin altındaysa slot boştur (düz zemin).
+    Yakalama yapılamazsa hepsi dolu sayılır (eski davranış: hepsine tıkla)."""
+    if cv2 is None or len(points) < 2:
+        return [True] * len(points)
+    pts = np.array(points, dtype=np.float32)
+    half = _slot_half(points)
+    x0, y0 = (pts.min(0) - half).astype(int)
+    x1, y1 = (pts.max(0) + half + 1).astype(int)
     try:
-        if not CONFIG_PATH.exists():
-            return 0.0
-        cfg = json.loads(CONFIG_PATH.read_text(encoding="utf-8"))
-        fs = cfg.get("fastsell", {}) or {}
-        val = float(fs.get("interval", 0.0) or 0.0)
-        if val < 0:
-            val = 0.0
-        return val
+        frame = get_capture().grab((int(x0), int(y0), int(x1 - x0), int(y1 - y0)))
     except Exception:
-        return 0.0
+        return [True] * len(points)
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    out = []
+    for x, y in points:
+        cx, cy = x - x0, y - y0
+        cell = gray[cy - half:cy + half + 1, cx - half:cx + half + 1]
+        out.append(bool(cell.size == 0 or float(cell.std()) >= min_std))
+    return out
 
 
 class FastSellWorker(QObject):
@@ -36,19 +70,33 @@ class FastSellWorker(QObject):
     progress = Signal(str)
     finished = Signal(bool)
 
-    def __init__(self, coords_path: str = COORDS_PATH_DEFAULT):
+    def __init__(self, coords_path: str = COORDS_PATH_DEFAULT, skip_empty: bool = True, empty_std: float = 4.0,
+                 should_stop=None):
         super().__init__()
         self.coords_path = coords_path
+        # dışarıdan durdurma (örn. collect servisinin stop olayı): slot sınırında bakılır
+        self.should_stop = should_stop
+        self.skip_empty = bool(skip_empty)
+        self.empty_std = float(empty_std)
         self._abort = False
+        self._interval = CONFIG.interval()
+        self._pacer = None
+
+    def _on_config(self, cfg: dict):
+        self._interval = CONFIG.interval()
+        pacer = self._pacer
+        if pacer is not None:
+            _, lo, hi = CONFIG.pacing()
+            pacer.set_bounds(lo, hi)
 
     @Slot()
     def run(self):
         self.started.emit()
+        unsubscribe = CONFIG.subscribe(self._on_config)
         try:
-            try:
-                import pyautogui  # type: ignore
-            except Exception as e:
-                self.progress.emit(f"pyautogui gerekli: {e}")
+            driver = get_input()
+            if driver is None:
+                self.progress.emit("pyautogui gerekli: girdi sürücüsü oluşturulamadı")
                 self.finished.emit(False)
                 return
 
@@ -70,37 +118,85 @@ class FastSellWorker(QObject):
                 self.finished.emit(False)
                 return
 
-            count = 0
+            points = []
             for item in data:
-                if self._abort:
+                try:
+                    points.append((int(item.get("x")), int(item.get("y"))))
+                except Exception:
+                    continue
+
+            # Ön geçiş: envanteri bir kez yakala, sadece dolu slotlara tıkla
+            if self.skip_empty:
+                with span("fastsell.scan"):
+                    occupied = _occupied_slots(points, self.empty_std)
+                skipped = len(points) - sum(occupied)
+                points = [p for p, occ in zip(points, occupied) if occ]
+                if skipped:
+                    self.progress.emit(f"{skipped} boş slot atlandı, {len(points)} dolu slot tıklanacak.")
+
+            # Uyarlanır tempo: tıklanan slotun boşalması (item satıldı) beklenir
+            half = _slot_half(points)
+            cap, self._pacer = None, None
+            if cv2 is not None and points:
+                try:
+                    cap = get_capture()
+                    cap.grab((points[0][0] - half, points[0][1] - half, 2 * half + 1, 2 * half + 1))
+                    self._pacer = make_pacer()
+                except Exception:
+                    self._pacer = None   # yakalama yok → sabit interval
+
+            count = 0
+            for x, y in points:
+                if self._stopped():
                     self.progress.emit("İşlem iptal edildi.")
                     self.finished.emit(False)
                     return
 
-                # Her adımda interval'ı config.json'dan oku → kullanıcı anlık ayarlayabilsin
-                interval = _safe_read_interval()
-
-                try:
-                    x = int(item.get("x"))
-                    y = int(item.get("y"))
-                except Exception:
+                def _act(x=x, y=y):
+                    with span("auto.click"):
+                        driver.click(x, y)
+
+                pacer = self._pacer
+                if pacer is not None:
+                    region = (x - half, y - half, 2 * half + 1, 2 * half + 1)
+                    # önce hover (vurgu başarı sayılmasın), sonra imlecin olduğu yere tık
+                    def _press():
+                        with span("auto.click"):
+                            driver.click()
+
+                    ok = pacer.step(_press, lambda: cap.grab(region),
+                                    stop=self._stopped, prepare=lambda x=x, y=y: driver.move(x, y),
+                                    done=lambda f: _cell_empty(f, self.empty_std))
+                    count += 1
+                    self.progress.emit(f"Tıklandı: ({x}, {y}) — {count}. adım "
+                                       f"(bekleme: {pacer.delay:.3f}s{'' if ok else ', slot değişmedi'})")
                     continue
 
-                pyautogui.moveTo(x, y, duration=0)
-                pyautogui.click()
+                # Her adımda güncel interval (config değişince bildirilir) → kullanıcı anlık ayarlayabilsin
+                interval = self._interval
+
+                _act()
                 count += 1
                 self.progress.emit(f"Tıklandı: ({x}, {y}) — {count}. adım (interval: {interval:.3f}s)")
 
                 # JITTER YOK — sadece sabit bekleme. 0 ise hiç bekleme yapma.
                 if interval > 0.0:
-                    time.sleep(interval)
+                    with span("auto.sleep"):
+                        time.sleep(interval)
 
+            if self._pacer is not None:
+                self.progress.emit(self._pacer.stats())
             self.progress.emit(f"Bitti. Toplam {count} tıklama.")
             self.finished.emit(True)
 
         except Exception as e:
             self.progress.emit(f"Hata: {e}")
             self.finished.emit(False)
+        finally:
+            unsubscribe()
+
+    def _stopped(self) -> bool:
+        return self._abort or bool(self.should_stop and self.should_stop())
 
     def abort(self):
         self._abort = True
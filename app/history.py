@@ -0,0 +1,228 @@
+"""
+Yerel fiyat geçmişi (snapshot history) + LTTB downsampling.
+
+Her başarılı taramada (ScanWorker) satırların buy/sell fiyatları kompakt bir
+binary dosyaya eklenir. Kartlar ve seçili ürün penceresi buradan sparkline
+serisi ister; seriler Largest-Triangle-Three-Buckets ile sabit nokta sayısına
+indirilir ve (item, pencere, nokta) anahtarıyla cache'lenir.
+
+Dosya formatı (little-endian), tarama başına bir frame:
+  <I ts> <I count>  ve count kez:  <B id_len> <id bytes> <d buy> <d sell>
+"""
+from __future__ import annotations
+
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Optional
+
+HISTORY_PATH = Path("app/data/history.bin")
+
+# UI'daki pencere seçici: etiket -> saniye
+WINDOWS = {
+    "1 saat": 3600,
+    "6 saat": 6 * 3600,
+    "24 saat": 24 * 3600,
+    "7 gün": 7 * 24 * 3600,
+}
+
+_FRAME = struct.Struct("<II")
+_PRICES = struct.Struct("<dd")
+
+
+def lttb(xs, ys, n_out: int) -> list[tuple[float, float]]:
+    """Largest-Triangle-Three-Buckets: (xs, ys) serisini n_out noktaya indirir.
+
+    İlk ve son nokta her zaman korunur; aradaki her bucket'tan, bir önceki
+    seçilen nokta ile sonraki bucket ortalamasıyla en büyük üçgeni kuran nokta seçilir.
+    """
+    n = len(xs)
+    if n_out >= n or n_out < 3:
+        return list(zip(xs, ys))
+
+    out = [(xs[0], ys[0])]
+    every = (n - 2) / (n_out - 2)
+    a = 0
+    for i in range(n_out - 2):
+        # sonraki bucket'ın ortalaması
+        nxt_start = int((i + 1) * every) + 1
+        nxt_end = min(int((i + 2) * every) + 1, n)
+        cnt = nxt_end - nxt_start
+        avg_x = sum(xs[nxt_start:nxt_end]) / cnt
+        avg_y = sum(ys[nxt_start:nxt_end]) / cnt
+
+        # bu bucket içinde en büyük üçgen
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+        best_area = -1.0
+        best = start
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        out.append((xs[best], ys[best]))
+        a = best
+
+    out.append((xs[-1], ys[-1]))
+    return out
+
+
+class _Series:
+    __slots__ = ("ts", "buy", "sell")
+
+    def __init__(self):
+        self.ts = array("I")
+        self.buy = array("d")
+        self.sell = array("d")
+
+
+class PriceHistory:
+    """Item bazlı buy/sell geçmişi; diske append-only yazar, sparkline'ları cache'ler."""
+
+    def __init__(self, path: Path = HISTORY_PATH, max_age: int = 7 * 24 * 3600, points: int = 48):
+        self.path = Path(path)
+        self.max_age = int(max_age)
+        self.points = int(points)
+        self._series: dict[str, _Series] = {}
+        self._last_ts = 0
+        self._cache: dict[tuple, dict] = {}
+        self._lock = threading.Lock()
+
+    # ---------- persistence ----------
+    def load(self) -> int:
+        """Dosyadaki frame'leri belleğe alır; max_age'den eskileri atlar. Okunan frame sayısını döner."""
+        if not self.path.exists():
+            return 0
+        try:
+            buf = self.path.read_bytes()
+        except Exception:
+            return 0
+
+        cutoff = int(time.time()) - self.max_age
+        frames = dropped = 0
+        off = 0
+        end = len(buf)
+        with self._lock:
+            while off + _FRAME.size <= end:
+                ts, count = _FRAME.unpack_from(buf, off)
+                off += _FRAME.size
+                keep = ts >= cutoff
+                try:
+                    for _ in range(count):
+                        ln = buf[off]
+                        item_id = buf[off + 1: off + 1 + ln].decode("utf-8", "replace")
+                        off += 1 + ln
+                        buy, sell = _PRICES.unpack_from(buf, off)
+                        off += _PRICES.size
+                        if keep:
+                            self._put(item_id, ts, buy, sell)
+                except (IndexError, struct.error):
+                    # yarım yazılmış son frame → kalanı yok say
+                    break
+                if keep:
+                    frames += 1
+                    self._last_ts = max(self._last_ts, ts)
+                else:
+                    dropped += 1
+            self._cache.clear()
+
+        if dropped:
+            self._compact()
+        return frames
+
+    def _compact(self):
+        """Eski frame'leri dosyadan atar (bellekteki geçmişi baştan yazar)."""
+        by_ts: dict[int, list] = {}
+        with self._lock:
+            for item_id, s in self._series.items():
+                for ts, b, sl in zip(s.ts, s.buy, s.sell):
+                    by_ts.setdefault(ts, []).append((item_id, b, sl))
+        chunks = [self._encode_frame(ts, recs) for ts, recs in sorted(by_ts.items())]
+        try:
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_bytes(b"".join(chunks))
+            tmp.replace(self.path)
+        except Exception:
+            pass
+
+    @staticmethod
+    def _encode_frame(ts: int, recs) -> bytes:
+        parts = [_FRAME.pack(int(ts), len(recs))]
+        for item_id, buy, sell in recs:
+            bid = item_id.encode("utf-8")[:255]
+            parts.append(bytes((len(bid),)) + bid + _PRICES.pack(float(buy), float(sell)))
+        return b"".join(parts)
+
+    # ---------- update ----------
+    def _put(self, item_id: str, ts: int, buy: float, sell: float):
+        s = self._series.get(item_id)
+        if s is None:
+            s = self._series[item_id] = _Series()
+        s.ts.append(ts)
+        s.buy.append(buy)
+        s.sell.append(sell)
+
+    def append(self, rows: list[dict], ts: Optional[int] = None) -> bool:
+        """Bir tarama sonucunu geçmişe ekler. Aynı timestamp ikinci kez eklenmez."""
+        if not rows:
+            return False
+        ts = int(ts if ts is not None else rows[0].get("timestamp") or time.time())
+        recs = []
+        with self._lock:
+            if ts <= self._last_ts:
+                return False
+            for r in rows:
+                item_id = str(r.get("id") or "")
+                if not item_id:
+                    continue
+                buy = float(r.get("buy_price") or 0.0)
+                sell = float(r.get("sell_price") or 0.0)
+                self._put(item_id, ts, buy, sell)
+                recs.append((item_id, buy, sell))
+            self._last_ts = ts
+            self._cache.clear()
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("ab") as f:
+                f.write(self._encode_frame(ts, recs))
+        except Exception:
+            return False
+        return True
+
+    # ---------- query ----------
+    def sparkline(self, item_id: str, window: int, points: Optional[int] = None) -> Optional[dict]:
+        """Pencere içindeki buy/sell/margin serilerini LTTB ile indirip döner.
+
+        Dönüş: {"buy": [(t, v), ...], "sell": [...], "margin": [...]} veya
+        pencerede 2'den az nokta varsa None.
+        """
+        n = int(points or self.points)
+        key = (item_id, int(window), n)
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+            s = self._series.get(item_id)
+            if s is None or len(s.ts) < 2:
+                self._cache[key] = None
+                return None
+            start = bisect_left(s.ts, self._last_ts - int(window))
+            xs = s.ts[start:]
+            if len(xs) < 2:
+                self._cache[key] = None
+                return None
+            buy = s.buy[start:]
+            sell = s.sell[start:]
+            margin = [b - a for a, b in zip(buy, sell)]
+            out = {
+                "buy": lttb(xs, buy, n),
+                "sell": lttb(xs, sell, n),
+                "margin": lttb(xs, margin, n),
+            }
+            self._cache[key] = out
+            return out
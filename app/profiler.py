@@ -0,0 +1,165 @@
+"""
+Opsiyonel enstrümantasyon katmanı (`python -m app.ui.main --profile`).
+
+- span("scan.fetch") gibi isimli zaman aralıkları ölçülür, isim başına son N
+  süre tutulur; p50/p95 UI status bar'ında canlı gösterilir.
+- Kapalıyken span() paylaşılan no-op context döner (hot path'te maliyet ~0).
+- İstek üzerine cProfile (.prof) ve tracemalloc snapshot'ı diske dökülür.
+- Trace sink'i (app.services.trace) bağlıyken her span ve event() zaman damgası,
+  süre, thread ve alanlarıyla (span(..., x=1) / sp.note(score=...)) sink'e gider.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Optional
+
+PROFILE_DIR = Path("app/data/profile")
+
+# sink(isim, t0 (perf_counter), süre, alanlar veya None)
+Sink = Callable[[str, float, float, Optional[dict]], None]
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def note(self, **fields):
+        pass
+
+
+_NULL = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("prof", "name", "t0", "fields")
+
+    def __init__(self, prof: "Profiler", name: str, fields: Optional[dict]):
+        self.prof = prof
+        self.name = name
+        self.t0 = 0.0
+        self.fields = fields
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.prof.record(self.name, time.perf_counter() - self.t0, self.t0, self.fields)
+        return False
+
+    def note(self, **fields):
+        """Span'e sonradan alan ekler (örn. eşleştirme skoru); sadece trace'e gider."""
+        if self.fields is None:
+            self.fields = fields
+        else:
+            self.fields.update(fields)
+
+
+class Profiler:
+    def __init__(self, keep: int = 512):
+        self.enabled = False
+        self.keep = int(keep)
+        self._samples: dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._cprof = None
+        self.sink: Optional[Sink] = None
+
+    def enable(self):
+        self.enabled = True
+
+    def set_sink(self, sink: Optional[Sink]):
+        self.sink = sink
+
+    # ---------- spans ----------
+    def span(self, name: str, **fields):
+        if not self.enabled and self.sink is None:
+            return _NULL
+        return _Span(self, name, fields or None)
+
+    def record(self, name: str, seconds: float, t0: Optional[float] = None, fields: Optional[dict] = None):
+        sink = self.sink
+        if sink is not None:
+            sink(name, time.perf_counter() - seconds if t0 is None else t0, seconds, fields)
+        if not self.enabled:
+            return
+        q = self._samples.get(name)
+        if q is None:
+            with self._lock:
+                q = self._samples.setdefault(name, deque(maxlen=self.keep))
+        q.append(seconds)
+
+    def event(self, name: str, **fields):
+        """Süresiz olay (faz geçişi vb.); sadece trace sink'i bağlıyken kaydedilir."""
+        sink = self.sink
+        if sink is not None:
+            sink(name, time.perf_counter(), 0.0, fields or None)
+
+    def stats(self) -> dict[str, tuple[int, float, float]]:
+        """isim -> (örnek sayısı, p50, p95) — süreler saniye."""
+        out = {}
+        with self._lock:
+            items = list(self._samples.items())
+        for name, q in items:
+            vals = sorted(q)
+            if not vals:
+                continue
+            n = len(vals)
+            out[name] = (n, vals[n // 2], vals[min(n - 1, int(n * 0.95))])
+        return out
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+    # ---------- cProfile / tracemalloc ----------
+    @property
+    def cprofile_running(self) -> bool:
+        return self._cprof is not None
+
+    def toggle_cprofile(self) -> Optional[Path]:
+        """İlk çağrı cProfile'ı (çağıran thread'de) başlatır; ikincisi durdurup .prof dosyasını yazar."""
+        import cProfile
+        if self._cprof is None:
+            self._cprof = cProfile.Profile()
+            self._cprof.enable()
+            return None
+        prof, self._cprof = self._cprof, None
+        prof.disable()
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        path = PROFILE_DIR / f"cprofile_{time.strftime('%Y%m%d_%H%M%S')}.prof"
+        prof.dump_stats(str(path))
+        return path
+
+    def dump_tracemalloc(self, top: int = 25) -> Optional[Path]:
+        """tracemalloc kapalıysa başlatıp None döner; açıksa snapshot + top-N özetini yazar."""
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            return None
+        snap = tracemalloc.take_snapshot()
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime('%Y%m%d_%H%M%S')
+        path = PROFILE_DIR / f"tracemalloc_{stamp}.snap"
+        snap.dump(str(path))
+        lines = [str(st) for st in snap.statistics("lineno")[:top]]
+        (PROFILE_DIR / f"tracemalloc_{stamp}_top.txt").write_text("\n".join(lines), encoding="utf-8")
+        return path
+
+
+PROFILER = Profiler()
+
+
+def span(name: str, **fields):
+    return PROFILER.span(name, **fields)
+
+
+def event(name: str, **fields):
+    PROFILER.event(name, **fields)
@@ -0,0 +1,159 @@
+"""
+Seçili item'lar (app/data/selecteditems.json) için paylaşılan, bellek içi store.
+
+- UI ve otomasyon thread'leri aynı listeyi kilit altında okur/değiştirir;
+  dosya her değişiklikte okunup baştan yazılmaz.
+- Değişiklikler `debounce` saniye içinde toplanır ve tek bir atomik yazımla
+  (tmp + replace) diske gider; flush() hemen yazar, süreç çıkarken de yazılır.
+- Aboneler her değişiklikte yeni item listesiyle (değiştiren thread'den)
+  çağrılır; Qt tarafı bir sinyal köprüsüyle UI thread'ine taşımalıdır.
+
+Dosya biçimi değişmedi: {"items": [{"id", "name", "expected_amount"}, ...], "saved_at"}.
+"""
+from __future__ import annotations
+
+import atexit
+import copy
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+SELECTION_PATH = Path(__file__).resolve().parent / "data" / "selecteditems.json"
+
+
+def _key(name: str) -> str:
+    return (name or "").strip().lower()
+
+
+class SelectionStore:
+    def __init__(self, path: Path = SELECTION_PATH, debounce: float = 0.5):
+        self.path = Path(path)
+        self.debounce = float(debounce)
+        self._lock = threading.RLock()
+        self._items: list[dict] = []
+        self._subs: list[Callable[[list], None]] = []
+        self._timer: Optional[threading.Timer] = None
+        self._dirty = False
+        self.writes = 0
+        self.load()
+
+    # ---------- okuma ----------
+    def load(self) -> bool:
+        """Dosyadan yükler (bekleyen yazım varsa önce diske gider). Eski {"ids": [...]} biçimi de okunur."""
+        self.flush()
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            data = {"items": []}
+        except Exception:
+            return False
+        if "items" in data:
+            items = [dict(it) for it in (data.get("items") or []) if isinstance(it, dict)]
+        else:
+            items = [{"id": str(s), "name": str(s), "expected_amount": 1} for s in (data.get("ids") or [])]
+        with self._lock:
+            self._items = items
+        self._notify()
+        return True
+
+    def items(self) -> list[dict]:
+        with self._lock:
+            return copy.deepcopy(self._items)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def fingerprint(self) -> str:
+        """Seçimin içerik özeti (isim + miktar, sırasız); checkpoint'in hangi seçime ait olduğunu ayırt eder."""
+        with self._lock:
+            rows = sorted((_key(it.get("name")), str(it.get("expected_amount"))) for it in self._items)
+        return hashlib.sha1(json.dumps(rows).encode("utf-8")).hexdigest()[:16]
+
+    # ---------- değiştirme ----------
+    def replace(self, items: list[dict]):
+        """Listenin tamamını değiştirir (UI seçimleri)."""
+        with self._lock:
+            new = [dict(it) for it in items]
+            if new == self._items:
+                return
+            self._items = new
+        self._changed()
+
+    def clear(self):
+        self.replace([])
+
+    def append(self, name: str, expected_amount: int, item_id: str = "") -> bool:
+        """Aynı isim (büyük/küçük harf duyarsız) yoksa ekler. Eklendiyse True."""
+        with self._lock:
+            if _key(name) in {_key(it.get("name")) for it in self._items}:
+                return False
+            self._items.append({"id": item_id or "", "name": name, "expected_amount": int(expected_amount)})
+        self._changed()
+        return True
+
+    # ---------- kalıcılık ----------
+    def _changed(self):
+        with self._lock:
+            self._dirty = True
+            if self.debounce <= 0:
+                timer = None
+            elif self._timer is None:
+                timer = self._timer = threading.Timer(self.debounce, self.flush)
+                timer.daemon = True
+            else:
+                timer = False   # zaten planlı
+        if timer is None:
+            self.flush()
+        elif timer:
+            timer.start()
+        self._notify()
+
+    def flush(self) -> bool:
+        """Bekleyen değişikliği hemen atomik olarak yazar."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return True
+            payload = {"items": copy.deepcopy(self._items), "saved_at": int(time.time())}
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+                tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+                tmp.replace(self.path)
+            except Exception:
+                return False
+            self._dirty = False
+            self.writes += 1
+            return True
+
+    # ---------- abonelik ----------
+    def subscribe(self, cb: Callable[[list], None]) -> Callable[[], None]:
+        """cb(items) her değişiklikte çağrılır. Dönüş: abonelikten çık."""
+        with self._lock:
+            self._subs.append(cb)
+
+        def _unsubscribe():
+            with self._lock:
+                if cb in self._subs:
+                    self._subs.remove(cb)
+        return _unsubscribe
+
+    def _notify(self):
+        with self._lock:
+            subs = list(self._subs)
+            items = copy.deepcopy(self._items)
+        for cb in subs:
+            try:
+                cb(copy.deepcopy(items))
+            except Exception:
+                pass
+
+
+SELECTION = SelectionStore()
+atexit.register(SELECTION.flush)
@@ -3,9 +3,7 @@ from __future__ import annotations
 
 import threading
 import time
-from pathlib import Path
 from typing import Optional, Callable, Tuple
-import json
 # Third-party (optional at import-time)
 try:
     import pyautogui  # type: ignore
@@ -14,9 +12,13 @@ except Exception:
     pyautogui = None  # type: ignore
     keyboard = None   # type: ignore
 
-CONFIG_PATH = Path("app/data/config.json")
-SELECTED_PATH = Path("app/data/selecteditems.json")
-
+from app.config import CONFIG
+from app.profiler import span
+from app.selection import SELECTION, SelectionStore
+from .capture import CaptureBackend, get_capture
+from .input_driver import InputDriver, get_input
+from .pacing import AdaptivePacer, make_pacer
+from .scheduler import OrderWindow
 
 COORDS = {
     "a":  (952, 427), "a1": (940, 472), "a2": (950, 512),
@@ -42,33 +44,12 @@ SPECIAL = {
 
 SPECIAL = { (k or "").strip().lower(): v for k, v in SPECIAL.items() }
 
-def _safe_read_interval() -> float:
-    """
-    app/data/config.json içinden fastsell.interval'ı güvenle okur.
-    Bulunamazsa veya hatalıysa 0.3 döner.
-    {
-      "fastsell": { "interval": 0.3 }
-    }
-    """
-    try:
-        if not CONFIG_PATH.exists():
-            return 0.3
-        cfg = json.loads(CONFIG_PATH.read_text(encoding="utf-8"))
-        fs = (cfg.get("fastsell") or {})
-        val = float(fs.get("interval", 0.3) or 0.3)
-        if val < 0:
-            val = 0.0
-        return val
-    except Exception:
-        return 0.3
-
-
 class BuyService:
     
 
 
     """
-    selecteditems.json içindeki her item için sırasıyla Buy Order otomasyonu.
+    Seçim store'undaki (selecteditems.json) her item için sırasıyla Buy Order otomasyonu.
 
     Akış (her item için):
       1) (817, 540) tıkla
@@ -95,11 +76,40 @@ class BuyService:
         c_d: Tuple[int, int] = (1072, 427),
         c_e: Tuple[int, int] = (927, 431),
         c_f: Tuple[int, int] = (965, 431),
+        # Girdi sürücüsü (None → app.services.input_driver varsayılanı)
+        input_driver: Optional[InputDriver] = None,
+        # Uyarlanır tempo: tık sonrası değişimi izlenen bölge (chest GUI) ve yakalama backend'i
+        capture: Optional[CaptureBackend] = None,
+        watch_region: Tuple[int, int, int, int] = (840, 370, 270, 190),
+        # Order limiti dolunca boş süre bu geri çağrıya devredilir: on_idle(saniye).
+        # None → sadece beklenir. Geri çağrı bütçeden uzun sürebilir; pencere yine de boşalır.
+        on_idle: Optional[Callable[[float], None]] = None,
+        # on_idle'a devretmek için gereken en kısa boş süre (saniye)
+        min_idle: float = 15.0,
+        # İlerleme geri çağrıları (FullAuto checkpoint'i): skip_item(isim) True ise item atlanır
+        # (order'ı daha önce verilmiş), on_item_done(isim) order verildikten sonra çağrılır.
+        skip_item: Optional[Callable[[str], bool]] = None,
+        on_item_done: Optional[Callable[[str], None]] = None,
+        # Seçili item'lar (paylaşılan bellek içi store; UI ve FullAuto ile aynı)
+        selection: SelectionStore = SELECTION,
     ):
         self.log = log_callback or (lambda m: print(f"[buy-svc] {m}"))
         self._stop_evt = threading.Event()
         self._thread: Optional[threading.Thread] = None
         self._hotkey = hotkey
+        self.input_driver = input_driver
+        self.capture = capture
+        self.watch_region = watch_region
+        self._pacer: Optional[AdaptivePacer] = None
+        self.on_idle = on_idle
+        self.min_idle = float(min_idle)
+        self.skip_item = skip_item
+        self.on_item_done = on_item_done
+        self.selection = selection
+        # buy order hız limiti: servis ömrü boyunca tek pencere (FullAuto turları arasında da geçerli)
+        self.limiter = OrderWindow(*CONFIG.buy_limits())
+        # adım arası bekleme: çalışırken config değişince servis bildirir (tık başına dosya okuma yok)
+        self._interval = CONFIG.interval()
 
         # Coords
         self.c_search = c_search
@@ -126,8 +136,8 @@ class BuyService:
     def start(self):
         if self._thread and self._thread.is_alive():
             return
-        if pyautogui is None:
-            self.log("pyautogui gerekli; import edilemedi.")
+        if self._input() is None:
+            self.log("Girdi sürücüsü yok (pyautogui import edilemedi).")
             return
         self._stop_evt.clear()
         self._thread = threading.Thread(target=self._run, name="buy-service", daemon=True)
@@ -146,47 +156,113 @@ class BuyService:
             self.start()
 
     # ---------- Internals ----------
+    def _input(self) -> Optional[InputDriver]:
+        return self.input_driver or get_input()
+
+    def _on_config(self, cfg: dict):
+        self._interval = CONFIG.interval()
+        self.limiter.configure(*CONFIG.buy_limits())
+        pacer = self._pacer
+        if pacer is not None:
+            _, lo, hi = CONFIG.pacing()
+            pacer.set_bounds(lo, hi)
+
+    def _grab_watch(self):
+        return (self.capture or get_capture()).grab(self.watch_region)
+
+    def _make_pacer(self) -> Optional[AdaptivePacer]:
+        """Config adaptive ise ve izlenen bölge yakalanabiliyorsa pacer; yoksa sabit interval."""
+        pacer = make_pacer()
+        if pacer is None:
+            return None
+        try:
+            self._grab_watch()
+        except Exception as e:
+            self.log(f"Uyarlanır tempo kapalı (yakalama yok: {e}); sabit interval kullanılacak.")
+            return None
+        return pacer
+
     def _sleep(self):
-        # Her adım arası bekleme: config'ten oku
-        t = _safe_read_interval()
+        # Her adım arası bekleme: config'teki fastsell.interval (önbellekten)
+        t = self._interval
         if t > 0:
-            time.sleep(t)
+            with span("auto.sleep"):
+                time.sleep(t)
  
     def _click(self, xy: Tuple[int, int], label: str = ""):
         x, y = xy
-        pyautogui.moveTo(x, y, duration=0)
-        pyautogui.click()
+
+        def _act():
+            with span("auto.click"):
+                self._input().click(x, y)
+
+        pacer = self._pacer
+        if pacer is None:
+            _act()
+            ok = True
+        else:
+            # önce imleç hedefe (hover değişimi referansa girsin), sonra tık;
+            # GUI tepki verene kadar bekle; bekleme AIMD ile [min, max] içinde uyarlanır
+            def _press():
+                with span("auto.click"):
+                    self._input().click()
+
+            ok = pacer.step(_press, self._grab_watch, stop=self._stop_evt.is_set,
+                            prepare=lambda: self._input().move(x, y))
         if label:
-            self.log(f"Tık: {label} → ({x},{y})")
-        self._sleep()
+            self.log(f"Tık: {label} → ({x},{y})" + ("" if ok else " (GUI tepki vermedi)"))
+        if pacer is None:
+            self._sleep()
 
     def _type(self, text: str, press_enter: bool = False, clear_first: bool = True):
 
-        pyautogui.typewrite(text, interval=0.01)
+        with span("auto.type"):
+            self._input().type_text(text)
         self.log(f"Yazıldı: '{text}'")
         self._sleep()
-        if press_enter and keyboard:
-            keyboard.send("enter")
+        if press_enter:
+            with span("auto.key"):
+                self._input().key("enter")
             self._sleep()
 
 
     def _press_x(self):
-        if keyboard:
-            keyboard.send("x")
+        with span("auto.key"):
+            self._input().key("x")
         self._sleep()
 
     def _load_items(self) -> list[dict]:
-        if not SELECTED_PATH.exists():
-            self.log(f"Seçim dosyası yok: {SELECTED_PATH}")
-            return []
-        try:
-            data = json.loads(SELECTED_PATH.read_text(encoding="utf-8"))
-            items = data.get("items") or []
-            # Sıra korunur (JSON listesi zaten sıralıdır)
-            return items
-        except Exception as e:
-            self.log(f"Seçim dosyası okunamadı: {e}")
-            return []
+        # Sıra korunur; dosya okunmaz, store'un anlık kopyası alınır
+        return self.selection.items()
+
+    def _await_order_slot(self, remaining: int = 1) -> bool:
+        """Pencerede order yeri açılana kadar bekler. on_idle varsa kalan item'lar
+        için (en fazla max_orders) yer açılana dek geçen süre tek blok olarak
+        devredilir (bekleme başına bir kez); böylece order'lar yine art arda
+        verilir. Durdurulursa False."""
+        delegated = False
+        while not self._stop_evt.is_set():
+            if self.limiter.try_acquire():
+                return True
+            wait = self.limiter.wait_time()
+            t0 = time.monotonic()
+            budget = self.limiter.wait_time(max(1, remaining))
+            if self.on_idle is not None and not delegated and budget >= self.min_idle:
+                delegated = True
+                self.log(f"Buy order limiti doldu: {budget:.0f} sn boş süre devrediliyor...")
+                try:
+                    with span("buy.idle"):
+                        self.on_idle(budget)
+                except Exception as e:
+                    self.log(f"Boş süre görevi hata: {e}")
+            else:
+                self.log(f"Buy order limiti doldu: {wait:.0f} sn bekleniyor...")
+                with span("buy.throttle"):
+                    t_end = time.monotonic() + wait
+                    while not self._stop_evt.is_set() and time.monotonic() < t_end:
+                        time.sleep(min(0.5, t_end - time.monotonic()))
+            self.limiter.waited += time.monotonic() - t0
+        return False
 
     def _run_one_item(self, name: str, expected_amount: int):
         # 0) Önce x e basarak bazarı aç
@@ -206,9 +282,11 @@ class BuyService:
         self._type(str(int(expected_amount)), press_enter=True)
 
         # 8-9) onay tıklamaları
-        time.sleep(1)
+        with span("auto.sleep"):
+            time.sleep(1)
         self._click(self.c_e, "e")
-        time.sleep(1)
+        with span("auto.sleep"):
+            time.sleep(1)
         self._click(self.c_f, "f")
 
         # 10) X
@@ -221,7 +299,21 @@ class BuyService:
             self.log("İşlenecek item yok.")
             return
         self.log(f"{len(items)} adet item işlenecek.")
+        # abonelik sadece çalışma süresince (servis nesnesi config'e bağlı kalmaz)
+        self._on_config({})
+        unsubscribe = CONFIG.subscribe(self._on_config)
+        try:
+            self._pacer = self._make_pacer()
+            self._run_items(items)
+        finally:
+            unsubscribe()
+
+        if self._pacer is not None:
+            self.log(f"Buy {self._pacer.stats()}")
+        self.log(f"Buy order {self.limiter.stats()}")
+        self.log("BuyService tamamlandı.")
 
+    def _run_items(self, items: list):
         for idx, it in enumerate(items, 1):
             if self._stop_evt.is_set():
                 break
@@ -231,22 +323,25 @@ class BuyService:
                 self.log(f"{idx}. kayıt atlandı (isim yok).")
                 continue
 
+            if self.skip_item is not None and self.skip_item(name):
+                self.log(f"[{idx}/{len(items)}] {name} atlandı (order zaten verilmiş).")
+                continue
+
             exp = it.get("expected_amount")
             try:
                 exp = int(exp)
             except Exception:
                 exp = 1
 
+            if not self._await_order_slot(len(items) - idx + 1):
+                break
             self.log(f"[{idx}/{len(items)}] {name} → {exp}")
             try:
-                self._run_one_item(name, exp)
+                with span("buy.item", item=name, amount=exp):
+                    self._run_one_item(name, exp)
             except Exception as e:
                 self.log(f"Hata (item='{name}'): {e}")
                 self._sleep()
-
-            # 🔑 Her 5 işlemde 1 dakika bekle
-            if idx % 5 == 0:
-                self.log("5 adet buy order tamamlandı. 1 dakika bekleniyor...")
-                time.sleep(65)   # 65 saniye bekle
-
-        self.log("BuyService tamamlandı.")
\ No newline at end of file
+            # hata olsa da order verilmiş olabilir → tekrar denenmez
+            if self.on_item_done is not None:
+                self.on_item_done(name)
\ No newline at end of file
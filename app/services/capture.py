@@ -0,0 +1,195 @@
+"""
+Ekran yakalama katmanı.
+
+collect_service, fullauto ve OCR tüm yakalamaları buradan yapar; hepsi BGR
+numpy dizisi alır. Backend'ler:
+
+  - MssCapture       : mss (X11 XGetImage/XShm, Windows GDI); BGRA → BGR
+                       dönüşümü önceden ayrılmış, boyut başına tekrar kullanılan
+                       buffer'a yazılır (her yakalamada yeni dizi ayrılmaz)
+  - PyAutoGuiCapture : eski yol (PIL Image → np.array → cvtColor)
+  - FileCapture      : diskteki PNG'lerden frame besler (headless benchmark / test)
+
+Varsayılan backend BAZAAR_CAPTURE ortam değişkeniyle seçilir:
+  "mss", "pyautogui" veya "file:<klasör>"; verilmezse mss varsa mss, yoksa pyautogui.
+
+Not: MssCapture'ın döndürdüğü dizi aynı boyuttaki bir sonraki yakalamada
+üzerine yazılır; frame'i saklamak isteyen çağıran .copy() almalıdır.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Sequence
+
+try:
+    import cv2        # type: ignore
+    import numpy as np
+except Exception:
+    cv2 = None        # type: ignore
+    np = None         # type: ignore
+
+try:
+    import mss  # type: ignore
+except Exception:
+    mss = None  # type: ignore
+
+Region = tuple  # (x, y, w, h) — ekran koordinatı
+
+
+class CaptureBackend:
+    name = "base"
+
+    def grab(self, region: Region):
+        """Bölgeyi BGR (h, w, 3) uint8 dizi olarak döner."""
+        raise NotImplementedError
+
+    def grab_full(self):
+        """Tüm ekranı BGR döner; desteklenmiyorsa None."""
+        return None
+
+
+class PyAutoGuiCapture(CaptureBackend):
+    name = "pyautogui"
+
+    def __init__(self):
+        import pyautogui  # type: ignore
+        self._pg = pyautogui
+
+    def grab(self, region: Region):
+        shot = self._pg.screenshot(region=tuple(int(v) for v in region))
+        return cv2.cvtColor(np.array(shot), cv2.COLOR_RGB2BGR)
+
+    def grab_full(self):
+        shot = self._pg.screenshot()
+        return cv2.cvtColor(np.array(shot), cv2.COLOR_RGB2BGR)
+
+
+class MssCapture(CaptureBackend):
+    name = "mss"
+
+    def __init__(self):
+        if mss is None:
+            raise RuntimeError("mss kurulu değil")
+        # mss örnekleri thread'ler arasında paylaşılamaz
+        self._local = threading.local()
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = self._local.sct = mss.mss()
+            self._local.bufs = {}
+        return sct
+
+    def _buffer(self, w: int, h: int):
+        bufs = self._local.bufs
+        buf = bufs.get((w, h))
+        if buf is None:
+            buf = bufs[(w, h)] = np.empty((h, w, 3), dtype=np.uint8)
+        return buf
+
+    def _grab_mon(self, mon: dict):
+        shot = self._sct().grab(mon)
+        w, h = shot.width, shot.height
+        bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(h, w, 4)
+        buf = self._buffer(w, h)
+        cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=buf)
+        return buf
+
+    def grab(self, region: Region):
+        x, y, w, h = (int(v) for v in region)
+        return self._grab_mon({"left": x, "top": y, "width": w, "height": h})
+
+    def grab_full(self):
+        sct = self._sct()
+        return self._grab_mon(dict(sct.monitors[1] if len(sct.monitors) > 1 else sct.monitors[0])).copy()
+
+
+class FileCapture(CaptureBackend):
+    """Diskteki görüntülerden sırayla frame verir.
+
+    origin: görüntülerin ekrandaki sol-üst köşesi. Görüntü tam ekran ise (0, 0);
+    bir bölgenin kaydı ise o bölgenin sol-üstü. grab() istenen bölgeyi bu
+    görüntüden kırpar. loop=False ise son frame'de kalır.
+    """
+    name = "file"
+
+    def __init__(self, frames: Sequence, origin: tuple[int, int] = (0, 0), loop: bool = True):
+        self._frames = []
+        for f in frames:
+            if isinstance(f, (str, Path)):
+                img = cv2.imread(str(f), cv2.IMREAD_COLOR)
+                if img is None:
+                    continue
+                self._frames.append(img)
+            else:
+                self._frames.append(f)
+        if not self._frames:
+            raise ValueError("FileCapture: okunabilir frame yok")
+        self.origin = origin
+        self.loop = bool(loop)
+        self._idx = 0
+        self.grabs = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dir(cls, folder, pattern: str = "*.png", **kw) -> "FileCapture":
+        return cls(sorted(Path(folder).glob(pattern)), **kw)
+
+    def _next(self):
+        with self._lock:
+            img = self._frames[self._idx]
+            self.grabs += 1
+            if self._idx + 1 < len(self._frames):
+                self._idx += 1
+            elif self.loop:
+                self._idx = 0
+            return img
+
+    def grab(self, region: Region):
+        img = self._next()
+        x, y, w, h = (int(v) for v in region)
+        ox, oy = self.origin
+        x0, y0 = max(0, x - ox), max(0, y - oy)
+        crop = img[y0:y0 + h, x0:x0 + w]
+        if crop.shape[0] != h or crop.shape[1] != w:
+            # bölge görüntü dışına taşıyor → eksik kısım siyah
+            out = np.zeros((h, w, 3), dtype=np.uint8)
+            out[:crop.shape[0], :crop.shape[1]] = crop
+            return out
+        return crop.copy()
+
+    def grab_full(self):
+        return self._next().copy()
+
+
+def make_capture(spec: Optional[str] = None) -> CaptureBackend:
+    spec = (spec if spec is not None else os.environ.get("BAZAAR_CAPTURE", "")).strip()
+    if spec.startswith("file:"):
+        return FileCapture.from_dir(spec[len("file:"):])
+    if spec == "pyautogui":
+        return PyAutoGuiCapture()
+    if spec in ("", "mss") and mss is not None:
+        return MssCapture()
+    return PyAutoGuiCapture()
+
+
+_DEFAULT: Optional[CaptureBackend] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_capture() -> CaptureBackend:
+    global _DEFAULT
+    if _DEFAULT is None:
+        with _DEFAULT_LOCK:
+            if _DEFAULT is None:
+                _DEFAULT = make_capture()
+    return _DEFAULT
+
+
+def set_capture(backend: Optional[CaptureBackend]):
+    """Varsayılan backend'i değiştirir (None → bir sonraki get_capture'da yeniden seçilir)."""
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        _DEFAULT = backend
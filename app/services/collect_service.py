@@ -18,6 +18,15 @@ except Exception:
     np = None         # type: ignore
 
 # Local
+from app.profiler import span
+from app.services.templates import TEMPLATES, GREEN_TEMPLATES, YUZDE_TEMPLATES
+from app.services.matcher import MATCHER, Hit, PyramidMatcher, match_all, match_best
+from app.services.capture import CaptureBackend, get_capture
+from app.services.frame_change import FrameChangeDetector
+from app.services.waits import FrameProbe, wait_until
+from app.services.heatmap import HEATMAP, SearchHeatmap
+from app.services.input_driver import InputDriver, get_input
+
 try:
     from app.fastsell import FastSellWorker
 except Exception:
@@ -55,6 +64,18 @@ class CollectAndSellService:
         # --- Debug görüntü kaydı için eklenen parametreler ---
         debug_save: bool = True,
         debug_path: Path = Path("debug.png"),  # .png veya .jpg; timestamp YOK, her seferinde ÜSTÜNE YAZAR
+        # Aynı frame'de aile şablonlarını thread havuzunda paralel dene
+        parallel_match: bool = False,
+        # Ekran yakalama backend'i (None → app.services.capture varsayılanı)
+        capture: Optional[CaptureBackend] = None,
+        # Koşul beklemelerinde yakalama aralığı (timeout'lar eski sabit süreler)
+        wait_poll: float = 0.03,
+        # coarse-to-fine eşleştirme (None → tam çözünürlük BGR, eski davranış)
+        matcher: Optional[PyramidMatcher] = MATCHER,
+        # isabet konumlarını öğrenip önce sıcak alt-bölgelerde ara (None → hep tüm bölge)
+        heatmap: Optional[SearchHeatmap] = HEATMAP,
+        # Girdi sürücüsü (None → app.services.input_driver varsayılanı)
+        input_driver: Optional[InputDriver] = None,
     ):
 
         self.click_pos = click_pos
@@ -68,19 +89,22 @@ class CollectAndSellService:
         self._thread: Optional[threading.Thread] = None
         self._hotkey = hotkey
 
-        self.green_templates: list[Path] = green_template_paths or [
-            Path("app/data/template/green1.png"),
-            Path("app/data/template/green2.png"),
-            Path("app/data/template/green3.png"),
-            Path("app/data/template/green4.png"),
-        ]
+        self.green_templates: list[Path] = green_template_paths or list(GREEN_TEMPLATES)
     
         # Yüzde şablonları
-        self.template_paths2: list[Path] = yuzde_template_paths or [
-            Path("app/data/template/yuzde1.png"),
-            Path("app/data/template/yuzde2.png"),
-            Path("app/data/template/yuzde3.png"),
-        ]
+        self.template_paths2: list[Path] = yuzde_template_paths or list(YUZDE_TEMPLATES)
+
+        self.parallel_match = bool(parallel_match)
+        self.capture = capture
+        # Tıklamadan sonra GUI tepki verene kadar aynı frame'i tekrar eşleştirme
+        self._change = FrameChangeDetector()
+        self.wait_poll = float(wait_poll)
+        self.matcher = matcher
+        self.heatmap = heatmap
+        self.input_driver = input_driver
+
+        # Şablonları bir kez yükle (sonraki eşleşmeler bellekten, mtime değişirse reload)
+        TEMPLATES.preload(self.green_templates + self.template_paths2)
 
         # Debug kayıt opsiyonları
         self.debug_save = bool(debug_save)
@@ -99,7 +123,7 @@ class CollectAndSellService:
         """Servisi başlatır (zaten çalışıyorsa tekrar başlatmaz)."""
         if self._thread and self._thread.is_alive():
             return
-        if pyautogui is None or cv2 is None or np is None:
+        if self._input() is None or cv2 is None or np is None:
             self.log("Gerekli modüller yok (pyautogui/cv2/numpy). Servis başlatılamadı.")
             return
         self._stop_event.clear()
@@ -107,11 +131,16 @@ class CollectAndSellService:
         self._thread.start()
         self.log("Döngü başladı.")
 
-    def stop(self):
-        """Servisi durdurur."""
-        if self._thread and self._thread.is_alive():
+    def stop(self, wait: Optional[float] = None) -> bool:
+        """Servisi durdurur. wait verilirse thread'in bitmesi en fazla o kadar beklenir
+        (girdi cihazını başka bir servise devretmeden önce). Thread bittiyse True."""
+        th = self._thread
+        if th and th.is_alive():
             self._stop_event.set()
             self.log("Döngü durduruluyor...")
+            if wait is not None and th is not threading.current_thread():
+                th.join(wait)
+        return not (th and th.is_alive())
 
     def toggle(self):
         """Çalışıyorsa durdurur, duruyorsa başlatır."""
@@ -121,21 +150,46 @@ class CollectAndSellService:
             self.start()
 
     # ---------- Internals ----------
+    def _sleep(self, t: float):
+        with span("auto.sleep"):
+            time.sleep(t)
+
+    def _input(self) -> Optional[InputDriver]:
+        return self.input_driver or get_input()
+
+    def _wait(self, predicate, timeout: float) -> bool:
+        with span("auto.wait", timeout=timeout) as sp:
+            ok = wait_until(predicate, timeout, poll=self.wait_poll, stop=self._stop_event.is_set)
+            sp.note(ok=ok)
+        return ok
+
+    def _probe(self) -> FrameProbe:
+        return FrameProbe(lambda: self._grab_region(settle=0))
+
     def _press_x_and_click(self):
-        if keyboard:
-            keyboard.send("x")
-        time.sleep(0.31)
+        """Bazaar'ı açıp sipariş ekranına geçer; green/yüzde aramasında kullanılacak frame'i döner."""
+        probe = self._probe()
+        before = probe.take()
+        with span("auto.key"):
+            self._input().key("x")
+        # Bazaar GUI açılınca bölgenin çoğu değişir (eski: sabit 0.31)
+        self._wait(probe.replaced_from(before), 0.31)
         x, y = self.click_pos
-        pyautogui.moveTo(x, y, duration=0)
-        pyautogui.click()
-        time.sleep(0.31)
+        with span("auto.click"):
+            self._input().click(x, y)
+        # sipariş ekranı: green / yüzde şablonları belirene kadar (eski: 0.31 + yakalama sonrası 0.45)
+        self._wait(probe.present(self.green_templates + self.template_paths2, self.template_thresh), 0.76)
+        return probe.frame
 
-    def _grab_region(self):
+    def _cap(self) -> CaptureBackend:
+        return self.capture or get_capture()
+
+    def _grab_region(self, settle: float = 0.45):
         x1, y1 = self.region_topleft
         x2, y2 = self.region_bottomright
         w, h = x2 - x1, y2 - y1
-        shot = pyautogui.screenshot(region=(x1, y1, w, h))  # RGB PIL Image
-        frame = cv2.cvtColor(np.array(shot), cv2.COLOR_RGB2BGR)
+        with span("auto.capture"):
+            frame = self._cap().grab((x1, y1, w, h))  # BGR
 
         # # --- DEBUG: her yakalamada aynı dosyaya yaz (timestamp YOK) ---
         # if self.debug_save and cv2 is not None:
@@ -152,77 +206,161 @@ class CollectAndSellService:
         #     except Exception as e:
         #         self.log(f"Debug görüntüsü kaydetme hatası: {e}")
 
-        time.sleep(0.45)
+        if settle > 0:
+            self._sleep(settle)
         return frame
 
-    def _match_and_click_center(self, frame, tpl_path: Path) -> bool:
-        if not tpl_path.exists():
-            self.log(f"Şablon yok: {tpl_path}")
-            return False
-        tpl = cv2.imread(str(tpl_path), cv2.IMREAD_COLOR)
-        if tpl is None:
-            self.log(f"Şablon okunamadı: {tpl_path}")
-            return False
-        res = cv2.matchTemplate(frame, tpl, cv2.TM_CCOEFF_NORMED)
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
-        found = max_val >= self.template_thresh
-        if found:
-            th, tw = tpl.shape[:2]
-            top_left = max_loc
-            cx = self.region_topleft[0] + top_left[0] + tw // 2
-            cy = self.region_topleft[1] + top_left[1] + th // 2
-            pyautogui.moveTo(cx, cy, duration=0)
-            pyautogui.click()
-            self.log(f"Bulundu: {tpl_path.name} (score={max_val:.3f}) → tık: ({cx},{cy})")
-            pyautogui.moveTo(1115, 532, duration=0)
-            return True
-        else:
-            self.log(f"Eşleşme yok ({tpl_path.name}), max={max_val:.3f}")
-            return False
+    def _grab_changed(self, timeout: float = 0.9):
+        """Son eşleştirilen frame'den farklı bir frame bekler. Dönüş: (frame, changed);
+        timeout'ta son frame ve changed=False."""
+        return self._change.wait_change(lambda: self._grab_region(settle=0),
+                                        timeout=timeout, stop=self._stop_event.is_set)
+
+    def _search(self, frame, family: str, templates: list, fn, multi: bool = False) -> list[Hit]:
+        """fn(frame) -> list[Hit]; ısı haritası varsa önce sıcak alt-ROI'larda çalıştırılır
+        (multi=True'da harita partial_multi değilse tüm frame)."""
+        if self.heatmap is None or not templates:
+            return fn(frame)
+        tw = max(t.w for t in templates)
+        th = max(t.h for t in templates)
+        return self.heatmap.search(frame, family, tw, th, fn, multi=multi)
+
+    def _find_best(self, frame, tpl_paths: list[Path], family: str) -> Optional[Hit]:
+        """Tek frame üzerinde ailenin tüm şablonlarını dener; eşiği geçen en iyi hit'i döner."""
+        templates = []
+        for p in tpl_paths:
+            tpl = TEMPLATES.get(p)
+            if tpl is None:
+                self.log(f"Şablon yok/okunamadı: {p}")
+                continue
+            templates.append(tpl)
+        best_seen = [0.0]
+
+        def _fn(f):
+            hit, score = match_best(f, templates, self.template_thresh,
+                                    parallel=self.parallel_match, matcher=self.matcher)
+            best_seen[0] = max(best_seen[0], score)
+            return [hit] if hit else []
+
+        with span("auto.match", family=family) as sp:
+            hits = self._search(frame, family, templates, _fn)
+            sp.note(score=round(best_seen[0], 3), hits=len(hits))
+        if not hits:
+            self.log(f"Eşleşme yok ({family}), max={best_seen[0]:.3f}")
+            return None
+        return max(hits, key=lambda h: h.score)
+
+    def _templates(self, tpl_paths: list[Path]) -> list:
+        return [t for t in (TEMPLATES.get(p) for p in tpl_paths) if t is not None]
+
+    def _find_all(self, frame, tpl_paths: list[Path], family: str) -> list[Hit]:
+        """Tek frame'de ailenin tüm örnekleri (NMS ile tekilleştirilmiş)."""
+        templates = self._templates(tpl_paths)
+        with span("auto.match", family=family) as sp:
+            hits = self._search(frame, family, templates,
+                                lambda f: match_all(f, templates, self.template_thresh), multi=True)
+            sp.note(hits=len(hits), score=round(max((h.score for h in hits), default=0.0), 3))
+        return hits
+
+    def _still_there(self, hit: Hit, tpl_paths: list[Path], pad: int = 3) -> bool:
+        """Planlanan hit'in yerinde hâlâ şablon var mı? (sadece hit çevresindeki küçük ROI yakalanır)"""
+        rx, ry = self.region_topleft
+        x, y = rx + hit.x - pad, ry + hit.y - pad
+        with span("auto.capture"):
+            roi = self._cap().grab((x, y, hit.w + 2 * pad, hit.h + 2 * pad))
+        tpls = [t for t in self._templates(tpl_paths) if t.name == hit.name]
+        with span("auto.match", family="still") as sp:
+            found, score = match_best(roi, tpls, self.template_thresh)
+            sp.note(score=round(score, 3))
+        return found is not None
+
+    def _click_hit(self, hit: Hit):
+        cx, cy = hit.center(self.region_topleft)
+        # tıkla + imleci bölge dışına çek (bir sonraki yakalamayı örtmesin) tek toplu aksiyon
+        with span("auto.click"):
+            self._input().run([("click", cx, cy), ("move", 1115, 532)])
+        self.log(f"Bulundu: {hit.name} (score={hit.score:.3f}) → tık: ({cx},{cy})")
 
     def _press_esc_and_click(self):
-        if keyboard:
-            keyboard.send("esc")
-        time.sleep(0.45)
-        pyautogui.click()
-        time.sleep(0.45)
+        probe = self._probe()
+        before = probe.take()
+        with span("auto.key"):
+            self._input().key("esc")
+        # GUI kapanınca sipariş şablonları kaybolur (eski: sabit 0.45)
+        self._wait(probe.absent(self.green_templates + self.template_paths2, self.template_thresh), 0.45)
+        closed = probe.frame
+        with span("auto.click"):
+            self._input().click()
+        self._wait(probe.replaced_from(closed), 0.45)
 
     def _run_fastsell_blocking(self):
-        worker = FastSellWorker(coords_path=self.coords_path)
+        if self._stop_event.is_set():
+            return
+        # durdurulunca slot sınırında biter (yarıda kalan tık yok)
+        worker = FastSellWorker(coords_path=self.coords_path, should_stop=self._stop_event.is_set)
         try:
-            worker.run()  # blocking
+            with span("auto.fastsell"):
+                worker.run()  # blocking
         except Exception as e:
             self.log(f"FastSell hata: {e}")
 
     def _one_cycle(self) -> bool:
-        self._press_x_and_click()
+        frame = self._press_x_and_click()
         found_any = False
 
-        # GREEN araması ...
-        for gtpl in self.green_templates:
-            frame = self._grab_region()
-            if self._match_and_click_center(frame, gtpl):
-                
-                found_any = True
-                break
-            time.sleep(0.15)
+        # GREEN araması: tek yakalama, dört şablon aynı frame üzerinde
+        self._change.mark(frame)
+        skipped0 = self._change.skipped
+        hit = self._find_best(frame, self.green_templates, "green")
+        if hit:
+            self._click_hit(hit)
+            found_any = True
+            # ekran tepki verene kadar bekle (eski: 0.45 + 0.45 sabit)
+            frame, _ = self._grab_changed()
+        # green yoksa ekran değişmedi → yüzde aynı frame üzerinde aranır
 
-        time.sleep(0.45)
-
-        # YÜZDE araması ...
-        for tpl in self.template_paths2:
-            safety = 0
-            while True:
-                frame = self._grab_region()
-                if not self._match_and_click_center(frame, tpl):
+        # YÜZDE araması: tek yakalamada tüm örnekler bulunur (NMS), tık sırası bu frame'den
+        # planlanır; ekran başına bir yakalama. İlkinden sonraki her hedef tıklanmadan önce
+        # küçük bir ROI ile hâlâ yerinde mi diye doğrulanır, değilse yeniden planlanır.
+        # (eski davranış: şablon başına en fazla 3 tık)
+        # Tıklamalardan sonra ekran değişmediyse tüm bölge yeniden eşleştirilmez: önceki
+        # plan kullanılır, her hedef (ilki dahil) küçük ROI ile yerinde mi diye doğrulanır.
+        limit = 3 * len(self.template_paths2)
+        clicks = 0
+        hits, fresh = None, True
+        while clicks < limit and not self._stop_event.is_set():
+            reused = not fresh and hits is not None
+            if reused:
+                self._change.skip()
+                self.log(f"Ekran değişmedi → önceki yüzde planı ({len(hits)} hedef) doğrulanarak kullanılıyor.")
+            else:
+                hits = self._find_all(frame, self.template_paths2, "yüzde")
+                if not hits:
+                    self.log("Eşleşme yok (yüzde).")
+                    break
+                self.log(f"Yüzde: {len(hits)} hedef planlandı (tek yakalama).")
+            for i, hit in enumerate(hits):
+                if self._stop_event.is_set():
                     break
+                if (i > 0 or reused) and not self._still_there(hit, self.template_paths2):
+                    self.log(f"Plan değişti ({hit.name} yerinde yok) → yeniden yakalanıyor.")
+                    hits = None   # sonraki turda tam eşleştirme
+                    break
+                self._click_hit(hit)
                 found_any = True
-                safety += 1
-                if safety > 2:
-                    self.log(f"Uyarı: {tpl.name} için güvenlik sınırı aşıldı.")
+                clicks += 1
+                if clicks >= limit:
+                    self.log("Uyarı: yüzde için güvenlik sınırı aşıldı.")
                     break
+            if clicks >= limit:
+                break
+            frame, fresh = self._grab_changed()
+
+        skipped = self._change.skipped - skipped0
+        if skipped:
+            self.log(f"Değişmeyen frame nedeniyle atlanan eşleştirme: {skipped} ({self._change.stats()})")
 
-        time.sleep(0.45)
+        # Döngü zaten green/yüzde içermeyen güncel bir frame ile bitti → ek sabit bekleme yok (eski: 0.45)
 
         if not found_any:
             # no_match kolu
@@ -243,7 +381,10 @@ class CollectAndSellService:
             while not self._stop_event.is_set():
                 if not self._one_cycle():   # no_match → sadece break
                     break
-                time.sleep(0.25)
+                self._sleep(0.25)
         finally:
+            if self.heatmap is not None:
+                self.heatmap.save()
+                self.log(self.heatmap.stats())
             self.log("Collect&Sell döngüsü durdu.")  # Thread bitti; FullAuto devam eder.
             
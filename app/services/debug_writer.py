@@ -0,0 +1,97 @@
+"""
+Arka plan debug görüntü yazıcısı.
+
+OCR gibi sıcak yollar PNG encode + disk I/O beklemesin diye görüntüler sınırlı
+bir kuyruğa bırakılır ve ayrı bir thread'de yazılır. Kuyruk doluysa görüntü
+düşürülür (bekleme yok). Her yazımdan sonra klasör saklama politikasına göre
+budanır: en eski dosyalar max_files / max_bytes altına inene kadar silinir.
+"""
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+try:
+    import cv2  # type: ignore
+except Exception:
+    cv2 = None  # type: ignore
+
+
+class DebugWriter:
+    def __init__(self, directory: Path, max_queue: int = 16, max_files: int = 200,
+                 max_bytes: int = 50 * 1024 * 1024, pattern: str = "*.png"):
+        self.directory = Path(directory)
+        self.max_files = int(max_files)
+        self.max_bytes = int(max_bytes)
+        self.pattern = pattern
+        self._q: queue.Queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._files: deque = deque()  # (path, size) — eskiden yeniye
+        self._bytes = 0
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._scan_existing()
+            self._thread = threading.Thread(target=self._run, name="debug-writer", daemon=True)
+            self._thread.start()
+
+    def _scan_existing(self):
+        files = []
+        for p in self.directory.glob(self.pattern):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, p, st.st_size))
+        files.sort()
+        self._files = deque((p, size) for _, p, size in files)
+        self._bytes = sum(size for _, size in self._files)
+
+    def submit(self, name: str, image) -> bool:
+        """Görüntüyü yazım kuyruğuna bırakır. Kuyruk doluysa düşürür ve False döner.
+        Not: çağıran görüntüyü sonradan değiştirecekse kopyasını vermelidir."""
+        if cv2 is None or image is None:
+            return False
+        self._ensure_thread()
+        try:
+            self._q.put_nowait((name, image))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        while True:
+            name, image = self._q.get()
+            path = self.directory / name
+            try:
+                if cv2.imwrite(str(path), image):
+                    self.written += 1
+                    size = os.path.getsize(path)
+                    self._files.append((path, size))
+                    self._bytes += size
+                    self._enforce_retention()
+            except Exception:
+                pass
+
+    def _enforce_retention(self):
+        while self._files and (len(self._files) > self.max_files or self._bytes > self.max_bytes):
+            path, size = self._files.popleft()
+            self._bytes -= size
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> str:
+        return f"debug yazıcı: yazılan={self.written}, düşürülen={self.dropped}, kuyruk={self._q.qsize()}"
@@ -0,0 +1,83 @@
+"""
+Ucuz frame değişim dedektörü.
+
+Yakalanan bölge küçük bir gri imzaya (varsayılan 32x16, INTER_AREA) indirilir
+ve son eşleştirilen frame'in imzasıyla ortalama mutlak fark (MAD) alınır.
+GUI tepki vermediyse (wait_change changed=False) çağıran matchTemplate'i
+tekrar çalıştırmaz, önceki eşleşmeleri kullanır ve skip() ile "atlanan
+eşleştirme" sayacını artırır (sayaç kaçınılan eşleştirme çağrılarını sayar,
+yoklamaları değil).
+"""
+from __future__ import annotations
+
+import time
+from typing import Callable, Optional
+
+try:
+    import cv2        # type: ignore
+    import numpy as np
+except Exception:
+    cv2 = None        # type: ignore
+    np = None         # type: ignore
+
+
+class FrameChangeDetector:
+    def __init__(self, size: tuple[int, int] = (32, 16), threshold: float = 1.5):
+        self.size = size
+        self.threshold = float(threshold)
+        self._ref = None
+        self.checked = 0
+        self.skipped = 0
+
+    def signature(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def _mad(self, sig) -> float:
+        if self._ref is None:
+            return float("inf")
+        return float(np.abs(sig - self._ref).mean())
+
+    def diff(self, frame) -> float:
+        """Referans frame'e göre MAD (0-255); referans yoksa inf."""
+        return self._mad(self.signature(frame))
+
+    def mark(self, frame):
+        """frame'i referans yap (üzerinde eşleştirme yapıldı)."""
+        self._ref = self.signature(frame)
+
+    def reset(self):
+        self._ref = None
+
+    def changed(self, frame) -> bool:
+        """Referanstan farklıysa True döner ve referansı günceller."""
+        self.checked += 1
+        sig = self.signature(frame)
+        if self._mad(sig) > self.threshold:
+            self._ref = sig
+            return True
+        return False
+
+    def skip(self):
+        """Değişmeyen frame yüzünden bir eşleştirme çağrısı yapılmadı."""
+        self.skipped += 1
+
+    def wait_change(self, grab: Callable[[], object], timeout: float, poll: float = 0.05,
+                    stop: Optional[Callable[[], bool]] = None):
+        """Referanstan farklı bir frame gelene kadar grab() eder.
+
+        Dönüş: (frame, changed). timeout dolarsa son frame referans yapılıp
+        changed=False ile döner (çağıran önceki eşleşmeleri yeniden kullanabilir).
+        """
+        t_end = time.monotonic() + max(0.0, float(timeout))
+        while True:
+            frame = grab()
+            if self.changed(frame):
+                return frame, True
+            if time.monotonic() >= t_end or (stop and stop()):
+                self.mark(frame)
+                return frame, False
+            time.sleep(poll)
+
+    def stats(self) -> str:
+        return f"değişim kontrolü={self.checked}, atlanan eşleştirme={self.skipped}"
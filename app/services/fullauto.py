@@ -4,16 +4,6 @@ import threading
 import time
 from pathlib import Path
 from typing import Optional, Tuple, Callable
-import json, os
-try:
-    import pytesseract  # type: ignore
-except Exception:
-    pytesseract = None  # type: ignore
-try:
-    from rapidfuzz import process, fuzz  # type: ignore
-except Exception:
-    process = None
-    fuzz = None
 import unicodedata
 
 # Third-party (optional at import-time)
@@ -28,6 +18,22 @@ except Exception:
     cv2 = None        # type: ignore
     np = None         # type: ignore
 
+from app.profiler import event, span
+from app.selection import SELECTION, SelectionStore
+from .templates import TEMPLATES, ORANGE_TEMPLATE
+from .capture import CaptureBackend, get_capture
+from .frame_change import FrameChangeDetector
+from .waits import FrameProbe, wait_until
+from .matcher import MATCHER, PyramidMatcher, match_all, match_best
+from .heatmap import HEATMAP, SearchHeatmap
+from .debug_writer import DebugWriter
+from .ocr_cache import OCR_CACHE, OcrNameCache
+from .ocr_engine import OcrEngine, get_ocr_engine
+from .glyph_ocr import GLYPH_OCR, GlyphOcr
+from .name_index import NameIndex, NameMatch, build_index, load_catalogue
+from .input_driver import InputDriver, get_input
+from .fullauto_state import BUY, COLLECT, ORANGE, STATE_PATH, FullAutoState
+
 # Local services (package-relative)
 try:
     from .buy_service import BuyService
@@ -39,14 +45,6 @@ try:
 except Exception:
     CollectAndSellService = None  # type: ignore
 
-
-try:
-    import pyautogui
-    pyautogui.FAILSAFE = False
-    pyautogui.PAUSE = 0.05  # küçük global bekleme
-except Exception:
-    pass
-
 class FullAutoService:
     """
     Tam otomatik akış (INSERT ile başlat/durdur):
@@ -62,7 +60,7 @@ class FullAutoService:
         self,
         region_topleft: Tuple[int, int] = (795, 373),
         region_bottomright: Tuple[int, int] = (1121, 519),
-        orange_template: Path = Path("app/data/template/turuncu.png"),
+        orange_template: Path = ORANGE_TEMPLATE,
         template_thresh: float = 0.70,
         post_orange_click: Tuple[int, int] = (887, 428),
         # --- OCR / ROI parametreleri (kullanıcı talebi) ---
@@ -74,11 +72,38 @@ class FullAutoService:
         # --- beklemeler ---
         sleep_short: float = 2.0,
         sleep_long: float = 3.0,
+        # hover sonrası isim tooltip'inin çizilmesini bekleme sınırı (sn)
+        hover_timeout: float = 0.5,
+        # koşul beklemelerinde yakalama aralığı; sleep_short/sleep_long artık üst sınır (timeout)
+        wait_poll: float = 0.03,
         # debug
         ocr_debug_dir: Optional[Path] = Path(__file__).resolve().parents[2] / "app" / "data" / "debug",
+        # OCR debug kaydı: 0 → kapalı, 1 → her okuma, N → her N. okuma (örnekleme)
+        ocr_debug_every: int = 0,
+        ocr_debug_full: bool = False,       # tam ekran + ROI dikdörtgeni de kaydedilsin mi
+        ocr_debug_max_files: int = 200,
+        ocr_debug_max_bytes: int = 50 * 1024 * 1024,
         hotkey: Optional[str] = "insert",
         log_callback: Optional[Callable[[str], None]] = None,
         collect_max_seconds: Optional[float] = None,
+        capture: Optional[CaptureBackend] = None,
+        # coarse-to-fine eşleştirme (None → tam çözünürlük BGR, eski davranış)
+        matcher: Optional[PyramidMatcher] = MATCHER,
+        heatmap: Optional[SearchHeatmap] = HEATMAP,
+        # isim ROI hash'i → kanonik isim önbelleği (None → her seferinde tesseract)
+        ocr_cache: Optional[OcrNameCache] = OCR_CACHE,
+        # OCR motoru (None → varsayılan: süreç içi tesserocr, yoksa pytesseract)
+        ocr_engine: Optional[OcrEngine] = None,
+        # tooltip yazı tipi glif eşleştirici (güven düşükse tesseract'a düşülür; None → kapalı)
+        glyph_ocr: Optional[GlyphOcr] = GLYPH_OCR,
+        # Girdi sürücüsü (None → app.services.input_driver varsayılanı; alt servislere de geçer)
+        input_driver: Optional[InputDriver] = None,
+        # Durum makinesi checkpoint'i (None → sadece bellekte; yeniden başlatınca baştan)
+        state_path: Optional[Path] = STATE_PATH,
+        # Bundan eski checkpoint'ten devam edilmez (saniye; None → sınırsız)
+        state_max_age: Optional[float] = 6 * 3600,
+        # Seçili item'lar (paylaşılan bellek içi store; UI ve BuyService ile aynı)
+        selection: SelectionStore = SELECTION,
     ):
         self.region_topleft = region_topleft
         self.region_bottomright = region_bottomright
@@ -86,6 +111,16 @@ class FullAutoService:
         self.template_thresh = float(template_thresh)
         self.post_orange_click = post_orange_click
         self.collect_max_seconds = collect_max_seconds
+        self.collect_join_timeout = 30.0   # collect thread'inin durmasını bekleme sınırı (sn)
+        self.capture = capture
+        self.matcher = matcher
+        self.heatmap = heatmap
+        self.ocr_cache = ocr_cache
+        self.ocr_engine = ocr_engine
+        self.glyph_ocr = glyph_ocr
+        self.input_driver = input_driver
+        self.selection = selection
+        self._change = FrameChangeDetector()
 
         # --- OCR/ROI ---
         self.name_offset_x = int(name_offset_x)
@@ -95,22 +130,46 @@ class FullAutoService:
         self.ocr_confidence_cutoff = int(ocr_confidence_cutoff)
         self.sleep_short = float(sleep_short)
         self.sleep_long = float(sleep_long)
+        self.hover_timeout = float(hover_timeout)
+        self.wait_poll = float(wait_poll)
         self.ocr_debug_dir = ocr_debug_dir
+        self.ocr_debug_every = max(0, int(ocr_debug_every))
+        self.ocr_debug_full = bool(ocr_debug_full)
         self._ocr_counter = 0
-        # selecteditems.json hazırlığı için state
-        self._orange_prepared = False
-        self._expected_cache = {}
-        self._should_buy_next = True  # ilk turda buy ile başla
+        # Diske yazım OCR gecikmesine dahil olmasın: sınırlı kuyruk + arka plan thread'i + saklama politikası
+        self._debug_writer = DebugWriter(
+            Path(ocr_debug_dir) if ocr_debug_dir else Path("app/data/debug"),
+            max_files=ocr_debug_max_files, max_bytes=ocr_debug_max_bytes, pattern="ocr_*.png",
+        )
+        # durum + selecteditems.json hazırlığı (seçim yedeği, verilen order'lar) checkpoint'te
+        self.state = FullAutoState(state_path, selection_sig=selection.fingerprint)
+        self.state_max_age = state_max_age
+        self._resumed = self.state.load()
+        self._catalogue: Optional[dict] = None       # {item_id: isim}, süreç başına bir kez (arka planda)
+        self._catalogue_thread: Optional[threading.Thread] = None
+        self._selection_index: Optional[NameIndex] = None   # 1. aşama: sadece seçim isimleri
+        self._name_index: Optional[NameIndex] = None        # 2. aşama: katalog + seçim
 
 
         self.log = log_callback or (lambda m: print(f"[fullauto] {m}"))
         self._stop_evt = threading.Event()
+        TEMPLATES.preload([self.orange_template])
         self._thread: Optional[threading.Thread] = None
         self._hotkey = hotkey
 
         # Services
-        self.buy_service = BuyService(log_callback=self.log, hotkey=None) if BuyService else None
-        self.collect_service = CollectAndSellService(log_callback=self.log, hotkey=None) if CollectAndSellService else None
+        self.buy_service = BuyService(log_callback=self.log, hotkey=None,
+                                      input_driver=input_driver, capture=capture,
+                                      selection=selection) if BuyService else None
+        # yeniden başlatmada order'ı verilmiş item'lar tekrar alınmaz
+        if self.buy_service is not None:
+            self.buy_service.skip_item = self.state.is_bought
+            self.buy_service.on_item_done = self.state.mark_bought
+        self.collect_service = CollectAndSellService(log_callback=self.log, hotkey=None, capture=capture, matcher=matcher,
+                                                     heatmap=heatmap, input_driver=input_driver) if CollectAndSellService else None
+        # buy order limiti dolunca bekleme süresinde collect/sell turu koşulur
+        if self.buy_service is not None and self.collect_service is not None:
+            self.buy_service.on_idle = self._idle_collect
 
         # Hotkey register (optional)
         try:
@@ -125,17 +184,32 @@ class FullAutoService:
     def start(self):
         if self._thread and self._thread.is_alive():
             return
-        if pyautogui is None or cv2 is None or np is None:
+        if self._input() is None or cv2 is None or np is None:
             self.log("Gerekli modüller yok (pyautogui/cv2/numpy). Başlatılamadı.")
             return
         if self.buy_service is None or self.collect_service is None:
             self.log("Gerekli servisler import edilemedi. Başlatılamadı.")
             return
         self._stop_evt.clear()
+        self._check_checkpoint()
+        self._prefetch_catalogue()
         self._thread = threading.Thread(target=self._main_loop, name="fullauto", daemon=True)
         self._thread.start()
         self.log("FullAuto başladı.")
 
+    def _check_checkpoint(self):
+        """Elle başlatmada checkpoint hâlâ bu çalışmaya ait mi; değilse yedek atılır, BUY'dan başlanır."""
+        reason = self.state.stale_reason(self.selection.fingerprint(), self.state_max_age)
+        if reason:
+            self.log(f"Checkpoint kullanılmıyor ({reason}); tur baştan başlıyor.")
+            self.state.reset()
+            self._selection_index = None
+            self._name_index = None
+            self._resumed = False
+        else:
+            self._resumed = bool(self.state.saved_at)
+            self.state.set_clean_stop(False)
+
     def stop(self):
         if self._thread and self._thread.is_alive():
             self._stop_evt.set()
@@ -160,38 +234,54 @@ class FullAutoService:
 
     # ---------- Internals ----------
     def _sleep(self, t: float = 2.0):
-        time.sleep(max(0.0, float(t)))
+        with span("auto.sleep"):
+            time.sleep(max(0.0, float(t)))
+
+    def _cap(self) -> CaptureBackend:
+        return self.capture or get_capture()
+
+    def _input(self) -> Optional[InputDriver]:
+        return self.input_driver or get_input()
 
-    def _grab_region(self):
+    def _ocr(self) -> Optional[OcrEngine]:
+        return self.ocr_engine or get_ocr_engine()
+
+    def _wait(self, predicate, timeout: float) -> bool:
+        with span("auto.wait", timeout=timeout) as sp:
+            ok = wait_until(predicate, timeout, poll=self.wait_poll, stop=self._stop_evt.is_set)
+            sp.note(ok=ok)
+        return ok
+
+    def _probe(self) -> FrameProbe:
+        return FrameProbe(lambda: self._grab_region(settle=0))
+
+    def _grab_region(self, settle: float = 0.10):
         x1, y1 = self.region_topleft
         x2, y2 = self.region_bottomright
         w, h = x2 - x1, y2 - y1
-        shot = pyautogui.screenshot(region=(x1, y1, w, h))  # PIL Image (RGB)
-        frame = cv2.cvtColor(np.array(shot), cv2.COLOR_RGB2BGR)
-        self._sleep(0.10)
+        with span("auto.capture"):
+            frame = self._cap().grab((x1, y1, w, h))  # BGR
+        if settle > 0:
+            self._sleep(settle)
         return frame
 
     def _match_center(self, frame, tpl_path: Path):
-        if not tpl_path.exists():
-            self.log(f"Şablon yok: {tpl_path}")
-            return None
-        tpl = cv2.imread(str(tpl_path), cv2.IMREAD_COLOR)
+        tpl = TEMPLATES.get(tpl_path)
         if tpl is None:
-            self.log(f"Şablon okunamadı: {tpl_path}")
+            self.log(f"Şablon yok/okunamadı: {tpl_path}")
             return None
-        res = cv2.matchTemplate(frame, tpl, cv2.TM_CCOEFF_NORMED)
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
-        if max_val >= self.template_thresh:
-            th, tw = tpl.shape[:2]
-            top_left = max_loc
-            cx = self.region_topleft[0] + top_left[0] + tw // 2
-            cy = self.region_topleft[1] + top_left[1] + th // 2
-            return (cx, cy, float(max_val))
+        with span("auto.match", family=tpl.name) as sp:
+            hit, score = match_best(frame, [tpl], self.template_thresh, matcher=self.matcher)
+            sp.note(score=round(score, 3))
+        if hit is not None:
+            cx, cy = hit.center(self.region_topleft)
+            return (cx, cy, hit.score)
         return None
 
     def _click_xy(self, x: int, y: int, label: str = ""):
         # Stabilite için direkt koordinata tıkla (move+click yerine)
-        pyautogui.click(x, y)
+        with span("auto.click"):
+            self._input().click(x, y)
         if label:
             self.log(f"Tık: {label} -> ({x},{y})")
         self._sleep(0.10)  # 0.10–0.15 arası güvenli
@@ -209,21 +299,14 @@ class FullAutoService:
 
 
     # ---------- SelectedItems yardımcıları ----------
-    def _selected_path(self) -> Path:
-        return Path("app/data/selecteditems.json")
-
     def _backup_selected(self) -> dict:
         """
         Cache yapısı:
-        key -> {"amount": int, "orig": str}
+        key -> {"amount": int, "orig": str, "id": str}
         key türetme: lower-case ve boşluksuz varyantlar; fuzzy ve doğrudan eşleşmeler için sağlam.
         """
-        p = self._selected_path()
-        if not p.exists():
-            return {}
         try:
-            data = json.loads(p.read_text(encoding="utf-8"))
-            items = data.get("items") or []
+            items = self.selection.items()
             cache = {}
             for it in items:
                 orig = (it.get("name") or "").strip()
@@ -232,106 +315,129 @@ class FullAutoService:
                     continue
                 k1 = orig.lower().strip()
                 k2 = k1.replace(" ", "")
-                cache[k1] = {"amount": amt, "orig": orig}
-                cache[k2] = {"amount": amt, "orig": orig}
+                entry = {"amount": amt, "orig": orig, "id": (it.get("id") or "").strip()}
+                cache[k1] = entry
+                cache[k2] = entry
             return cache
         except Exception as e:
-            self.log(f"selecteditems.json okunamadı (backup): {e}")
+            self.log(f"Seçim okunamadı (backup): {e}")
             return {}
 
-
+    def _checkpoint_selection(self):
+        """FullAuto'nun kendi seçim değişikliği: diske yaz ve checkpoint'e özetini işle
+        (yoksa çökme sonrası seçim "kullanıcı değiştirmiş" sayılır)."""
+        self.selection.flush()
+        self.state.save()
 
     def _reset_selected(self):
-        p = self._selected_path()
-        p.parent.mkdir(parents=True, exist_ok=True)
-        payload = { "items": [], "saved_at": int(__import__("time").time()) }
-        p.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        self.selection.clear()
+        self._checkpoint_selection()
         self.log("selecteditems.json sıfırlandı (orange phase başlangıcı).")
 
-    def _append_selected(self, name: str, expected_amount: int):
-        p = self._selected_path()
-        try:
-            data = json.loads(p.read_text(encoding="utf-8")) if p.exists() else {"items": []}
-        except Exception:
-            data = {"items": []}
-        items = data.get("items") or []
-        # Aynı isim varsa tekrar eklemeyelim
-        names_lc = { (i.get("name") or "").strip().lower() for i in items }
-        if (name or "").strip().lower() in names_lc:
-            self.log(f"selecteditems.json zaten içeriyor: {name}")
-        else:
-            items.append({"id": "", "name": name, "expected_amount": int(expected_amount)})
-            data["items"] = items
-            data["saved_at"] = int(__import__("time").time())
-            p.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    def _append_selected(self, name: str, expected_amount: int, item_id: str = ""):
+        # Aynı isim varsa tekrar eklemeyelim (kontrol + ekleme store kilidi altında)
+        if self.selection.append(name, expected_amount, item_id):
+            self._checkpoint_selection()
             self.log(f"selecteditems.json eklendi: {name} → {expected_amount}")
+        else:
+            self.log(f"selecteditems.json zaten içeriyor: {name}")
 
     # ---------- OCR yardımcıları ----------
-    def _ensure_debug_dir(self):
-        try:
-            if self.ocr_debug_dir:
-                Path(self.ocr_debug_dir).mkdir(parents=True, exist_ok=True)
-        except Exception as e:
-            self.log(f"Debug dizini oluşturulamadı: {e}")
-    def _ocr_item_name(self, center_x: int, center_y: int) -> str:
-        # ROI (mouse merkezine göre)
-        x = int(center_x + self.name_offset_x)
-        y = int(center_y + self.name_offset_y)
-        w = int(self.name_roi_w)
-        h = int(self.name_roi_h)
-
-        # pyautogui/cv2/np kontrolü
-        if pyautogui is None or cv2 is None or np is None:
-            self.log("OCR: pyautogui/cv2/numpy yok; debug da üretilemedi.")
-            return ""
-
-        # Ekran görüntüsü (ROI + opsiyonel full)
-        roi_shot = pyautogui.screenshot(region=(x, y, w, h))
-        try:
-            full_shot = pyautogui.screenshot()
-        except Exception:
-            full_shot = None
+    def _debug_due(self) -> bool:
+        """Bu OCR çağrısı debug için örneklenecek mi?"""
+        return self.ocr_debug_every > 0 and self._ocr_counter % self.ocr_debug_every == 0
+
+    def _name_rect(self, center_x: int, center_y: int) -> tuple[int, int, int, int]:
+        """İsim ROI'su (mouse merkezine göre): (x, y, w, h)."""
+        return (int(center_x + self.name_offset_x), int(center_y + self.name_offset_y),
+                int(self.name_roi_w), int(self.name_roi_h))
+
+    def _hover(self, x: int, y: int) -> bool:
+        """İmleci item'a götürür ve isim tooltip'i çizilene kadar bekler: ROI hover öncesinden
+        büyük ölçüde değişmeli, yazı içermeli ve art arda iki yakalamada aynı kalmalı.
+        Sürücü hareketten sonra beklemediği için OCR yakalaması ancak bundan sonra yapılır."""
+        rect = self._name_rect(x, y)
+        if cv2 is None or np is None:
+            self._input().move(x, y)
+            return False
+        name_probe = FrameProbe(lambda: self._cap().grab(rect))
+        before = name_probe.take()
+        self._input().move(x, y)
+        replaced = name_probe.replaced_from(before, min_frac=0.3)
+
+        def _tooltip():
+            # kutu çizildi (ROI'nin çoğu değişti) ve içinde yazı var (düz zemin değil)
+            if not replaced():
+                return False
+            gray = cv2.cvtColor(name_probe.frame, cv2.COLOR_BGR2GRAY)
+            return float(gray.std()) >= 12.0
+
+        with span("auto.hover"):
+            shown = self._wait(_tooltip, self.hover_timeout)
+            det = FrameChangeDetector()
+            det.mark(name_probe.frame)
+            self._wait(lambda: not det.changed(name_probe.take()), self.hover_timeout)
+        if not shown:
+            self.log(f"Uyarı: isim tooltip'i {self.hover_timeout:.1f} sn içinde görünmedi.")
+        return shown
+
+    def _name_roi(self, center_x: int, center_y: int):
+        """İsim ROI'sunu yakalar ve eşikler. Dönüş: (th, log_bilgisi); araçlar yoksa (None, "")."""
+        x, y, w, h = self._name_rect(center_x, center_y)
+
+        # cv2/np kontrolü
+        if cv2 is None or np is None:
+            self.log("OCR: cv2/numpy yok; debug da üretilemedi.")
+            return None, ""
 
-        frame = cv2.cvtColor(np.array(roi_shot), cv2.COLOR_RGB2BGR)
-        full_frame = cv2.cvtColor(np.array(full_shot), cv2.COLOR_RGB2BGR) if full_shot is not None else None
+        self._ocr_counter += 1
+        debug = self._debug_due()
+
+        # Ekran görüntüsü (ROI; tam ekran sadece debug örneğinde ve istenirse)
+        with span("auto.capture"):
+            cap = self._cap()
+            frame = cap.grab((x, y, w, h))
+            full_frame = None
+            if debug and self.ocr_debug_full:
+                try:
+                    full_frame = cap.grab_full()
+                except Exception:
+                    full_frame = None
 
         # Basit iyileştirme
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         gray = cv2.resize(gray, None, fx=1.5, fy=1.5, interpolation=cv2.INTER_LINEAR)
         _, th = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
 
-        # Debug kayıt (Tesseract olsa da olmasa da KAYDET)
-        self._ensure_debug_dir()
-        self._ocr_counter += 1
-        dbg_dir = Path(self.ocr_debug_dir).resolve() if self.ocr_debug_dir else Path("app/data/debug").resolve()
-        try:
-            dbg_dir.mkdir(parents=True, exist_ok=True)
-        except Exception as e:
-            self.log(f"Debug dizini oluşturulamadı: {e}")
+        # Debug kayıt: sadece örneklenen çağrılarda, arka planda (kuyruk doluysa düşer)
+        dbg = "kapalı"
+        if debug:
+            stem = f"ocr_{time.strftime('%Y%m%d_%H%M%S')}_{self._ocr_counter:04d}"
+            self._debug_writer.submit(f"{stem}_roi_raw.png", frame.copy())
+            self._debug_writer.submit(f"{stem}_roi_th.png", th)
+            if full_frame is not None:
+                cv2.rectangle(full_frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+                self._debug_writer.submit(f"{stem}_screen_annot.png", full_frame)
+            dbg = f"{self._debug_writer.directory / stem}_*.png"
 
-        dbg_raw = (dbg_dir / f"ocr_{self._ocr_counter:04d}_roi_raw.png").resolve()
-        dbg_th  = (dbg_dir / f"ocr_{self._ocr_counter:04d}_roi_th.png").resolve()
-        cv2.imwrite(str(dbg_raw), frame)
-        cv2.imwrite(str(dbg_th), th)
+        return th, f"(ROI x={x},y={y},w={w},h={h}) → debug: {dbg}"
 
-        dbg_full = None
-        if full_frame is not None:
-            try:
-                dbg_full = (dbg_dir / f"ocr_{self._ocr_counter:04d}_screen_annot.png").resolve()
-                cv2.rectangle(full_frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                cv2.imwrite(str(dbg_full), full_frame)
-            except Exception:
-                pass
+    def _ocr_item_name(self, center_x: int, center_y: int, roi=None) -> str:
+        """İsim ROI'sunu tesseract ile okur; roi=(th, log_bilgisi) verilirse yeniden yakalamaz."""
+        th, info = roi if roi is not None else self._name_roi(center_x, center_y)
+        if th is None:
+            return ""
 
         # OCR
         text = ""
-        if pytesseract is None:
-            self.log(f"OCR: pytesseract bulunamadı. Debug kaydedildi → raw:{dbg_raw} th:{dbg_th} screen:{dbg_full}")
+        engine = self._ocr()
+        if engine is None:
+            self.log(f"OCR: tesserocr/pytesseract bulunamadı. {info}")
         else:
-            # tek satır + whitelist
-            config = "--psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789 "
+            # tek satır (PSM 7) + whitelist motor başlatılırken ayarlı
             try:
-                text = pytesseract.image_to_string(th, config=config)
+                with span("auto.ocr"):
+                    text = engine.read(th)
             except Exception as e:
                 self.log(f"OCR çalıştırılamadı: {e}")
 
@@ -341,50 +447,91 @@ class FullAutoService:
         text = self._sanitize_name(raw_text)
 
         if text:
-            self.log(f"OCR raw='{raw_text}' → clean='{text}' (ROI x={x},y={y},w={w},h={h}) → raw:{dbg_raw} th:{dbg_th} screen:{dbg_full}")
+            self.log(f"OCR raw='{raw_text}' → clean='{text}' {info}")
         else:
-            self.log(f"OCR boş (raw='{raw_text}') (ROI x={x},y={y},w={w},h={h}) → raw:{dbg_raw} th:{dbg_th} screen:{dbg_full}")
+            self.log(f"OCR boş (raw='{raw_text}') {info}")
 
         return text
 
-    def _fuzzy_fix_name(self, raw: str) -> str:
-        if not raw:
-            return ""
-        if not self._expected_cache:
-            return raw
-
-        # Aranacak denemeler: spaced + raw + nospace (hepsi lower)
-        base = raw.strip()
-        spaced = re.sub(r"(?<=[a-z])(?=[A-Z])", " ", base)
-        spaced = re.sub(r"(?<=[A-Z])(?=[A-Z][a-z])", " ", spaced)
-        spaced = re.sub(r"(?<=[A-Za-z])(?=\d)|(?<=\d)(?=[A-Za-z])", " ", spaced)
-        spaced = re.sub(r"\s+", " ", spaced).strip()
-
-        attempts = [
-            spaced.lower(),
-            base.lower(),
-            spaced.replace(" ", "").lower(),
-            base.replace(" ", "").lower(),
-        ]
-
-        candidates = list(self._expected_cache.keys())
+    def _read_name_twice(self, x: int, y: int, roi) -> tuple[str, object, bool]:
+        """Tesseract ile iki kez oku (ikincisi yeni yakalama), ikisi aynıysa onu, değilse uzun olanı al.
+        Dönüş: (metin, metni veren eşiklenmiş ROI, iki okuma aynı kanonik isme mi çözüldü).
+        Önbelleğe/atlasa sadece iki okuma örtüştüğünde, metni veren ROI ile yazılmalı."""
+        name_raw1 = self._ocr_item_name(x, y, roi)
+        self._sleep(0.2)
+        roi2 = self._name_roi(x, y)
+        name_raw2 = self._ocr_item_name(x, y, roi2)
+        m1, m2 = self._resolve_name(name_raw1), self._resolve_name(name_raw2)
+        agree = bool(m1 and m2 and m1.name.strip().lower() == m2.name.strip().lower())
+        if name_raw2 and (name_raw2 == name_raw1 or len(name_raw2) > len(name_raw1 or "")):
+            return name_raw2, roi2[0], agree
+        return name_raw1, roi[0], agree
+
+    def _prefetch_catalogue(self):
+        """Katalog (disk ya da API) otomasyon thread'ini bekletmesin: arka planda bir kez yüklenir."""
+        if self._catalogue is not None or (self._catalogue_thread and self._catalogue_thread.is_alive()):
+            return
 
+        def _load():
+            with span("auto.catalogue"):
+                cat = load_catalogue()
+            if self._catalogue is None:
+                self._catalogue = cat
+                self._name_index = None   # seçimle birlikte ilk ihtiyaçta kurulur
+                self.log(f"Katalog hazır: {len(cat)} isim")
+
+        self._catalogue_thread = threading.Thread(target=_load, name="fullauto-catalogue", daemon=True)
+        self._catalogue_thread.start()
+
+    def _selection_entries(self) -> list[tuple[str, str]]:
+        return sorted({(v.get("id") or "", v["orig"]) for v in self.state.expected_cache.values()})
+
+    def _build_name_index(self):
+        """Seçim isimlerinden 1. aşama indeksi; katalog indeksi katalog hazır olunca ilk ihtiyaçta kurulur."""
+        selection = self._selection_entries()
+        self._selection_index = NameIndex(selection)
+        self._name_index = None
+        self.log(f"İsim indeksi: seçim {len(selection)} isim"
+                 + (f", katalog {len(self._catalogue)}" if self._catalogue is not None else ", katalog yükleniyor"))
+
+    def _catalogue_index(self) -> Optional[NameIndex]:
+        if self._name_index is None and self._catalogue is not None:
+            self._name_index = build_index(self._selection_entries(), catalogue=self._catalogue)
+        return self._name_index
+
+    def _resolve_name(self, raw: str) -> Optional[NameMatch]:
+        """OCR metnini (item_id, kanonik isim, skor)'a çözer; eşiği geçen yoksa None.
+        Önce sadece seçim isimlerinde (eşikte), bulunamazsa katalog + seçim indeksinde aranır."""
+        if not raw or self._selection_index is None:
+            return None
         try:
-            if process and fuzz:
-                for a in attempts:
-                    match = process.extractOne(a, candidates, scorer=fuzz.WRatio)
-                    if match and match[1] >= self.ocr_confidence_cutoff:
-                        hit = match[0]
-                        orig_name = self._expected_cache.get(hit, {}).get("orig") or base
-                        self.log(f"Fuzzy eşleşme: '{raw}' -> '{orig_name}' (score={match[1]})")
-                        return orig_name
+            with span("auto.fuzzy"):
+                match = self._selection_index.resolve(raw, cutoff=self.ocr_confidence_cutoff)
+                if match is None:
+                    index = self._catalogue_index()
+                    if index is not None:
+                        match = index.resolve(raw, cutoff=self.ocr_confidence_cutoff)
         except Exception as e:
             self.log(f"Fuzzy hata: {e}")
+            return None
+        if match and match.score < 100:
+            self.log(f"Fuzzy eşleşme: '{raw}' -> '{match.name}' (score={match.score:.0f})")
+        return match
+
+    def _fuzzy_fix_name(self, raw: str) -> str:
+        match = self._resolve_name(raw)
+        return match.name if match else (raw or "")
 
-        return raw
 
+    def _idle_collect(self, budget: float):
+        """BuyService order limiti beklerken çağırır: bütçe kadar collect/sell turu."""
+        if self._stop_evt.is_set():
+            return
+        self.log(f"Buy limiti beklemesinde collect/sell turu (≤ {budget:.0f} sn)...")
+        self._run_collect_blocking(max_seconds=budget)
 
-    def _run_collect_blocking(self):
+    def _run_collect_blocking(self, max_seconds: Optional[float] = None):
+        limit = self.collect_max_seconds if max_seconds is None else max_seconds
         try:
             self.collect_service.start()
             t0 = time.time()
@@ -393,22 +540,144 @@ class FullAutoService:
                 alive = bool(th and th.is_alive())
                 if not alive or self._stop_evt.is_set():
                     break
-                if self.collect_max_seconds is not None and (time.time() - t0) > float(self.collect_max_seconds):
+                if limit is not None and (time.time() - t0) > float(limit):
                     self.log("Collect&Sell süre sınırı aşıldı, durduruluyor...")
-                    self.collect_service.stop()
                     break
                 self._sleep(0.4)
         except Exception as e:
             self.log(f"CollectAndSell hata: {e}")
         finally:
+            # thread bitmeden dönülmez: sonraki faz (ya da limit beklemesindeki BuyService)
+            # aynı fare/klavyeyi kullanır; collect adımları ve FastSell durdurmaya slot sınırında uyar
             try:
-                self.collect_service.stop()
+                if not self.collect_service.stop(wait=self.collect_join_timeout):
+                    self.log(f"Uyarı: Collect&Sell {self.collect_join_timeout:.0f} sn içinde durmadı.")
             except Exception:
                 pass
 
 
 
         
+    def _still_there(self, hit, tpl, pad: int = 3) -> bool:
+        """Planlanan hit'in yerinde şablon hâlâ var mı (hit çevresindeki küçük ROI ile)."""
+        rx, ry = self.region_topleft
+        with span("auto.capture"):
+            roi = self._cap().grab((rx + hit.x - pad, ry + hit.y - pad, hit.w + 2 * pad, hit.h + 2 * pad))
+        with span("auto.match", family="still") as sp:
+            found, score = match_best(roi, [tpl], self.template_thresh)
+            sp.note(score=round(score, 3))
+        return found is not None
+
+    def _match_orange(self, frame, tpl) -> list:
+        """Tek yakalamada tüm turuncu item'lar (NMS) → işlem sırası bu frame'den planlanır."""
+        with span("auto.match", family="turuncu") as sp:
+            if tpl is None:
+                hits = []
+            elif self.heatmap is not None:
+                hits = self.heatmap.search(frame, "turuncu", tpl.w, tpl.h,
+                                           lambda f: match_all(f, [tpl], self.template_thresh), multi=True)
+            else:
+                hits = match_all(frame, [tpl], self.template_thresh)
+            sp.note(hits=len(hits), score=round(max((h.score for h in hits), default=0.0), 3))
+        return hits
+
+    def _process_orange_item(self, x: int, y: int, score: float, probe: FrameProbe) -> bool:
+        """Tek turuncu item: hover + OCR, tıkla, post-orange, selecteditems'e ekle.
+        Item eklendiyse True döner."""
+        # 1) Turuncu merkeze tıklama yok, sadece hover (tooltip çizilene kadar beklenir)
+        self._hover(x, y)
+        self.log(f"TURUNCU hover (score={score:.3f}) @ ({x},{y})")
+
+        # 1.5) İsim: önce ROI hash önbelleği, sonra glif eşleştirici (ikisi de tesseract'sız),
+        #      ikisi de sonuç vermezse iki OCR + fuzzy
+        roi = self._name_roi(x, y)
+        cached = self.ocr_cache.get(roi[0]) if self.ocr_cache is not None else None
+        glyph = None
+        src_th, agreed = roi[0], False   # okunan metni veren ROI; tesseract okumaları örtüştü mü
+        if not cached and self.glyph_ocr is not None and roi[0] is not None:
+            with span("auto.glyph"):
+                glyph = self.glyph_ocr.read(roi[0])
+        if cached:
+            self.log(f"OCR önbellek: '{cached}'")
+            name_raw = cached
+        elif glyph:
+            name_raw = glyph
+            self.log(f"Glif OCR: '{glyph}'")
+        else:
+            name_raw, src_th, agreed = self._read_name_twice(x, y, roi)
+
+        # İndeksle çözümle: önce seçim isimleri, olmazsa katalog (aynı anahtarda seçimdeki yazım tercih edilir)
+        match = self._resolve_name(name_raw)
+
+        # Glif okuması, o isim bir kez tesseract ile aynı okunana kadar tek başına kabul edilmez
+        if glyph and not (match and self.glyph_ocr.is_confirmed(match.name)):
+            tess_raw, tess_th, tess_agreed = self._read_name_twice(x, y, roi)
+            tess_match = self._resolve_name(tess_raw)
+            if match and tess_match and match.name.strip().lower() == tess_match.name.strip().lower():
+                self.glyph_ocr.confirm(match.name)
+                self.log(f"Glif OCR doğrulandı: '{match.name}'")
+            else:
+                self.glyph_ocr.reject()
+                self.log(f"Glif OCR doğrulanamadı: '{glyph}' ≠ tesseract '{tess_raw}', tesseract kullanılıyor")
+                glyph, name_raw, match = None, tess_raw, tess_match
+                src_th, agreed = tess_th, tess_agreed
+        name_key = (match.name if match else (name_raw or "")).strip()
+        event("auto.name", source="cache" if cached else "glyph" if glyph else "tesseract",
+              raw=name_raw, name=name_key, score=round(match.score, 1) if match else 0)
+
+        # Cache'ten miktar ve orijinal isim bul
+        ckey = (name_key or "").strip().lower()
+        ckey_ns = ckey.replace(" ", "")
+        cache = self.state.expected_cache
+        hit_cache = cache.get(ckey) or cache.get(ckey_ns)
+        exp = int((hit_cache or {}).get("amount") or 1)
+
+        # Sadece kanonik isme çözülen okumalar önbelleğe girer (ham OCR metni asla); ROI hash'i
+        # metni veren yakalamadan alınır. Tesseract okumaları ancak iki okuma aynı isme
+        # çözüldüyse kaydedilir (tooltip'siz / yarım ROI yanlış isme bağlanmasın).
+        trusted = bool(glyph) or agreed
+        if not cached and hit_cache and hit_cache.get("orig") and src_th is not None:
+            if not trusted:
+                self.log("OCR okumaları örtüşmedi → önbelleğe/atlasa yazılmadı.")
+            else:
+                if self.ocr_cache is not None:
+                    self.ocr_cache.put(src_th, hit_cache["orig"])
+                # tesseract ile çözülen isimlerden glif atlası öğrenilir
+                if not glyph and self.glyph_ocr is not None:
+                    self.glyph_ocr.learn(src_th, hit_cache["orig"])
+
+        # 2) Item hâlâ yerinde mi (UI state) → tıkla → detay ekranı açılana kadar bekle
+        #    (eski: tıklamadan önce ve sonra sabit sleep_short)
+        self._wait(probe.present([self.orange_template], self.template_thresh), self.sleep_short)
+        # tıklanan item'ın yeri (bölge koordinatında, küçük pay ile): detay ekranı açılınca
+        # turuncu şablon oradan kaybolur; hover tooltip'i bu koşulu sağlamaz
+        tpl = TEMPLATES.get(self.orange_template)
+        rx, ry = self.region_topleft
+        spot = None
+        if tpl is not None:
+            spot = (x - rx - tpl.w // 2 - 4, y - ry - tpl.h // 2 - 4, tpl.w + 8, tpl.h + 8)
+        with span("auto.click"):
+            self._input().click()
+        self._wait(probe.absent([self.orange_template], self.template_thresh, roi=spot), self.sleep_short)
+
+        # 3) post-orange klik
+        before = probe.take()
+        px, py = self.post_orange_click
+        self._click_xy(px, py, "post-orange (887,428)")
+
+        # 4) Listeye dönülene kadar bekle: ekranın çoğu değişir (eski: sabit sleep_long)
+        self._wait(probe.replaced_from(before), self.sleep_long)
+
+        # 5) selecteditems.json'a ekleme
+        if name_key:
+            # Cache'ten orijinal isim varsa onu, yoksa OCR'dan geleni yaz
+            to_write = (hit_cache or {}).get("orig") or name_key or name_raw
+            item_id = (hit_cache or {}).get("id") or (match.item_id if match else "")
+            self._append_selected(to_write, exp, item_id)
+            return True
+        self.log("Uyarı: OCR adı boş geldi; bu tur item eklenmedi.")
+        return False
+
     def _orange_phase(self) -> bool:
         """
         Orange phase:
@@ -419,72 +688,78 @@ class FullAutoService:
         True  -> Bu turda en az bir item işlendi/eklendi (birileri önümüze kırmış).
         False -> Bu turda hiçbir item çıkmadı (kırılma yok).
         """
-        changed = False
-
-        # Orange'a ilk giriş: cache hazırla ve json'u temizle
-        if not self._orange_prepared:
-            self._expected_cache = self._backup_selected()
+        # yarıda kalan tur devam ediyorsa önceki eklemeler de sayılır
+        changed = self.state.orange_changed
+
+        # Orange'a ilk giriş: cache hazırla, checkpoint'e yaz, sonra json'u temizle
+        # (sıra önemli: sıfırlamadan sonra çökse bile miktarlar checkpoint'te kalır)
+        if not self.state.orange_prepared:
+            self.state.prepare_orange(self._backup_selected())
+            self._build_name_index()
             self._reset_selected()
-            self._orange_prepared = True
+        elif self._selection_index is None:
+            self._build_name_index()
 
-        self._sleep(self.sleep_short)
+        # turuncu item'lar çizilene kadar bekle (eski: sabit sleep_short)
+        probe = self._probe()
+        self._wait(probe.present([self.orange_template], self.template_thresh), self.sleep_short)
 
+        first = True
+        hits, fresh = None, True
+        tpl = TEMPLATES.get(self.orange_template)
+        skipped0 = self._change.skipped
         while not self._stop_evt.is_set():
-            frame = self._grab_region()
-            hit = self._match_center(frame, self.orange_template)
-            if not hit:
-                self.log("turuncu.png bulunamadı -> Orange aşaması bitti.")
-                pyautogui.moveTo(959, 501, duration=0)
-                pyautogui.click()
-                break
-
-            x, y, score = hit
-
-            # 1) Turuncu merkeze tıklama yok, sadece hover
-            pyautogui.moveTo(x, y, duration=0)
-            self.log(f"TURUNCU hover (score={score:.3f}) @ ({x},{y})")
-
-            # 1.5) OCR: iki kez oku, ikisi aynıysa onu al (dalgalanmayı azalt)
-            name_raw1 = self._ocr_item_name(x, y)
-            self._sleep(0.2)
-            name_raw2 = self._ocr_item_name(x, y)
-            if name_raw2 and name_raw2 == name_raw1:
-                name_raw = name_raw2
+            if first:
+                frame = probe.frame if probe.frame is not None else self._grab_region()
+                self._change.mark(frame)
+                first = False
             else:
-                name_raw = max([name_raw1, name_raw2], key=lambda s: len(s or ""), default=name_raw1)
-
-            # Fuzzy fix (cache'deki orijinal ismi tercih eder)
-            name_key = self._fuzzy_fix_name(name_raw).strip()
-            if not name_key:
-                name_key = (name_raw or "").strip()
-
-            # Cache'ten miktar ve orijinal isim bul
-            ckey = (name_key or "").strip().lower()
-            ckey_ns = ckey.replace(" ", "")
-            hit_cache = self._expected_cache.get(ckey) or self._expected_cache.get(ckey_ns)
-            exp = int((hit_cache or {}).get("amount") or 1)
-
-            # 2) Kısa bekleme (UI state gelsin)
-            self._sleep(self.sleep_short)
-            pyautogui.click()
-            self._sleep(self.sleep_short)
-
-            # 3) post-orange klik
-            px, py = self.post_orange_click
-            self._click_xy(px, py, "post-orange (887,428)")
-
-            # 4) Minik bekleme — 3 sn
-            self._sleep(self.sleep_long)
-
-            # 5) selecteditems.json'a ekleme
-            if name_key:
-                # Cache'ten orijinal isim varsa onu, yoksa OCR'dan geleni yaz
-                to_write = (hit_cache or {}).get("orig") or (name_raw if name_raw else name_key)
-                self._append_selected(to_write, exp)
-                changed = True
+                # önceki item işlendikten sonra ekran değişene kadar eşleştirme yapma
+                frame, fresh = self._change.wait_change(lambda: self._grab_region(settle=0),
+                                                        timeout=1.0, stop=self._stop_evt.is_set)
+            # ekran değişmediyse tüm bölge yeniden eşleştirilmez: önceki plan, her item
+            # (ilki dahil) küçük ROI ile doğrulanarak kullanılır
+            reused = not fresh and hits is not None
+            if reused:
+                self._change.skip()
+                self.log(f"Ekran değişmedi → önceki turuncu planı ({len(hits)} item) doğrulanarak kullanılıyor.")
             else:
-                self.log("Uyarı: OCR adı boş geldi; bu tur item eklenmedi.")
+                hits = self._match_orange(frame, tpl)
+                if not hits:
+                    self.log("turuncu.png bulunamadı -> Orange aşaması bitti.")
+                    with span("auto.click"):
+                        self._input().click(959, 501)
+                    break
+                self.log(f"Turuncu: {len(hits)} item planlandı (tek yakalama).")
 
+            for i, h in enumerate(hits):
+                if self._stop_evt.is_set():
+                    break
+                # ilk item bu frame'de görüldü; sonrakiler (ve eski plandakiler) için sadece küçük ROI ile yerinde mi bak
+                if (i > 0 or reused) and not self._still_there(h, tpl):
+                    self.log(f"Plan değişti (turuncu @ {h.x},{h.y} yok) → yeniden yakalanıyor.")
+                    hits = None   # sonraki turda tam eşleştirme
+                    break
+                x, y = h.center(self.region_topleft)
+                if self._process_orange_item(x, y, h.score, probe):
+                    changed = True
+                    self.state.mark_orange_changed()
+
+        self.selection.flush()
+        if self.heatmap is not None:
+            self.heatmap.save()
+        if self.ocr_cache is not None:
+            self.ocr_cache.save()
+            self.log(self.ocr_cache.stats())
+        engine = self._ocr()
+        if engine is not None and engine.latency()[0]:
+            self.log(engine.stats())
+        if self.glyph_ocr is not None:
+            self.glyph_ocr.save()
+            self.log(self.glyph_ocr.stats())
+        skipped = self._change.skipped - skipped0
+        if skipped:
+            self.log(f"Orange: değişmeyen frame nedeniyle atlanan eşleştirme: {skipped} ({self._change.stats()})")
         return changed
 
 
@@ -495,32 +770,39 @@ class FullAutoService:
             
 
     def _main_loop(self):
+        """Durum makinesi: BUY/COLLECT → ORANGE → (kırılma varsa) BUY, yoksa COLLECT.
+        Durum her geçişte checkpoint'e yazılır; durdurulan faz yeniden başlatınca
+        kaldığı yerden (BUY'da verilmiş order'lar atlanarak) sürer."""
         try:
-            # İlk tur davranışı
-            next_is_buy = bool(getattr(self, "_should_buy_next", True))
+            if self._resumed:
+                self.log(f"Checkpoint'ten devam: {self.state.describe()}")
+                self._resumed = False
 
             while not self._stop_evt.is_set():
-                if next_is_buy:
-                    # Buy
-                    self._run_buy_blocking()
-                    if self._stop_evt.is_set():
-                        break
-                else:
-                    # Collect
-                    self._run_collect_blocking()
+                phase = self.state.phase
+                event("phase", phase=phase, cycle=self.state.cycle)
+                with span(f"phase.{phase}", cycle=self.state.cycle) as sp:
+                    if phase == BUY:
+                        self._run_buy_blocking()
+                    elif phase == COLLECT:
+                        self._run_collect_blocking()
+                    else:
+                        # Orange -> kırılma var mı bak
+                        had_changes = self._orange_phase()
+                        sp.note(changed=bool(had_changes))
+                if phase == ORANGE:
                     if self._stop_evt.is_set():
                         break
-
-                # Orange -> kırılma var mı bak
-                had_changes = self._orange_phase()
+                    # Eğer bu tur kırılma olduysa sırada BUY; olmadıysa COLLECT
+                    self.state.finish_orange(bool(had_changes))
+                    continue
                 if self._stop_evt.is_set():
                     break
-
-                # Eğer bu tur kırılma olduysa sırada BUY; olmadıysa COLLECT
-                next_is_buy = bool(had_changes)
-                self._should_buy_next = next_is_buy
+                self.state.enter(ORANGE)
 
         finally:
+            # kullanıcı durdurduysa sonraki elle başlatma yeni çalışmadır; çökme/kapanışta devam edilir
+            self.state.set_clean_stop(self._stop_evt.is_set())
             self.log("FullAuto durdu.")
             
             
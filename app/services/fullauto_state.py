@@ -0,0 +1,194 @@
+"""
+FullAuto durum makinesi ve kalıcı checkpoint'leri (app/data/fullauto_state.json).
+
+Durumlar:
+
+    BUY ──────────┐
+                  ├──> ORANGE ──(kırılma var)──> BUY
+    COLLECT ──────┘          └──(kırılma yok)──> COLLECT
+
+Her geçişte ve item başına ilerlemede dosya atomik yazılır (tmp + replace).
+Saklananlar:
+  - phase           : çalışılan / sıradaki durum
+  - cycle           : tamamlanan ORANGE sayısı
+  - orange_prepared : seçim yedeği alındı mı (selecteditems.json sıfırlandı mı)
+  - expected_cache  : sıfırlamadan önce alınan isim → miktar/id yedeği
+  - bought          : bu BUY turunda order'ı verilmiş isimler (tekrar verilmez)
+  - orange_changed  : bu ORANGE turunda item eklendi mi
+  - selection_sig   : kayıt anındaki seçimin özeti (SelectionStore.fingerprint)
+  - clean_stop      : son çalışma kullanıcı tarafından durduruldu mu
+
+Süreç çöktüğünde ya da kapatıldığında yeniden başlatınca aynı durumdan,
+verilmiş order'ları tekrarlamadan ve miktarları kaybetmeden devam edilir.
+Checkpoint şu durumlarda geçersizdir ve tur baştan (BUY, yedek yok) başlar
+(stale_reason): seçim checkpoint'tekinden farklı (kullanıcı değiştirmiş),
+son çalışma temiz durdurulmuş (elle yeniden başlatma = yeni çalışma) ya da
+kayıt max_age'den eski.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+STATE_PATH = Path("app/data/fullauto_state.json")
+
+BUY = "buy"
+COLLECT = "collect"
+ORANGE = "orange"
+PHASES = (BUY, COLLECT, ORANGE)
+
+
+def _key(name: str) -> str:
+    return (name or "").strip().lower()
+
+
+class FullAutoState:
+    def __init__(self, path: Optional[Path] = STATE_PATH, selection_sig: Optional[Callable[[], str]] = None):
+        """path=None → sadece bellekte (kalıcılık yok). selection_sig() her kayıtta seçimin özetini verir."""
+        self.path = Path(path) if path else None
+        self._selection_sig = selection_sig
+        self._lock = threading.Lock()
+        self.phase = BUY            # ilk turda buy ile başla
+        self.cycle = 0
+        self.orange_prepared = False
+        self.expected_cache: dict = {}
+        self.bought: list[str] = []
+        self.orange_changed = False
+        self.selection_sig = ""
+        self.clean_stop = False
+        self.saved_at = 0
+
+    # ---------- kalıcılık ----------
+    def load(self) -> bool:
+        """Checkpoint varsa yükler. Dosya yok/bozuksa varsayılanlar kalır, False döner."""
+        if self.path is None:
+            return False
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            return False
+        if not isinstance(data, dict) or data.get("phase") not in PHASES:
+            return False
+        with self._lock:
+            self.phase = data["phase"]
+            self.cycle = int(data.get("cycle") or 0)
+            self.orange_prepared = bool(data.get("orange_prepared"))
+            self.expected_cache = dict(data.get("expected_cache") or {})
+            self.bought = [str(n) for n in data.get("bought") or []]
+            self.orange_changed = bool(data.get("orange_changed"))
+            self.selection_sig = str(data.get("selection_sig") or "")
+            self.clean_stop = bool(data.get("clean_stop"))
+            self.saved_at = int(data.get("saved_at") or 0)
+        return True
+
+    def to_dict(self) -> dict:
+        return {
+            "phase": self.phase,
+            "cycle": self.cycle,
+            "orange_prepared": self.orange_prepared,
+            "expected_cache": self.expected_cache,
+            "bought": self.bought,
+            "orange_changed": self.orange_changed,
+            "selection_sig": self.selection_sig,
+            "clean_stop": self.clean_stop,
+            "saved_at": self.saved_at,
+        }
+
+    def save(self) -> bool:
+        sig = self._selection_sig() if self._selection_sig is not None else None
+        if self.path is None:
+            return True
+        with self._lock:
+            if sig is not None:
+                self.selection_sig = sig
+            self.saved_at = int(time.time())
+            payload = json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(payload, encoding="utf-8")
+            tmp.replace(self.path)
+            return True
+        except Exception:
+            return False
+
+    # ---------- geçerlilik ----------
+    def stale_reason(self, selection_sig: Optional[str] = None, max_age: Optional[float] = None) -> Optional[str]:
+        """Checkpoint'ten devam edilmemeli ise nedeni; devam edilebilirse None."""
+        if not self.saved_at:
+            return None     # checkpoint yok: zaten baştan
+        if self.clean_stop:
+            return "son çalışma durdurulmuştu"
+        if max_age is not None and time.time() - self.saved_at > max_age:
+            return f"checkpoint {(time.time() - self.saved_at) / 3600:.1f} saat önce yazılmış"
+        if selection_sig is not None and selection_sig != self.selection_sig:
+            return "seçim checkpoint'ten sonra değişmiş"
+        return None
+
+    def reset(self):
+        """Yeni çalışma: BUY'dan, seçim yedeği ve tur içi ilerleme olmadan başla ve kaydet."""
+        with self._lock:
+            self.phase = BUY
+            self.cycle = 0
+            self.orange_prepared = False
+            self.expected_cache = {}
+            self.bought = []
+            self.orange_changed = False
+            self.clean_stop = False
+        self.save()
+
+    def set_clean_stop(self, clean: bool):
+        with self._lock:
+            self.clean_stop = bool(clean)
+        self.save()
+
+    # ---------- geçişler ----------
+    def enter(self, phase: str):
+        """Yeni duruma geç (tur içi ilerleme sıfırlanır) ve kaydet."""
+        if phase not in PHASES:
+            raise ValueError(f"bilinmeyen durum: {phase}")
+        with self._lock:
+            if phase == BUY:
+                self.bought = []
+            if phase == ORANGE:
+                self.orange_changed = False
+            self.phase = phase
+        self.save()
+
+    def finish_orange(self, changed: bool) -> str:
+        """ORANGE bitti: kırılma varsa BUY, yoksa COLLECT. Sıradaki durumu döner."""
+        with self._lock:
+            self.cycle += 1
+        nxt = BUY if changed else COLLECT
+        self.enter(nxt)
+        return nxt
+
+    def prepare_orange(self, expected_cache: dict):
+        """Seçim yedeğini kaydet; selecteditems.json ancak bundan sonra sıfırlanmalı."""
+        with self._lock:
+            self.expected_cache = dict(expected_cache)
+            self.orange_prepared = True
+        self.save()
+
+    # ---------- item ilerlemesi ----------
+    def is_bought(self, name: str) -> bool:
+        with self._lock:
+            return _key(name) in {_key(n) for n in self.bought}
+
+    def mark_bought(self, name: str):
+        with self._lock:
+            if _key(name) not in {_key(n) for n in self.bought}:
+                self.bought.append(name)
+        self.save()
+
+    def mark_orange_changed(self):
+        if not self.orange_changed:
+            self.orange_changed = True
+            self.save()
+
+    def describe(self) -> str:
+        extra = f", {len(self.bought)} order verildi" if self.phase == BUY and self.bought else ""
+        return f"durum={self.phase}, tur={self.cycle}{extra}"
@@ -0,0 +1,327 @@
+"""
+Tooltip yazı tipi için glif eşleştirici (tesseract'sız isim okuma).
+
+İsim tooltip'i sabit bir bitmap yazı tipiyle çizilir; genel amaçlı LSTM OCR
+burada hem yavaş hem hataya açık. Eşiklenmiş ROI'da:
+
+  1) yazı satırı bulunur (mürekkepli satırların en büyük bandı),
+  2) boş sütunlarla glif sütunlarına bölünür; geniş boşluk = kelime arası,
+  3) her glif sıkı kutusuna kırpılıp 8x10 bit haritaya indirilir; satıra göre
+     üst/alt konumu ve genişliği (satır yüksekliğine oranla) eklenir
+     (o/O, l/I gibi aynı şekilli glifler bu sayede ayrılır),
+  4) atlas ile tek numpy işleminde karşılaştırılır.
+
+Atlas iki kaynaktan dolar:
+  - öğrenme: tesseract + fuzzy ile kanonik isme çözülen okumalarda glif sayısı
+    isimdeki karakter sayısına eşitse her glif o karaktere örnek olarak eklenir,
+  - opsiyonel font sayfası (Minecraft ascii.png: 16x16 hücre, kod noktası sırası);
+    geometri segment() ile aynı tanımlanır (sayfanın üst çizgisi + taban çizgisi).
+
+recognize() (metin, güven) döner; güven en zayıf glifin benzerliğidir.
+Çağıran güven eşiğin altındaysa tesseract'a düşer. Güvenli okuma da, o isim bir
+kez tesseract ile doğrulanana (confirm) kadar tek başına kabul edilmemelidir:
+is_confirmed() False ise çağıran tesseract ile karşılaştırır. Atlas ve
+doğrulanmış isimler app/data/glyphs.json'a atomik yazılır.
+"""
+from __future__ import annotations
+
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Optional
+
+try:
+    import cv2        # type: ignore
+    import numpy as np
+except Exception:
+    cv2 = None        # type: ignore
+    np = None         # type: ignore
+
+GLYPH_ATLAS_PATH = Path("app/data/glyphs.json")
+FONT_SHEET_PATH = Path("app/data/font/ascii.png")
+
+GLYPH_SIZE = (8, 10)   # (w, h) bit haritası
+ATLAS_VERSION = 2      # geometri tanımı değişince eski atlaslar okunmaz
+CHARSET = set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789")
+
+
+class _Line:
+    """Segmentasyon sonucu: glif bitleri, geometri ve glifler arası boşluklar."""
+    __slots__ = ("bits", "geom", "gaps", "height")
+
+    def __init__(self, bits, geom, gaps, height):
+        self.bits = bits      # (n, 80) bool
+        self.geom = geom      # (n, 3) float: üst, alt, genişlik (satır yüksekliğine oranla)
+        self.gaps = gaps      # (n-1,) float: glifler arası boşluk / satır yüksekliği
+        self.height = height
+
+
+def _ink(th):
+    """Yazı açık (True) olacak şekilde bool maske."""
+    m = th > 127
+    return m if m.sum() * 2 < m.size else ~m
+
+
+def _key(name: str) -> str:
+    return (name or "").strip().lower()
+
+
+def _glyph_features(mask, x0: int, x1: int, y0: int, y1: int, line_top: float, height: float):
+    """Sıkı kutudaki glifin bit haritası ve (üst, alt, genişlik) geometrisi (satır yüksekliğine oranla).
+    segment() ve font sayfası aynı tanımı kullanır."""
+    g = mask[y0:y1, x0:x1].astype(np.uint8) * 255
+    small = cv2.resize(g, GLYPH_SIZE, interpolation=cv2.INTER_AREA)
+    bits = (small > 127).reshape(-1)
+    return bits, ((y0 - line_top) / height, (y1 - line_top) / height, (x1 - x0) / height)
+
+
+def _line_metrics(boxes) -> tuple[int, float]:
+    """(üst çizgi, yükseklik): üst = en yüksek glif, taban = gliflerin çoğunun bittiği satır
+    (kuyruklu harfler aşağı taşar)."""
+    line_top = min(b[2] for b in boxes)
+    bottoms = [b[3] for b in boxes]
+    baseline = max(set(bottoms), key=bottoms.count)
+    return line_top, float(max(1, baseline - line_top))
+
+
+def segment(th, min_ink: int = 3) -> Optional[_Line]:
+    """Eşiklenmiş tek satırlık ROI'yu gliflere böler; yazı yoksa None."""
+    if np is None or th is None or th.size == 0:
+        return None
+    ink = _ink(th)
+    # satır bandı: mürekkepli ardışık satırların en uzunu (kenarlık/gürültü dışarıda kalır)
+    rows = ink.any(1)
+    best, start = (0, 0), None
+    for i, r in enumerate(list(rows) + [False]):
+        if r and start is None:
+            start = i
+        elif not r and start is not None:
+            if i - start > best[1] - best[0]:
+                best = (start, i)
+            start = None
+    if best[1] - best[0] < 3:
+        return None
+    band = ink[best[0]:best[1]]
+
+    cols = band.any(0)
+    runs, start = [], None
+    for i, c in enumerate(list(cols) + [False]):
+        if c and start is None:
+            start = i
+        elif not c and start is not None:
+            if band[:, start:i].sum() >= min_ink:
+                runs.append((start, i))
+            start = None
+    if not runs:
+        return None
+
+    boxes = []
+    for x0, x1 in runs:
+        ys = np.where(band[:, x0:x1].any(1))[0]
+        boxes.append((x0, x1, int(ys[0]), int(ys[-1]) + 1))
+    line_top, height = _line_metrics(boxes)
+
+    bits = np.zeros((len(boxes), GLYPH_SIZE[0] * GLYPH_SIZE[1]), dtype=bool)
+    geom = np.zeros((len(boxes), 3), dtype=np.float32)
+    for i, (x0, x1, y0, y1) in enumerate(boxes):
+        bits[i], geom[i] = _glyph_features(band, x0, x1, y0, y1, line_top, height)
+    gaps = np.array([(runs[i + 1][0] - runs[i][1]) / height for i in range(len(runs) - 1)], dtype=np.float32)
+    return _Line(bits, geom, gaps, height)
+
+
+class GlyphOcr:
+    def __init__(self, path: Path = GLYPH_ATLAS_PATH, font_sheet: Optional[Path] = FONT_SHEET_PATH,
+                 samples_per_char: int = 4, space_gap: float = 0.35, geom_weight: float = 0.5,
+                 min_conf: float = 0.85):
+        self.path = Path(path)
+        self.min_conf = float(min_conf)
+        self.samples_per_char = int(samples_per_char)
+        self.space_gap = float(space_gap)
+        self.geom_weight = float(geom_weight)
+        self._glyphs: dict[str, list[tuple[int, float, float, float]]] = {}
+        self._confirmed: set[str] = set()   # glif okuması tesseract ile örtüşmüş isimler
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._matrix = None   # (chars, bits, geom) — atlas değişince yeniden kurulur
+        self.learned = 0
+        self.confident = 0
+        self.low_conf = 0
+        self.rejected = 0
+        self._load()
+        if font_sheet is not None and not self._glyphs:
+            self.load_font_sheet(Path(font_sheet))
+
+    # ---------- persistence ----------
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if tuple(data.get("glyph_size") or ()) != GLYPH_SIZE or data.get("version") != ATLAS_VERSION:
+                return
+            self.space_gap = float(data.get("space_gap", self.space_gap))
+            self._glyphs = {ch: [(int(b, 16), float(t), float(bt), float(w)) for b, t, bt, w in samples]
+                            for ch, samples in (data.get("glyphs") or {}).items()}
+            self._confirmed = {_key(n) for n in data.get("confirmed") or []}
+        except Exception:
+            self._glyphs = {}
+            self._confirmed = set()
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {
+                "version": ATLAS_VERSION,
+                "glyph_size": list(GLYPH_SIZE),
+                "space_gap": self.space_gap,
+                "glyphs": {ch: [[format(b, "x"), t, bt, w] for b, t, bt, w in samples]
+                           for ch, samples in self._glyphs.items()},
+                "confirmed": sorted(self._confirmed),
+            }
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(json.dumps(payload), encoding="utf-8")
+            tmp.replace(self.path)
+        except Exception:
+            pass
+
+    def load_font_sheet(self, sheet: Path, cell: int = 8) -> int:
+        """Minecraft ascii.png tarzı font sayfasından atlas tohumlar (16x16 hücre, kod noktası sırası).
+        Üst/taban çizgisi tüm karakterlerden segment() ile aynı şekilde bulunur (hücreye göre değil)."""
+        if cv2 is None or not sheet.exists():
+            return 0
+        img = cv2.imread(str(sheet), cv2.IMREAD_UNCHANGED)
+        if img is None:
+            return 0
+        alpha = img[:, :, 3] if img.ndim == 3 and img.shape[2] == 4 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        cells = {}
+        for ch in sorted(CHARSET):
+            code = ord(ch)
+            cy, cx = (code // 16) * cell, (code % 16) * cell
+            g = (alpha[cy:cy + cell, cx:cx + cell] > 127)
+            if not g.any():
+                continue
+            xs = np.where(g.any(0))[0]
+            ys = np.where(g.any(1))[0]
+            cells[ch] = (g, (int(xs[0]), int(xs[-1]) + 1, int(ys[0]), int(ys[-1]) + 1))
+        if not cells:
+            return 0
+        # hücreler aynı satırda çizilmiş gibi: ortak üst çizgi ve taban çizgisi
+        line_top, height = _line_metrics([box for _, box in cells.values()])
+        added = 0
+        with self._lock:
+            for ch, (g, box) in cells.items():
+                bits, (t, bt, w) = _glyph_features(g, *box, line_top, height)
+                key = int.from_bytes(np.packbits(bits).tobytes(), "big")
+                self._glyphs.setdefault(ch, []).append((key, float(t), float(bt), float(w)))
+                added += 1
+            if added:
+                self._matrix = None
+                self._dirty = True
+        return added
+
+    # ---------- learning ----------
+    def learn(self, th, name: str) -> bool:
+        """Kanonik isim bilinen bir ROI'dan glif örnekleri öğrenir.
+        Segmentasyon isimdeki karakter sayısıyla örtüşmezse hiçbir şey eklenmez."""
+        text = re.sub(r"[^A-Za-z0-9 ]+", " ", name or "")
+        words = text.split()
+        chars = "".join(words)
+        line = segment(th)
+        if line is None or not chars or len(line.bits) != len(chars):
+            return False
+        # boşlukların hangi glif aralarında olduğu isimden bilinir → eşiği güncelle
+        space_idx, i = set(), 0
+        for w in words[:-1]:
+            i += len(w)
+            space_idx.add(i - 1)
+        inner = [g for k, g in enumerate(line.gaps) if k not in space_idx]
+        spaces = [g for k, g in enumerate(line.gaps) if k in space_idx]
+        with self._lock:
+            if inner and spaces and max(inner) < min(spaces):
+                self.space_gap = float((max(inner) + min(spaces)) / 2)
+            for ch, b, g in zip(chars, line.bits, line.geom):
+                key = int.from_bytes(np.packbits(b).tobytes(), "big")
+                samples = self._glyphs.setdefault(ch, [])
+                if any(s[0] == key for s in samples):
+                    continue
+                samples.append((key, float(g[0]), float(g[1]), float(g[2])))
+                del samples[:-self.samples_per_char]
+            self._matrix = None
+            self._dirty = True
+            self.learned += 1
+        return True
+
+    # ---------- recognition ----------
+    def _atlas(self):
+        if self._matrix is None:
+            chars, bits, geom = [], [], []
+            nbits = GLYPH_SIZE[0] * GLYPH_SIZE[1]
+            for ch, samples in self._glyphs.items():
+                for b, t, bt, w in samples:
+                    chars.append(ch)
+                    bits.append(np.unpackbits(np.frombuffer(b.to_bytes(nbits // 8, "big"), dtype=np.uint8)).astype(bool))
+                    geom.append((t, bt, w))
+            if not chars:
+                return None
+            self._matrix = (chars, np.array(bits), np.array(geom, dtype=np.float32))
+        return self._matrix
+
+    def recognize(self, th) -> tuple[str, float]:
+        """(metin, güven 0-1). Atlas boşsa veya yazı yoksa ("", 0.0)."""
+        if np is None:
+            return "", 0.0
+        line = segment(th)
+        with self._lock:
+            atlas = self._atlas()
+            space_gap = self.space_gap
+        if line is None or atlas is None:
+            return "", 0.0
+        chars, abits, ageom = atlas
+        # (glif, atlas) uzaklık: bit farkı oranı + geometri farkı
+        dist = (line.bits[:, None, :] != abits[None, :, :]).mean(-1)
+        dist = dist + self.geom_weight * np.abs(line.geom[:, None, :] - ageom[None, :, :]).mean(-1)
+        best = dist.argmin(1)
+        conf = float(max(0.0, 1.0 - dist[np.arange(len(best)), best].max()))
+        out = []
+        for i, j in enumerate(best):
+            if i and line.gaps[i - 1] > space_gap:
+                out.append(" ")
+            out.append(chars[j])
+        return "".join(out), conf
+
+    def read(self, th) -> Optional[str]:
+        """Güven min_conf üstündeyse metni döner; değilse None (çağıran tesseract'a düşer)."""
+        text, conf = self.recognize(th)
+        if text and conf >= self.min_conf:
+            self.confident += 1
+            return text
+        self.low_conf += 1
+        return None
+
+    # ---------- doğrulama ----------
+    def is_confirmed(self, name: str) -> bool:
+        """Bu isim daha önce glif + tesseract ile aynı okundu mu."""
+        with self._lock:
+            return _key(name) in self._confirmed
+
+    def confirm(self, name: str):
+        with self._lock:
+            if _key(name) and _key(name) not in self._confirmed:
+                self._confirmed.add(_key(name))
+                self._dirty = True
+
+    def reject(self):
+        """Glif okuması tesseract ile örtüşmedi (sayaç)."""
+        self.rejected += 1
+
+    def stats(self) -> str:
+        return (f"glif OCR: atlas={sum(len(v) for v in self._glyphs.values())} örnek/"
+                f"{len(self._glyphs)} karakter, öğrenilen isim={self.learned}, "
+                f"doğrulanmış isim={len(self._confirmed)}, güvenli={self.confident}, "
+                f"reddedilen={self.rejected}, tesseract'a düşen={self.low_conf}")
+
+
+GLYPH_OCR = GlyphOcr()
@@ -0,0 +1,143 @@
+"""
+Öğrenilen arama bölgesi ısı haritası.
+
+Green / yüzde / turuncu isabetleri yakalama bölgesi içinde birkaç sabit slot
+konumunda çıkar. Her isabetin merkezi `cell` piksellik ızgarada sayılır ve
+diske yazılır. Isınmış bir aile için arama önce en sıcak hücrelerin çevresindeki
+küçük alt-ROI'larda yapılır; orada hiçbir şey bulunamazsa tüm bölgeye düşülür.
+
+Çok-örnekli arama (match_all, multi=True) varsayılan olarak her zaman tüm
+bölgede yapılır (tek yakalamadan çıkan plan eksiksiz kalsın); harita sadece
+öğrenir. partial_multi=True ile çok-örnekli aramada da sadece sıcak hücrelerde
+bulunanlar döner: soğuk hücrelerdeki item'lar, sıcak bölgeler boşalıp tüm
+bölge aramasına düşülene kadar (sonraki yakalamalarda) görünmez.
+
+Harita dosyası ilk kullanımda okunur (import sırasında disk I/O yok).
+"""
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Callable
+
+from .matcher import Hit, nms, reading_order
+
+HEATMAP_PATH = Path("app/data/heatmap.json")
+
+
+class SearchHeatmap:
+    def __init__(self, path: Path = HEATMAP_PATH, cell: int = 16, top_k: int = 6,
+                 min_hits: int = 5, pad: int = 4, save_every: int = 20,
+                 # True → match_all'da sadece sıcak hücre isabetleri (plan kısmi olabilir)
+                 partial_multi: bool = False):
+        self.path = Path(path)
+        self.cell = int(cell)
+        self.top_k = int(top_k)
+        self.min_hits = int(min_hits)
+        self.pad = int(pad)
+        self.save_every = int(save_every)
+        self.partial_multi = bool(partial_multi)
+        self._counts: dict[str, dict[str, int]] = {}
+        self._dirty = 0
+        self._lock = threading.Lock()
+        self.hot_hits = 0
+        self.full_searches = 0
+        self._loaded = False
+
+    # ---------- persistence ----------
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            counts = {}
+            if int(data.get("cell", self.cell)) == self.cell:
+                counts = {k: {c: int(n) for c, n in v.items()} for k, v in (data.get("families") or {}).items()}
+        except Exception:
+            counts = {}
+        with self._lock:
+            if not self._loaded:
+                # yüklenmeden önce kaydedilen isabetler korunur
+                for fam, cells in self._counts.items():
+                    dst = counts.setdefault(fam, {})
+                    for c, n in cells.items():
+                        dst[c] = dst.get(c, 0) + n
+                self._counts = counts
+                self._loaded = True
+
+    def save(self):
+        self._ensure_loaded()
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {"cell": self.cell, "families": self._counts}
+            self._dirty = 0
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(json.dumps(payload), encoding="utf-8")
+            tmp.replace(self.path)
+        except Exception:
+            pass
+
+    # ---------- learning ----------
+    def record(self, family: str, hits: list[Hit]):
+        if not hits:
+            return
+        with self._lock:
+            fam = self._counts.setdefault(family, {})
+            for h in hits:
+                cx, cy = h.x + h.w // 2, h.y + h.h // 2
+                key = f"{cx // self.cell},{cy // self.cell}"
+                fam[key] = fam.get(key, 0) + 1
+            self._dirty += len(hits)
+            flush = self._dirty >= self.save_every
+        if flush:
+            self.save()
+
+    def hot_rois(self, family: str, tpl_w: int, tpl_h: int, frame_w: int, frame_h: int) -> list[tuple[int, int, int, int]]:
+        """Isınmış aile için en sıcak hücrelerin çevresindeki alt-ROI'lar (x0, y0, x1, y1)."""
+        self._ensure_loaded()
+        with self._lock:
+            fam = dict(self._counts.get(family) or {})
+        if sum(fam.values()) < self.min_hits:
+            return []
+        rois = []
+        for key, _ in sorted(fam.items(), key=lambda kv: -kv[1])[:self.top_k]:
+            gx, gy = (int(v) for v in key.split(","))
+            # hücre içindeki her merkez için şablonun tamamı ROI'ya sığmalı
+            x0 = max(0, gx * self.cell - tpl_w // 2 - self.pad)
+            y0 = max(0, gy * self.cell - tpl_h // 2 - self.pad)
+            x1 = min(frame_w, (gx + 1) * self.cell + tpl_w // 2 + self.pad)
+            y1 = min(frame_h, (gy + 1) * self.cell + tpl_h // 2 + self.pad)
+            if x1 - x0 >= tpl_w and y1 - y0 >= tpl_h:
+                rois.append((x0, y0, x1, y1))
+        return rois
+
+    # ---------- search ----------
+    def search(self, frame, family: str, tpl_w: int, tpl_h: int,
+               fn: Callable[[object], list[Hit]], multi: bool = False) -> list[Hit]:
+        """fn(alt_frame) -> list[Hit] önce sıcak alt-ROI'larda, boş kalırsa tüm frame'de çalıştırılır.
+        multi=True (tüm örnekler isteniyor) ve partial_multi kapalıysa doğrudan tüm frame aranır.
+        Dönen Hit koordinatları her zaman tam frame'e göredir; bulunanlar haritaya işlenir."""
+        fh, fw = frame.shape[:2]
+        found: list[Hit] = []
+        rois = [] if multi and not self.partial_multi else self.hot_rois(family, tpl_w, tpl_h, fw, fh)
+        for x0, y0, x1, y1 in rois:
+            for h in fn(frame[y0:y1, x0:x1]):
+                found.append(h._replace(x=h.x + x0, y=h.y + y0))
+        if found:
+            self.hot_hits += 1
+            found = reading_order(nms(found))
+        else:
+            self.full_searches += 1
+            found = fn(frame)
+        self.record(family, found)
+        return found
+
+    def stats(self) -> str:
+        return f"ısı haritası: sıcak isabet={self.hot_hits}, tam bölge arama={self.full_searches}"
+
+
+HEATMAP = SearchHeatmap()
@@ -0,0 +1,197 @@
+"""
+Girdi (fare / klavye) sürücü katmanı.
+
+Servisler tıklama ve tuşları doğrudan pyautogui / keyboard yerine buradan
+gönderir. Backend'ler:
+
+  - PyAutoGuiDriver : fare pyautogui ile (global PAUSE=0; bekleme sürücünün
+                      `pause` ayarıyla, aksiyon başına bir kez), tuşlar ve
+                      hızlı metin girişi keyboard ile (keyboard yoksa
+                      pyautogui.write, karakter arası bekleme yok)
+  - NullDriver      : dry-run; hiçbir cihaza göndermez, aksiyonları zaman
+                      damgasıyla listeler (girdi maliyeti / sırası ölçümü)
+
+Toplu API: run([("click", x, y), ("key", "esc"), ("type", "Emerald")])
+aksiyonları arada bekleme olmadan sırayla gönderir ve tek span'de ölçer.
+
+Varsayılan sürücü BAZAAR_INPUT ortam değişkeniyle seçilir: "pyautogui" veya
+"null"; verilmezse pyautogui (import edilemezse None).
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Iterable, Optional
+
+from app.profiler import span
+
+Action = tuple  # ("move", x, y) | ("click",) | ("click", x, y) | ("key", name) | ("type", text)
+
+
+class InputDriver:
+    name = "base"
+
+    def __init__(self, pause: float = 0.0):
+        self.pause = float(pause)
+        self.counts: dict[str, int] = {}
+
+    # --- backend'e özgü ilkel işlemler ---
+    def _move(self, x: int, y: int):
+        raise NotImplementedError
+
+    def _click(self, x: Optional[int], y: Optional[int]):
+        raise NotImplementedError
+
+    def _key(self, name: str):
+        raise NotImplementedError
+
+    def _type(self, text: str):
+        raise NotImplementedError
+
+    # --- public API ---
+    def _do(self, kind: str, args: tuple):
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        if kind == "move":
+            self._move(*args)
+        elif kind == "click":
+            self._click(*(args or (None, None)))
+        elif kind == "key":
+            self._key(*args)
+        elif kind == "type":
+            self._type(*args)
+        else:
+            raise ValueError(f"bilinmeyen girdi aksiyonu: {kind}")
+
+    def _after(self):
+        if self.pause > 0:
+            time.sleep(self.pause)
+
+    def move(self, x: int, y: int):
+        with span("input.move", x=int(x), y=int(y)):
+            self._do("move", (int(x), int(y)))
+        self._after()
+
+    def click(self, x: Optional[int] = None, y: Optional[int] = None):
+        """(x, y) verilirse oraya gidip tıklar; verilmezse imlecin olduğu yere."""
+        with span("input.click", x=x, y=y):
+            self._do("click", (int(x), int(y)) if x is not None else ())
+        self._after()
+
+    def key(self, name: str):
+        with span("input.key", key=name):
+            self._do("key", (name,))
+        self._after()
+
+    def type_text(self, text: str):
+        """Hızlı metin girişi (karakter arası bekleme yok)."""
+        with span("input.type", chars=len(str(text))):
+            self._do("type", (str(text),))
+        self._after()
+
+    def run(self, actions: Iterable[Action]):
+        """Aksiyonları arada bekleme olmadan sırayla gönderir (pause en sonda bir kez)."""
+        actions = list(actions)
+        with span("input.batch", kinds=[a[0] for a in actions]):
+            for a in actions:
+                self._do(a[0], tuple(a[1:]))
+        self._after()
+
+    def stats(self) -> str:
+        parts = ", ".join(f"{k}={v}" for k, v in sorted(self.counts.items()))
+        return f"girdi {self.name}: {parts or '-'}"
+
+
+class PyAutoGuiDriver(InputDriver):
+    name = "pyautogui"
+
+    def __init__(self, pause: float = 0.0):
+        import pyautogui  # type: ignore
+        try:
+            import keyboard  # type: ignore
+        except Exception:
+            keyboard = None  # type: ignore
+        super().__init__(pause=pause)
+        self._pg = pyautogui
+        self._kb = keyboard
+        # her pyautogui çağrısına eklenen global bekleme yerine sürücünün pause'u kullanılır
+        pyautogui.PAUSE = 0.0
+        pyautogui.FAILSAFE = False
+
+    def _move(self, x, y):
+        self._pg.moveTo(x, y, duration=0)
+
+    def _click(self, x, y):
+        if x is None:
+            self._pg.click()
+        else:
+            self._pg.click(x, y)
+
+    def _key(self, name):
+        if self._kb is not None:
+            self._kb.send(name)
+        else:
+            self._pg.press(name)
+
+    def _type(self, text):
+        if self._kb is not None:
+            self._kb.write(text, delay=0)
+        else:
+            self._pg.write(text, interval=0)
+
+
+class NullDriver(InputDriver):
+    """Dry-run: aksiyonlar (t, tür, argümanlar) olarak kaydedilir, cihaza gitmez."""
+    name = "null"
+
+    def __init__(self, pause: float = 0.0, keep: int = 10_000):
+        super().__init__(pause=pause)
+        self.keep = int(keep)
+        self.actions: list[tuple[float, str, tuple]] = []
+        self._t0 = time.perf_counter()
+
+    def _log(self, kind, args):
+        if len(self.actions) < self.keep:
+            self.actions.append((time.perf_counter() - self._t0, kind, args))
+
+    def _move(self, x, y):
+        self._log("move", (x, y))
+
+    def _click(self, x, y):
+        self._log("click", () if x is None else (x, y))
+
+    def _key(self, name):
+        self._log("key", (name,))
+
+    def _type(self, text):
+        self._log("type", (text,))
+
+
+def make_input(spec: Optional[str] = None) -> Optional[InputDriver]:
+    spec = (spec if spec is not None else os.environ.get("BAZAAR_INPUT", "")).strip()
+    if spec == "null":
+        return NullDriver()
+    try:
+        return PyAutoGuiDriver()
+    except Exception:
+        return None
+
+
+_DEFAULT: Optional[InputDriver] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_input() -> Optional[InputDriver]:
+    global _DEFAULT
+    if _DEFAULT is None:
+        with _DEFAULT_LOCK:
+            if _DEFAULT is None:
+                _DEFAULT = make_input()
+    return _DEFAULT
+
+
+def set_input(driver: Optional[InputDriver]):
+    """Varsayılan sürücüyü değiştirir (None → bir sonraki get_input'ta yeniden seçilir)."""
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        _DEFAULT = driver
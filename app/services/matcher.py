@@ -0,0 +1,339 @@
+"""
+Template eşleştirme yardımcıları.
+
+Tek bir yakalanmış frame üzerinde bir şablon ailesinin (green1-4, yuzde1-3 ...)
+tamamı değerlendirilir; ailenin en iyi sonucu Hit olarak döner. cv2.matchTemplate
+GIL'i bıraktığı için aile üyeleri istenirse thread havuzunda paralel koşturulur.
+
+PyramidMatcher: önce küçültülmüş gri piramit seviyesinde arar, sadece aday
+tepelerin çevresini tam çözünürlükte doğrular (coarse-to-fine). Aday
+doğrulanamazsa varsayılan fallback ("auto") sadece kaba seviyede doğrulanmamış
+aday tepe kaldıysa (max_candidates doldu) tam çözünürlük aramaya döner. Kaba
+skoru thresh - slack üstündeki tüm tepeler tam çözünürlükte reddedildiyse
+ıska kabul edilir (güvenli ıska) — şablon ekranda yokken tam arama yapılmaz.
+Hız/recall ölçümü:
+
+    python -m app.services.matcher bench <frame_klasörü> [--level 1] [--region x,y,w,h]
+
+Varsayılan olarak klasördeki tam ekran yakalamalar (*screen*.png) kullanılır;
+bölgeden küçük frame'ler (OCR ROI kırpıntıları) atlanır.
+"""
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+try:
+    import cv2        # type: ignore
+    import numpy as np
+except Exception:
+    cv2 = None        # type: ignore
+    np = None         # type: ignore
+
+from .templates import Template
+
+_POOL: Optional[ThreadPoolExecutor] = None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        _POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="matcher")
+    return _POOL
+
+
+class Hit(NamedTuple):
+    name: str
+    x: int      # frame içi sol-üst
+    y: int
+    w: int
+    h: int
+    score: float
+
+    def center(self, origin: tuple[int, int] = (0, 0)) -> tuple[int, int]:
+        """Ekran koordinatında merkez (origin = yakalanan bölgenin sol-üstü)."""
+        return origin[0] + self.x + self.w // 2, origin[1] + self.y + self.h // 2
+
+
+def match_template(frame, tpl: Template) -> Hit:
+    """Tam çözünürlük, BGR, TM_CCOEFF_NORMED; en iyi konumu döner (eşik uygulanmaz)."""
+    res = cv2.matchTemplate(frame, tpl.bgr, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(res)
+    return Hit(tpl.name, int(max_loc[0]), int(max_loc[1]), tpl.w, tpl.h, float(max_val))
+
+
+class FramePyramid:
+    """Bir frame'in gri piramit seviyeleri; aynı frame'de birden çok şablon
+    denenirken dönüşümler bir kez yapılsın diye tembel hesaplanır."""
+
+    __slots__ = ("bgr", "_levels")
+
+    def __init__(self, frame):
+        self.bgr = frame
+        self._levels = []
+
+    def level(self, i: int):
+        if not self._levels:
+            self._levels.append(cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY))
+        while len(self._levels) <= i:
+            self._levels.append(cv2.pyrDown(self._levels[-1]))
+        return self._levels[i]
+
+
+class PyramidMatcher:
+    """Coarse-to-fine eşleştirici.
+
+    level          : kaba arama seviyesi (1 → yarı çözünürlük)
+    slack          : kaba seviyede aday eşiği = thresh - slack
+    max_candidates : doğrulanacak en fazla tepe sayısı
+    pad            : tam çözünürlük doğrulama penceresi payı (piksel)
+    refine         : "bgr" (eski skorlarla birebir) veya "gray"
+    fallback       : "auto" → aday sınırı dolduysa (doğrulanmamış tepe kaldıysa) tam
+                     çözünürlük arama; aday eşiği üstündeki tepeler tükendiyse ıska,
+                     "full" → her ıskada tam çözünürlük BGR arama,
+                     "none" → kaba sonuç neyse o (en hızlı, recall düşebilir)
+    min_size       : şablonun kaba seviyedeki en küçük kenarı bundan küçükse
+                     piramit atlanır, doğrudan tam çözünürlük aranır
+    """
+
+    def __init__(self, level: int = 1, slack: float = 0.15, max_candidates: int = 3, pad: int = 4,
+                 refine: str = "bgr", fallback: str = "auto", min_size: int = 5):
+        self.level = int(level)
+        self.slack = float(slack)
+        self.max_candidates = int(max_candidates)
+        self.pad = int(pad)
+        self.refine = refine
+        self.fallback = fallback
+        self.min_size = int(min_size)
+        self.coarse_hits = 0
+        self.fallbacks = 0
+        self.coarse_misses = 0
+
+    def _refine_at(self, pyr: FramePyramid, tpl: Template, x: int, y: int) -> Hit:
+        fh, fw = pyr.bgr.shape[:2]
+        x0, y0 = max(0, x - self.pad), max(0, y - self.pad)
+        x1, y1 = min(fw, x + tpl.w + self.pad), min(fh, y + tpl.h + self.pad)
+        if self.refine == "gray":
+            win, t = pyr.level(0)[y0:y1, x0:x1], tpl.gray
+        else:
+            win, t = pyr.bgr[y0:y1, x0:x1], tpl.bgr
+        if win.shape[0] < tpl.h or win.shape[1] < tpl.w:
+            return Hit(tpl.name, x, y, tpl.w, tpl.h, -1.0)
+        res = cv2.matchTemplate(win, t, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        return Hit(tpl.name, x0 + int(max_loc[0]), y0 + int(max_loc[1]), tpl.w, tpl.h, float(max_val))
+
+    def match(self, frame, tpl: Template, thresh: float) -> Hit:
+        pyr = frame if isinstance(frame, FramePyramid) else FramePyramid(frame)
+        lvl = min(self.level, len(tpl.pyramid) - 1)
+        if lvl <= 0 or min(tpl.pyramid[lvl].shape[:2]) < self.min_size:
+            return match_template(pyr.bgr, tpl)
+
+        coarse = pyr.level(lvl)
+        ct = tpl.pyramid[lvl]
+        if coarse.shape[0] < ct.shape[0] or coarse.shape[1] < ct.shape[1]:
+            return match_template(pyr.bgr, tpl)
+        res = cv2.matchTemplate(coarse, ct, cv2.TM_CCOEFF_NORMED)
+
+        # en iyi K tepe (her seçilen tepenin çevresi bastırılır)
+        scale = 1 << lvl
+        cand_thresh = thresh - self.slack
+        ch, cw = ct.shape[:2]
+        best: Optional[Hit] = None
+        exhausted = False   # aday eşiği üstündeki tüm tepeler doğrulandı
+        for _ in range(self.max_candidates):
+            _, val, _, loc = cv2.minMaxLoc(res)
+            if val < cand_thresh:
+                exhausted = True
+                break
+            hit = self._refine_at(pyr, tpl, loc[0] * scale, loc[1] * scale)
+            if best is None or hit.score > best.score:
+                best = hit
+            if best.score >= thresh:
+                break
+            cv2.rectangle(res, (loc[0] - cw // 2, loc[1] - ch // 2), (loc[0] + cw // 2, loc[1] + ch // 2), -1.0, -1)
+
+        if best is not None and best.score >= thresh:
+            self.coarse_hits += 1
+            return best
+        if not exhausted and self.max_candidates > 0:
+            exhausted = float(cv2.minMaxLoc(res)[1]) < cand_thresh
+        if self.fallback == "full" or (self.fallback == "auto" and not exhausted):
+            self.fallbacks += 1
+            return match_template(pyr.bgr, tpl)
+        self.coarse_misses += 1
+        return best or Hit(tpl.name, 0, 0, tpl.w, tpl.h, -1.0)
+
+
+MATCHER = PyramidMatcher()
+
+
+def match_best(frame, templates: list[Template], thresh: float, parallel: bool = False,
+               matcher: Optional[PyramidMatcher] = None) -> tuple[Optional[Hit], float]:
+    """Aynı frame üzerinde tüm şablonları dener.
+
+    matcher verilirse coarse-to-fine (PyramidMatcher), verilmezse tam çözünürlük BGR.
+    Dönüş: (eşiği geçen en iyi Hit veya None, görülen en yüksek skor).
+    """
+    templates = [t for t in templates if t is not None]
+    if not templates:
+        return None, 0.0
+    if matcher is not None:
+        pyr = FramePyramid(frame)
+        if parallel and len(templates) > 1:
+            pyr.level(matcher.level)  # seviyeleri thread'lerden önce hazırla
+            hits = list(_pool().map(lambda t: matcher.match(pyr, t, thresh), templates))
+        else:
+            hits = [matcher.match(pyr, t, thresh) for t in templates]
+    elif parallel and len(templates) > 1:
+        hits = list(_pool().map(lambda t: match_template(frame, t), templates))
+    else:
+        hits = [match_template(frame, t) for t in templates]
+    best = max(hits, key=lambda h: h.score)
+    return (best if best.score >= thresh else None), best.score
+
+
+def _iou(a: Hit, b: Hit) -> float:
+    ix = max(0, min(a.x + a.w, b.x + b.w) - max(a.x, b.x))
+    iy = max(0, min(a.y + a.h, b.y + b.h) - max(a.y, b.y))
+    inter = ix * iy
+    union = a.w * a.h + b.w * b.h - inter
+    return inter / union if union else 0.0
+
+
+def nms(hits: list[Hit], iou: float = 0.3) -> list[Hit]:
+    """Greedy non-maximum suppression: skora göre sıralı, örtüşenleri atar."""
+    kept: list[Hit] = []
+    for h in sorted(hits, key=lambda h: -h.score):
+        if all(_iou(h, k) <= iou for k in kept):
+            kept.append(h)
+    return kept
+
+
+def match_all(frame, templates: list[Template], thresh: float, iou: float = 0.3, max_hits: int = 64) -> list[Hit]:
+    """Tek frame'de şablonların eşiği geçen TÜM örneklerini döner (tek sonuç haritası + NMS).
+
+    Farklı şablonların aynı yeri bulması da NMS ile tekilleştirilir.
+    Sonuç okuma sırasına göre (üstten alta, soldan sağa) sıralanır.
+    """
+    cands: list[Hit] = []
+    for tpl in templates:
+        if tpl is None:
+            continue
+        res = cv2.matchTemplate(frame, tpl.bgr, cv2.TM_CCOEFF_NORMED)
+        ys, xs = np.where(res >= thresh)
+        if len(xs) > max_hits * 16:
+            # aşırı geniş plato: en iyi adaylarla sınırla
+            order = np.argsort(res[ys, xs])[::-1][:max_hits * 16]
+            ys, xs = ys[order], xs[order]
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            cands.append(Hit(tpl.name, x, y, tpl.w, tpl.h, float(res[y, x])))
+    return reading_order(nms(cands, iou)[:max_hits])
+
+
+def reading_order(hits: list[Hit]) -> list[Hit]:
+    """Üstten alta, soldan sağa (aynı satırdaki küçük y farkları yok sayılır)."""
+    return sorted(hits, key=lambda h: (h.y // max(1, h.h // 2), h.x))
+
+
+# ---------- benchmark: hız + recall (kayıtlı frame'ler üzerinde) ----------
+def bench(frames: list, templates: list[Template], thresh: float, matcher: PyramidMatcher,
+          repeat: int = 5) -> dict:
+    """Tam çözünürlük aramayı referans alıp PyramidMatcher'ın hızını ve recall'ünü ölçer.
+
+    recall   : referansın eşiği geçtiği (frame, şablon) çiftlerinden piramidin
+               ±2 px içinde bulduklarının oranı
+    false_pos: referansın bulmadığı ama piramidin eşiği geçtiği çift sayısı
+    """
+    ref_t = pyr_t = 0.0
+    positives = found = false_pos = 0
+    for frame in frames:
+        for tpl in templates:
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                ref = match_template(frame, tpl)
+            t1 = time.perf_counter()
+            for _ in range(repeat):
+                got = matcher.match(frame, tpl, thresh)
+            t2 = time.perf_counter()
+            ref_t += t1 - t0
+            pyr_t += t2 - t1
+            if ref.score >= thresh:
+                positives += 1
+                if got.score >= thresh and abs(got.x - ref.x) <= 2 and abs(got.y - ref.y) <= 2:
+                    found += 1
+            elif got.score >= thresh:
+                false_pos += 1
+    n = max(1, len(frames) * len(templates) * repeat)
+    return {
+        "pairs": len(frames) * len(templates),
+        "full_ms": ref_t / n * 1000,
+        "pyramid_ms": pyr_t / n * 1000,
+        "speedup": (ref_t / pyr_t) if pyr_t else 0.0,
+        "positives": positives,
+        "recall": (found / positives) if positives else 1.0,
+        "false_pos": false_pos,
+        "coarse_hits": matcher.coarse_hits,
+        "fallbacks": matcher.fallbacks,
+        "coarse_misses": matcher.coarse_misses,
+    }
+
+
+def _main(argv=None):
+    import argparse
+    from pathlib import Path
+    from .templates import TEMPLATES, GREEN_TEMPLATES, YUZDE_TEMPLATES, ORANGE_TEMPLATE
+
+    ap = argparse.ArgumentParser(prog="python -m app.services.matcher")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("bench", help="kayıtlı frame'lerde piramit hız/recall ölçümü")
+    b.add_argument("frames", help="PNG frame klasörü")
+    b.add_argument("--pattern", default="*screen*.png",
+                   help="frame dosyaları (varsayılan: OCR debug'ının tam ekran yakalamaları)")
+    b.add_argument("--region", default="795,373,326,146",
+                   help="frame'ler tam ekran ise kırpılacak bölge x,y,w,h (bölge boyutundaki frame'ler kırpılmaz)")
+    b.add_argument("--level", type=int, default=1)
+    b.add_argument("--slack", type=float, default=0.15)
+    b.add_argument("--fallback", choices=["auto", "full", "none"], default="auto")
+    b.add_argument("--refine", choices=["bgr", "gray"], default="bgr")
+    b.add_argument("--candidates", type=int, default=3, help="doğrulanacak en fazla kaba tepe")
+    b.add_argument("--thresh", type=float, default=0.85)
+    b.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    x, y, w, h = (int(v) for v in args.region.split(","))
+    templates = [TEMPLATES.get(p) for p in GREEN_TEMPLATES + YUZDE_TEMPLATES + [ORANGE_TEMPLATE]]
+    templates = [t for t in templates if t is not None]
+    max_tpl_h = max((t.h for t in templates), default=0)
+    max_tpl_w = max((t.w for t in templates), default=0)
+    frames, skipped = [], 0
+    for p in sorted(Path(args.frames).glob(args.pattern)):
+        img = cv2.imread(str(p), cv2.IMREAD_COLOR)
+        if img is None:
+            continue
+        if img.shape[0] > h or img.shape[1] > w:
+            img = img[y:y + h, x:x + w]
+        # bölgeden (veya en büyük şablondan) küçük frame'ler (örn. OCR ROI kırpıntıları) ölçülemez
+        if img.shape[0] < max(h, max_tpl_h) or img.shape[1] < max(w, max_tpl_w):
+            skipped += 1
+            continue
+        frames.append(np.ascontiguousarray(img))
+    if skipped:
+        print(f"{skipped} frame bölgeden küçük olduğu için atlandı")
+    if not frames or not templates:
+        print("frame veya şablon bulunamadı")
+        return 1
+
+    m = PyramidMatcher(level=args.level, slack=args.slack, fallback=args.fallback, refine=args.refine,
+                       max_candidates=args.candidates)
+    r = bench(frames, templates, args.thresh, m, repeat=args.repeat)
+    print(f"frame={len(frames)} şablon={len(templates)} çift={r['pairs']}")
+    print(f"tam: {r['full_ms']:.3f} ms/çift  piramit: {r['pyramid_ms']:.3f} ms/çift  hızlanma: x{r['speedup']:.2f}")
+    print(f"recall: {r['recall']:.3f} ({r['positives']} pozitif)  yanlış pozitif: {r['false_pos']}  "
+          f"kaba isabet: {r['coarse_hits']}  fallback: {r['fallbacks']}  güvenli ıska: {r['coarse_misses']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
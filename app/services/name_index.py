@@ -0,0 +1,165 @@
+"""
+OCR isim çözümleme indeksi.
+
+OCR metnini kanonik item ismine (ve id'sine) çevirir. İndeks bir kez kurulur:
+
+  - katalog: Bazaar'da işlem gören ürünlerin isimleri (bazaar ∩ items meta),
+    app/data/item_catalogue.json'da bir gün saklanır; yoksa API'den çekilir,
+    o da olmazsa son tarama snapshot'ı kullanılır,
+  - seçim: selecteditems.json'daki isimler (katalogda olmasa da bilinir,
+    aynı normalize anahtarda katalog ismini ezer).
+
+Anahtarlar normalize edilir (aksan/noktalama atılır, küçük harf; boşluklu ve
+boşluksuz iki varyant). Çözümlemede önce doğrudan sözlük araması, sonra tüm
+deneme varyantları tek bir rapidfuzz process.cdist çağrısıyla puanlanır.
+"""
+from __future__ import annotations
+
+import json
+import re
+import time
+import unicodedata
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional
+
+try:
+    from rapidfuzz import process, fuzz  # type: ignore
+except Exception:
+    process = None
+    fuzz = None
+
+CATALOGUE_PATH = Path("app/data/item_catalogue.json")
+
+
+class NameMatch(NamedTuple):
+    item_id: str
+    name: str
+    score: float
+
+
+def normalize(s: str) -> str:
+    s = unicodedata.normalize("NFKD", s or "").encode("ASCII", "ignore").decode("ASCII")
+    s = re.sub(r"[^A-Za-z0-9 ]+", " ", s)
+    return re.sub(r"\s+", " ", s).strip().lower()
+
+
+def variants(raw: str) -> list[str]:
+    """OCR metni için deneme varyantları (CamelCase / harf-rakam sınırları ayrılmış, boşluksuz)."""
+    base = (raw or "").strip()
+    spaced = re.sub(r"(?<=[a-z])(?=[A-Z])", " ", base)
+    spaced = re.sub(r"(?<=[A-Z])(?=[A-Z][a-z])", " ", spaced)
+    spaced = re.sub(r"(?<=[A-Za-z])(?=\d)|(?<=\d)(?=[A-Za-z])", " ", spaced)
+    out = []
+    for v in (normalize(spaced), normalize(base)):
+        for a in (v, v.replace(" ", "")):
+            if a and a not in out:
+                out.append(a)
+    return out
+
+
+class NameIndex:
+    def __init__(self, entries: Iterable[tuple[str, str]] = ()):
+        """entries: (item_id, isim) — sonra gelen aynı anahtarı ezer."""
+        self._items: list[tuple[str, str]] = []
+        self._lookup: dict[str, int] = {}
+        for item_id, name in entries:
+            self.add(item_id, name)
+        self._keys: Optional[list[str]] = None
+        self._owners: Optional[list[int]] = None
+
+    def add(self, item_id: str, name: str):
+        key = normalize(name)
+        if not key:
+            return
+        idx = len(self._items)
+        self._items.append((item_id or "", name.strip()))
+        self._lookup[key] = idx
+        self._lookup[key.replace(" ", "")] = idx
+        self._keys = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _choices(self):
+        if self._keys is None:
+            self._keys = list(self._lookup.keys())
+            self._owners = [self._lookup[k] for k in self._keys]
+        return self._keys, self._owners
+
+    def resolve(self, raw: str, cutoff: float = 70) -> Optional[NameMatch]:
+        """OCR metnini en iyi kanonik isme çözer; eşiği geçen yoksa None."""
+        attempts = variants(raw)
+        if not attempts or not self._lookup:
+            return None
+        for a in attempts:
+            idx = self._lookup.get(a)
+            if idx is not None:
+                item_id, name = self._items[idx]
+                return NameMatch(item_id, name, 100.0)
+        if process is None or fuzz is None:
+            return None
+        keys, owners = self._choices()
+        scores = process.cdist(attempts, keys, scorer=fuzz.WRatio, score_cutoff=cutoff)
+        flat = int(scores.argmax())
+        best = float(scores.flat[flat])
+        if best < cutoff:
+            return None
+        item_id, name = self._items[owners[flat % len(keys)]]
+        return NameMatch(item_id, name, best)
+
+
+# ---------- katalog ----------
+def save_catalogue(items: dict[str, str], path: Path = CATALOGUE_PATH) -> bool:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"saved_at": int(time.time()), "items": items}, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
+        return True
+    except Exception:
+        return False
+
+
+def load_catalogue(path: Path = CATALOGUE_PATH, max_age: float = 24 * 3600,
+                   fetch: bool = True) -> dict[str, str]:
+    """{item_id: isim}. Disk kopyası taze değilse API'den çekilir; olmazsa snapshot'a düşülür."""
+    stale: dict[str, str] = {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        stale = dict(data.get("items") or {})
+        if stale and time.time() - float(data.get("saved_at") or 0) <= max_age:
+            return stale
+    except Exception:
+        pass
+    if fetch:
+        try:
+            from app.bazaar import Bazaar
+            bz = Bazaar()
+            products = bz.fetch_bazaar()
+            meta = bz.fetch_items_meta()
+            items = {pid: (meta.get(pid) or {}).get("name", pid) for pid in products}
+            if items:
+                save_catalogue(items, path)
+                return items
+        except Exception:
+            pass
+    if stale:
+        return stale
+    try:
+        from app.snapshot import load_snapshot
+        snap = load_snapshot()
+        if snap:
+            return {r["id"]: r.get("name") or r["id"] for r in snap[1] if r.get("id")}
+    except Exception:
+        pass
+    return {}
+
+
+def build_index(selection: Iterable[tuple[str, str]] = (), catalogue: Optional[dict[str, str]] = None) -> NameIndex:
+    """Katalog + seçim isimlerinden indeks kurar (seçim ismi aynı anahtarda önceliklidir)."""
+    cat = load_catalogue() if catalogue is None else catalogue
+    idx = NameIndex(cat.items())
+    ids = {normalize(n): i for i, n in cat.items()}
+    for item_id, name in selection:
+        idx.add(item_id or ids.get(normalize(name), ""), name)
+    return idx
@@ -0,0 +1,164 @@
+"""
+Algısal hash tabanlı OCR sonuç önbelleği.
+
+Turuncu fazında aynı birkaç item adı tekrar tekrar okunur. Eşiklenmiş isim
+ROI'sunun mürekkep (yazı) kutusu kırpılıp 64x8'e indirilir ve 512 bitlik bir
+ortalama hash'e çevrilir; anahtar (kutu genişliği, hash). Eşleşme Hamming
+mesafesiyle toleranslıdır, böylece 1 px kayma / anti-alias farkı yine isabet
+olur. Değer fuzzy ile çözülmüş kanonik isimdir — ham OCR metni asla saklanmaz.
+
+Yazısı çok az olan ROI'ler (tooltip henüz çizilmemiş / yarım) önbelleğe
+alınmaz: toleranslı eşleşme yüzünden benzer boş arka planlar o isme bağlanırdı.
+
+LRU (OrderedDict) ile sınırlıdır ve app/data/ocr_cache.json'a atomik yazılır.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+try:
+    import cv2        # type: ignore
+    import numpy as np
+except Exception:
+    cv2 = None        # type: ignore
+    np = None         # type: ignore
+
+OCR_CACHE_PATH = Path("app/data/ocr_cache.json")
+
+HASH_SIZE = (64, 8)   # (w, h) → 512 bit
+
+
+def name_hash(th) -> Optional[tuple[int, int]]:
+    """Eşiklenmiş (0/255) isim görüntüsünden (mürekkep genişliği, hash) üretir; yazı yoksa None."""
+    if cv2 is None or th is None or th.size == 0:
+        return None
+    # Otsu sonrası yazı açık (255) olmalı; arka plan çoğunluktaysa ters çevir
+    ink = th if np.count_nonzero(th) * 2 < th.size else cv2.bitwise_not(th)
+    pts = cv2.findNonZero(ink)
+    if pts is None:
+        return None
+    x, y, w, h = cv2.boundingRect(pts)
+    small = cv2.resize(ink[y:y + h, x:x + w], HASH_SIZE, interpolation=cv2.INTER_AREA)
+    bits = np.packbits((small > 127).reshape(-1))
+    return int(w), int.from_bytes(bits.tobytes(), "big")
+
+
+def ink_fraction(th) -> float:
+    """Eşiklenmiş ROI'de yazı (azınlık renk) piksellerinin oranı."""
+    if np is None or th is None or th.size == 0:
+        return 0.0
+    on = np.count_nonzero(th)
+    return min(on, th.size - on) / float(th.size)
+
+
+def _hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class OcrNameCache:
+    def __init__(self, path: Path = OCR_CACHE_PATH, capacity: int = 256,
+                 max_distance: int = 12, width_slack: int = 3, min_ink: float = 0.02):
+        self.path = Path(path)
+        self.capacity = int(capacity)
+        self.max_distance = int(max_distance)
+        self.width_slack = int(width_slack)
+        self.min_ink = float(min_ink)
+        self.rejected = 0
+        self._entries: OrderedDict[tuple[int, int], str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    # ---------- persistence ----------
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if tuple(data.get("hash_size") or ()) != HASH_SIZE:
+                return
+            for w, hx, name in data.get("entries") or []:
+                self._entries[(int(w), int(hx, 16))] = str(name)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        except Exception:
+            self._entries = OrderedDict()
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {
+                "hash_size": list(HASH_SIZE),
+                "entries": [[w, format(h, "x"), name] for (w, h), name in self._entries.items()],
+            }
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(self.path)
+        except Exception:
+            pass
+
+    # ---------- lookup ----------
+    def get(self, th) -> Optional[str]:
+        """Eşiklenmiş ROI için önbellekteki kanonik ismi döner (yoksa None)."""
+        key = name_hash(th)
+        if key is None:
+            return None
+        w, h = key
+        with self._lock:
+            name = self._entries.get(key)
+            if name is None:
+                best = None
+                for (ew, eh), ename in self._entries.items():
+                    if abs(ew - w) > self.width_slack:
+                        continue
+                    d = _hamming(eh, h)
+                    if d <= self.max_distance and (best is None or d < best[0]):
+                        best = (d, (ew, eh), ename)
+                if best:
+                    key, name = best[1], best[2]
+            if name is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return name
+
+    def put(self, th, name: str) -> bool:
+        """Çözülmüş kanonik ismi ROI hash'ine bağlar (LRU; kapasite aşılırsa en eskisi atılır).
+        Yazısı min_ink'ten az olan ROI reddedilir (False)."""
+        key = name_hash(th)
+        if key is None or not name:
+            return False
+        if ink_fraction(th) < self.min_ink:
+            self.rejected += 1
+            return False
+        with self._lock:
+            if self._entries.get(key) == name:
+                self._entries.move_to_end(key)
+                return True
+            self._entries[key] = name
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+            self._dirty = True
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+
+    def stats(self) -> str:
+        return (f"OCR önbelleği: isabet={self.hits}, ıska={self.misses}, kayıt={len(self._entries)}, "
+                f"az yazılı ROI reddi={self.rejected}")
+
+
+OCR_CACHE = OcrNameCache()
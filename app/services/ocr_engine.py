@@ -0,0 +1,185 @@
+"""
+OCR motoru katmanı.
+
+pytesseract her çağrıda bir tesseract süreci başlatır ve görüntüyü geçici
+dosyadan geçirir (ROI başına onlarca ms). Burada motor soyutlanır:
+
+  - TesserocrEngine   : tesserocr (C-API bağlaması); süreç içinde, uzun ömürlü.
+                        Bir kez PSM 7 (tek satır) + whitelist ile başlatılır;
+                        API thread-safe olmadığından çağrılar kilitlenir.
+  - PytesseractEngine : eski yol (fallback).
+
+Her motor ROI başına gecikmesini tutar (stats → p50/p95); profiler açıksa
+"ocr.<motor>" span'i olarak da kaydedilir.
+
+Varsayılan motor BAZAAR_OCR ortam değişkeniyle seçilir: "tesserocr" veya
+"pytesseract"; verilmezse tesserocr varsa o, yoksa pytesseract.
+
+Karşılaştırma: python -m app.services.ocr_engine bench app/data/debug
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from app.profiler import PROFILER
+
+try:
+    import pytesseract  # type: ignore
+except Exception:
+    pytesseract = None  # type: ignore
+
+try:
+    import tesserocr  # type: ignore
+    from PIL import Image  # type: ignore
+except Exception:
+    tesserocr = None  # type: ignore
+    Image = None  # type: ignore
+
+WHITELIST = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789 "
+
+
+class OcrEngine:
+    name = "base"
+
+    def __init__(self, keep: int = 256):
+        self._lat: deque = deque(maxlen=int(keep))
+
+    def _read(self, th) -> str:
+        raise NotImplementedError
+
+    def read(self, th) -> str:
+        """Eşiklenmiş tek satırlık ROI'yu (uint8, 0/255) okur; ham metni döner."""
+        t0 = time.perf_counter()
+        try:
+            return self._read(th)
+        finally:
+            dt = time.perf_counter() - t0
+            self._lat.append(dt)
+            PROFILER.record(f"ocr.{self.name}", dt)
+
+    def close(self):
+        pass
+
+    def latency(self) -> tuple[int, float, float]:
+        """(örnek sayısı, p50, p95) — saniye."""
+        vals = sorted(self._lat)
+        if not vals:
+            return 0, 0.0, 0.0
+        n = len(vals)
+        return n, vals[n // 2], vals[min(n - 1, int(n * 0.95))]
+
+    def stats(self) -> str:
+        n, p50, p95 = self.latency()
+        return f"OCR {self.name}: n={n}, p50={p50 * 1000:.1f} ms, p95={p95 * 1000:.1f} ms"
+
+
+class PytesseractEngine(OcrEngine):
+    name = "pytesseract"
+
+    def __init__(self, **kw):
+        if pytesseract is None:
+            raise RuntimeError("pytesseract yok")
+        super().__init__(**kw)
+        self.config = f"--psm 7 -c tessedit_char_whitelist={WHITELIST}"
+
+    def _read(self, th) -> str:
+        return pytesseract.image_to_string(th, config=self.config)
+
+
+class TesserocrEngine(OcrEngine):
+    name = "tesserocr"
+
+    def __init__(self, lang: str = "eng", **kw):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr yok")
+        super().__init__(**kw)
+        self._lock = threading.Lock()
+        self._api = tesserocr.PyTessBaseAPI(lang=lang, psm=tesserocr.PSM.SINGLE_LINE)
+        self._api.SetVariable("tessedit_char_whitelist", WHITELIST)
+
+    def _read(self, th) -> str:
+        img = Image.fromarray(th)
+        with self._lock:
+            self._api.SetImage(img)
+            return self._api.GetUTF8Text()
+
+    def close(self):
+        with self._lock:
+            if self._api is not None:
+                self._api.End()
+                self._api = None
+
+
+def make_ocr_engine(spec: Optional[str] = None) -> Optional[OcrEngine]:
+    """Motor oluşturur; hiçbir motor kullanılamıyorsa None."""
+    spec = (spec if spec is not None else os.environ.get("BAZAAR_OCR", "")).strip()
+    order = {"tesserocr": [TesserocrEngine, PytesseractEngine],
+             "pytesseract": [PytesseractEngine]}.get(spec, [TesserocrEngine, PytesseractEngine])
+    for cls in order:
+        try:
+            return cls()
+        except Exception:
+            continue
+    return None
+
+
+_DEFAULT: Optional[OcrEngine] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_ocr_engine() -> Optional[OcrEngine]:
+    global _DEFAULT
+    if _DEFAULT is None:
+        with _DEFAULT_LOCK:
+            if _DEFAULT is None:
+                _DEFAULT = make_ocr_engine()
+    return _DEFAULT
+
+
+def set_ocr_engine(engine: Optional[OcrEngine]):
+    """Varsayılan motoru değiştirir (None → bir sonraki get_ocr_engine'de yeniden seçilir)."""
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        _DEFAULT = engine
+
+
+def _main(argv=None):
+    import argparse
+    from pathlib import Path
+    import cv2  # type: ignore
+
+    ap = argparse.ArgumentParser(prog="python -m app.services.ocr_engine")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("bench", help="kayıtlı eşiklenmiş ROI'larda motor gecikmesi")
+    b.add_argument("rois", help="ROI PNG klasörü")
+    b.add_argument("--pattern", default="ocr_*_roi_th.png")
+    b.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    rois = [img for img in (cv2.imread(str(p), cv2.IMREAD_GRAYSCALE)
+                            for p in sorted(Path(args.rois).glob(args.pattern))) if img is not None]
+    if not rois:
+        print("ROI bulunamadı")
+        return 1
+    engines = []
+    for cls in (TesserocrEngine, PytesseractEngine):
+        try:
+            engines.append(cls())
+        except Exception as e:
+            print(f"{cls.name}: kullanılamıyor ({e})")
+    for eng in engines:
+        texts = [eng.read(r).strip() for r in rois]
+        for _ in range(args.repeat - 1):
+            for r in rois:
+                eng.read(r)
+        print(f"{eng.stats()}  (ROI={len(rois)}, boş={sum(1 for t in texts if not t)})")
+        eng.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
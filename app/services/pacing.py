@@ -0,0 +1,118 @@
+"""
+Ölçülen UI tepki süresine göre uyarlanan tıklama temposu (AIMD).
+
+Her tıklamadan önce imleç hedefe götürülür (prepare) ve hover vurgusu/tooltip
+çizilip bölge durulana kadar (en fazla `settle`) beklenir; referans frame ancak
+bundan sonra alınır, böylece imleç hareketi "tepki" sayılmaz. Tıklamadan sonra
+beklenen değişim (done(frame), örn. slot boşaldı; verilmezse referanstan fark)
+görülene kadar (en fazla max_delay) beklenir:
+
+  - değişim görüldü → başarı: bekleme `decrease` kadar azalır (toplamsal)
+  - görülmedi        → kaçırma: bekleme `increase` katına çıkar (çarpımsal)
+
+Bekleme her zaman [min_delay, max_delay] içinde kalır. Tıklama başlangıcından
+itibaren en az `delay` geçmeden bir sonraki tıklamaya izin verilmez. Sunucu
+gecikince tempo hızla düşer, rahatlayınca yavaşça geri kazanılır.
+
+Sınırlar config.json → fastsell.adaptive / min_interval / max_interval;
+başlangıç beklemesi fastsell.interval. adaptive varsayılan olarak kapalıdır
+(sabit interval); açıldığında interval sadece başlangıç değeridir.
+"""
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from app.config import CONFIG, ConfigService
+from app.profiler import span
+from .frame_change import FrameChangeDetector
+from .waits import wait_until
+
+
+class AdaptivePacer:
+    def __init__(self, min_delay: float = 0.05, max_delay: float = 1.0, initial: Optional[float] = None,
+                 decrease: float = 0.02, increase: float = 2.0, poll: float = 0.02, window: int = 50):
+        self.min_delay = float(min_delay)
+        self.max_delay = max(self.min_delay, float(max_delay))
+        self.decrease = float(decrease)
+        self.increase = max(1.0, float(increase))
+        self.poll = float(poll)
+        self.delay = self._clamp(initial if initial is not None else self.max_delay)
+        self._hist: deque = deque(maxlen=int(window))   # (t_başlangıç, başarı, tepki süresi)
+        self.clicks = 0
+        self.misses = 0
+
+    def _clamp(self, v: float) -> float:
+        return min(self.max_delay, max(self.min_delay, float(v)))
+
+    def set_bounds(self, min_delay: float, max_delay: float):
+        self.min_delay = float(min_delay)
+        self.max_delay = max(self.min_delay, float(max_delay))
+        self.delay = self._clamp(self.delay)
+
+    def step(self, act: Callable[[], None], grab: Callable[[], object],
+             stop: Optional[Callable[[], bool]] = None, prepare: Optional[Callable[[], None]] = None,
+             done: Optional[Callable[[object], bool]] = None, settle: float = 0.15) -> bool:
+        """prepare() (imleci hedefe götür) → bölge durulunca referans → act() (tıkla) →
+        done(grab()) ya da referanstan değişim beklenir, tempo güncellenir.
+        Beklenen değişim görüldüyse True (başarılı tıklama)."""
+        det = FrameChangeDetector()
+        t0 = time.monotonic()
+        if prepare is not None:
+            prepare()
+            # hover vurgusu / tooltip çizilsin: art arda iki yakalama aynı olana kadar
+            with span("pacer.settle"):
+                det.mark(grab())
+                wait_until(lambda: not det.changed(grab()), settle, poll=self.poll, stop=stop)
+        det.mark(grab())
+        act()
+        with span("pacer.wait", delay=round(self.delay, 3)) as sp:
+            if done is not None:
+                ok = wait_until(lambda: done(grab()), self.max_delay, poll=self.poll, stop=stop)
+            else:
+                ok = wait_until(lambda: det.changed(grab()), self.max_delay, poll=self.poll, stop=stop)
+            sp.note(ok=ok)
+        rt = time.monotonic() - t0
+        self.clicks += 1
+        if ok:
+            self.delay = self._clamp(self.delay - self.decrease)
+        else:
+            self.misses += 1
+            self.delay = self._clamp(self.delay * self.increase)
+        self._hist.append((t0, ok, rt))
+        rest = self.delay - (time.monotonic() - t0)
+        if rest > 0:
+            with span("pacer.sleep"):
+                time.sleep(rest)
+        return ok
+
+    # ---------- metrikler ----------
+    def clicks_per_sec(self) -> float:
+        """Son pencerede gerçekleşen tıklama hızı."""
+        if len(self._hist) < 2:
+            return 0.0
+        span_s = time.monotonic() - self._hist[0][0]
+        return len(self._hist) / span_s if span_s > 0 else 0.0
+
+    def miss_rate(self) -> float:
+        if not self._hist:
+            return 0.0
+        return sum(1 for _, ok, _ in self._hist if not ok) / len(self._hist)
+
+    def response_p50(self) -> float:
+        rts = sorted(rt for _, ok, rt in self._hist if ok)
+        return rts[len(rts) // 2] if rts else 0.0
+
+    def stats(self) -> str:
+        return (f"tempo: {self.clicks_per_sec():.2f} tık/sn, kaçırma %{self.miss_rate() * 100:.0f}, "
+                f"bekleme={self.delay * 1000:.0f} ms, tepki p50={self.response_p50() * 1000:.0f} ms "
+                f"(toplam {self.clicks} tık, {self.misses} kaçırma)")
+
+
+def make_pacer(config: ConfigService = CONFIG) -> Optional[AdaptivePacer]:
+    """Config'e göre pacer; fastsell.adaptive kapalıysa None (sabit interval)."""
+    adaptive, lo, hi = config.pacing()
+    if not adaptive:
+        return None
+    return AdaptivePacer(min_delay=lo, max_delay=hi, initial=config.interval())
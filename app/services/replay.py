@@ -0,0 +1,443 @@
+"""
+FullAuto döngüsü için kayıt / tekrar oynatma (canlı oyun istemcisi olmadan ölçüm).
+
+Kayıt (python -m app.services.replay record <klasör>):
+  - varsayılan capture backend'i RecordingCapture ile sarılır; her grab()
+    sonucu bölgesi ve zamanıyla, aynı bölgenin bir önceki frame'inden farklıysa
+    PNG olarak (arka planda) yazılır,
+  - varsayılan girdi sürücüsü RecordingInput ile sarılır; her aksiyon (move,
+    click, key, type) gerçek cihaza iletilir ve zamanıyla kaydedilir,
+  - olaylar session.jsonl'a, başlangıçtaki selecteditems.json kopyasıyla yazılır.
+
+Tekrar (python -m app.services.replay run <klasör>):
+  - servis modüllerindeki `time` sanal saatle değiştirilir: sleep anında
+    döner ve saati ilerletir → gerçek zamandan hızlı ve deterministik,
+  - ReplayCapture istenen bölgeyi, kayıt zaman çizelgesinde o anki frame'den
+    (aynı veya kapsayan bölge) kırparak verir,
+  - tıklama / tuşlar yutulur; k. girdi kayıttaki k. girdiyle karşılaştırılır
+    (uyuşmazlık sayılır) ve zaman çizelgesi o girdiye hizalanır, böylece
+    servis kayıttan farklı sürede beklese de ekranın tepkisi doğru sırada gelir,
+  - alt servisler (Buy, Collect&Sell) aynı thread'de çalıştırılır, kalıcı
+    durumlar (ısı haritası, OCR önbelleği, glif atlası, seçim dosyası) geçici
+    klasöre yönlendirilir.
+
+Çıktı: tur başına faz süreleri (sanal = canlıda sürecek süre, gerçek = hesap
+maliyeti), girdi sayısı ve uyuşmazlıklar.
+"""
+from __future__ import annotations
+
+import bisect
+import contextlib
+import json
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+try:
+    import cv2        # type: ignore
+    import numpy as np
+except Exception:
+    cv2 = None        # type: ignore
+    np = None         # type: ignore
+
+from app.selection import SELECTION, SelectionStore
+from .capture import CaptureBackend, get_capture, set_capture
+from .debug_writer import DebugWriter
+from .input_driver import InputDriver, get_input, set_input
+
+SESSION_FILE = "session.jsonl"
+SELECTION_FILE = "selecteditems.json"
+
+# zamanı `time` modülünden okuyan (sanal saatle değiştirilecek) modüller
+TIME_MODULES = ("app.services.fullauto", "app.services.collect_service", "app.services.buy_service",
+                "app.services.waits", "app.services.frame_change", "app.services.input_driver",
+                "app.services.pacing", "app.services.scheduler")
+
+
+class ReplayFinished(BaseException):
+    """Kayıt bitti. BaseException: servislerin `except Exception` blokları yutmasın."""
+
+
+def _modules(names):
+    import importlib
+    return [importlib.import_module(n) for n in names]
+
+
+@contextlib.contextmanager
+def _patched(mods, attr: str, value):
+    old = [(m, getattr(m, attr, None)) for m in mods]
+    for m in mods:
+        setattr(m, attr, value)
+    try:
+        yield
+    finally:
+        for m, v in old:
+            setattr(m, attr, v)
+
+
+# ======================= kayıt =======================
+class SessionRecorder:
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._t0 = time.monotonic()
+        self._lock = threading.Lock()
+        self._fh = (self.directory / SESSION_FILE).open("w", encoding="utf-8")
+        # kayıt frame'leri budanmaz; kuyruk doluysa düşen frame replay'de bir öncekiyle kapanır
+        self._writer = DebugWriter(self.directory, max_queue=256, max_files=10 ** 9,
+                                   max_bytes=10 ** 15, pattern="f_*.png")
+        self._last: dict[tuple, object] = {}
+        self._n = 0
+        self.inputs = 0
+
+    def _event(self, ev: dict):
+        ev["t"] = round(time.monotonic() - self._t0, 4)
+        with self._lock:
+            self._fh.write(json.dumps(ev) + "\n")
+
+    def frame(self, region, img):
+        key = tuple(int(v) for v in region) if region is not None else ("full",)
+        prev = self._last.get(key)
+        if prev is not None and prev.shape == img.shape and np.array_equal(prev, img):
+            return
+        self._last[key] = img.copy()
+        with self._lock:
+            self._n += 1
+            name = f"f_{self._n:06d}.png"
+        if self._writer.submit(name, self._last[key]):
+            self._event({"type": "frame", "region": list(key) if region is not None else None, "file": name})
+
+    def input(self, kind: str, args):
+        self.inputs += 1
+        self._event({"type": "input", "kind": kind, "args": list(args)})
+
+    def close(self):
+        with self._lock:
+            self._fh.close()
+
+    def stats(self) -> str:
+        return f"kayıt: frame={self._n}, girdi={self.inputs}, {self._writer.stats()}"
+
+
+class RecordingCapture(CaptureBackend):
+    name = "recording"
+
+    def __init__(self, inner: CaptureBackend, recorder: SessionRecorder):
+        self.inner = inner
+        self.recorder = recorder
+
+    def grab(self, region):
+        img = self.inner.grab(region)
+        self.recorder.frame(region, img)
+        return img
+
+    def grab_full(self):
+        img = self.inner.grab_full()
+        if img is not None:
+            self.recorder.frame(None, img)
+        return img
+
+
+class RecordingInput(InputDriver):
+    name = "recording"
+
+    def __init__(self, inner: InputDriver, recorder: SessionRecorder):
+        super().__init__(pause=inner.pause)
+        self.inner = inner
+        self.recorder = recorder
+
+    def _do(self, kind, args):
+        self.recorder.input(kind, args)
+        self.inner._do(kind, args)
+
+
+@contextlib.contextmanager
+def recording(directory: Path):
+    """Bu blok içinde yapılan yakalama ve girdiler `directory`'ye kaydedilir."""
+    rec = SessionRecorder(directory)
+    try:
+        SELECTION.flush()
+        shutil.copyfile(SELECTION.path, rec.directory / SELECTION_FILE)
+    except OSError:
+        pass
+    prev_cap, prev_in = get_capture(), get_input()
+    set_capture(RecordingCapture(prev_cap, rec))
+    if prev_in is not None:
+        set_input(RecordingInput(prev_in, rec))
+    try:
+        yield rec
+    finally:
+        set_capture(prev_cap)
+        set_input(prev_in)
+        rec.close()
+
+
+# ======================= tekrar =======================
+class VirtualClock:
+    """`time` modülü yerine geçer: sleep anında döner, saati ilerletir."""
+
+    def __init__(self, limit: float = float("inf")):
+        self.now = 0.0
+        self.limit = float(limit)
+        self.slept = 0.0
+
+    def sleep(self, t):
+        t = max(0.0, float(t))
+        self.now += t
+        self.slept += t
+        if self.now > self.limit:
+            raise ReplayFinished("sanal süre sınırı")
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def time(self):
+        return 1_700_000_000.0 + self.now
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+class ReplaySession:
+    """Kayıtlı olay çizelgesi + girdi hizalaması."""
+
+    def __init__(self, directory: Path, clock: VirtualClock):
+        self.directory = Path(directory)
+        self.clock = clock
+        self.frames: dict[Optional[tuple], tuple[list[float], list[str]]] = {}
+        self.inputs: list[dict] = []
+        for line in (self.directory / SESSION_FILE).read_text(encoding="utf-8").splitlines():
+            ev = json.loads(line)
+            if ev["type"] == "frame":
+                key = tuple(ev["region"]) if ev.get("region") else None
+                ts, files = self.frames.setdefault(key, ([], []))
+                ts.append(float(ev["t"]))
+                files.append(ev["file"])
+            elif ev["type"] == "input":
+                self.inputs.append(ev)
+        self.duration = max([ts[-1] for ts, _ in self.frames.values() if ts] +
+                            [ev["t"] for ev in self.inputs] + [0.0])
+        self._rec_anchor = 0.0    # hizalanan girdinin kayıt zamanı
+        self._virt_anchor = 0.0   # o girdinin sanal zamanı
+        self.cursor = 0
+        self.mismatches = 0
+        self._images: dict[str, object] = {}
+
+    # --- zaman ---
+    def rec_time(self) -> float:
+        return self._rec_anchor + (self.clock.now - self._virt_anchor)
+
+    def on_input(self, kind: str, args):
+        if self.cursor >= len(self.inputs):
+            raise ReplayFinished("kayıttaki girdiler bitti")
+        ev = self.inputs[self.cursor]
+        if (ev["kind"], ev["args"]) != (kind, list(args)):
+            self.mismatches += 1
+        self.cursor += 1
+        self._rec_anchor = float(ev["t"])
+        self._virt_anchor = self.clock.now
+
+    # --- frame ---
+    def _image(self, name: str):
+        img = self._images.get(name)
+        if img is None:
+            img = cv2.imread(str(self.directory / name), cv2.IMREAD_COLOR)
+            if len(self._images) > 64:
+                self._images.pop(next(iter(self._images)))
+            self._images[name] = img
+        return img
+
+    def _frame_at(self, key, t: float):
+        ts, files = self.frames[key]
+        i = bisect.bisect_right(ts, t) - 1
+        return self._image(files[max(0, i)])
+
+    def grab(self, region):
+        t = self.rec_time()
+        x, y, w, h = (int(v) for v in region)
+        if (x, y, w, h) in self.frames:
+            img = self._frame_at((x, y, w, h), t)
+            if img is not None and img.shape[:2] == (h, w):
+                return img
+        # kapsayan bir bölge (veya tam ekran) varsa ondan kırp
+        for key in self.frames:
+            kx, ky, kw, kh = key if key is not None else (0, 0, 10 ** 6, 10 ** 6)
+            if kx <= x and ky <= y and x + w <= kx + kw and y + h <= ky + kh:
+                img = self._frame_at(key, t)
+                if img is not None:
+                    return img[y - ky:y - ky + h, x - kx:x - kx + w].copy()
+        return np.zeros((h, w, 3), dtype=np.uint8)
+
+    def grab_full(self):
+        return self._frame_at(None, self.rec_time()) if None in self.frames else None
+
+
+class ReplayCapture(CaptureBackend):
+    name = "replay"
+
+    def __init__(self, session: ReplaySession):
+        self.session = session
+
+    def grab(self, region):
+        return self.session.grab(region)
+
+    def grab_full(self):
+        return self.session.grab_full()
+
+
+class ReplayInput(InputDriver):
+    """Girdileri yutar; her aksiyonu oturuma bildirir (hizalama + uyuşmazlık)."""
+    name = "replay"
+
+    def __init__(self, session: ReplaySession):
+        super().__init__(pause=0.0)
+        self.session = session
+
+    def _do(self, kind, args):
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        self.session.on_input(kind, args)
+
+
+class Replayer:
+    def __init__(self, directory: Path, max_cycles: Optional[int] = None, log=None):
+        self.directory = Path(directory)
+        self.max_cycles = max_cycles
+        self.log = log or (lambda m: None)
+        self.cycles: list[dict] = []
+
+    def _timed(self, name: str, fn, session: ReplaySession, clock: VirtualClock):
+        def _run(*a, **k):
+            v0, w0, i0 = clock.now, time.perf_counter(), session.cursor
+            try:
+                return fn(*a, **k)
+            finally:
+                self._phase[name] = (clock.now - v0, time.perf_counter() - w0, session.cursor - i0)
+                if name == "orange":
+                    self.cycles.append(dict(self._phase))
+                    self._phase.clear()
+                    if self.max_cycles and len(self.cycles) >= self.max_cycles:
+                        raise ReplayFinished("tur sınırı")
+        return _run
+
+    def run(self) -> dict:
+        from .fullauto import FullAutoService
+        from .heatmap import SearchHeatmap
+        from .ocr_cache import OcrNameCache
+        from .glyph_ocr import GlyphOcr
+        from .name_index import load_catalogue
+
+        clock = VirtualClock()
+        session = ReplaySession(self.directory, clock)
+        clock.limit = session.duration * 3 + 120
+        tmp = Path(tempfile.mkdtemp(prefix="bazaar_replay_"))
+        selected = tmp / SELECTION_FILE
+        src = self.directory / SELECTION_FILE
+        selected.write_text(src.read_text(encoding="utf-8") if src.exists() else '{"items": []}', encoding="utf-8")
+
+        self._phase: dict[str, tuple] = {}
+        w_start = time.perf_counter()
+        with _patched(_modules(TIME_MODULES), "time", clock):
+            svc = FullAutoService(hotkey=None, log_callback=self.log, capture=ReplayCapture(session),
+                                  heatmap=SearchHeatmap(path=tmp / "heatmap.json"),
+                                  ocr_cache=OcrNameCache(path=tmp / "ocr_cache.json"),
+                                  glyph_ocr=GlyphOcr(path=tmp / "glyphs.json", font_sheet=None),
+                                  ocr_debug_every=0, input_driver=ReplayInput(session),
+                                  state_path=tmp / "fullauto_state.json",
+                                  selection=SelectionStore(selected, debounce=0))
+            svc.collect_service.heatmap = svc.heatmap
+            svc._catalogue = load_catalogue(fetch=False)
+            buy, collect = svc.buy_service, svc.collect_service
+
+            # alt servisler aynı thread'de (sanal saat tek akışla ilerlesin)
+            def _buy():
+                buy._stop_evt.clear()
+                buy._run()
+
+            def _collect(max_seconds=None):
+                collect._stop_event.clear()
+                collect._loop_body()
+
+            svc._run_buy_blocking = self._timed("buy", _buy, session, clock)
+            svc._run_collect_blocking = self._timed("collect", _collect, session, clock)
+            svc._orange_phase = self._timed("orange", svc._orange_phase, session, clock)
+            reason = "döngü bitti"
+            try:
+                svc._main_loop()
+            except ReplayFinished as e:
+                reason = str(e)
+        shutil.rmtree(tmp, ignore_errors=True)
+        return {
+            "reason": reason,
+            "cycles": self.cycles,
+            "virtual_s": clock.now,
+            "wall_s": time.perf_counter() - w_start,
+            "recorded_s": session.duration,
+            "inputs": session.cursor,
+            "recorded_inputs": len(session.inputs),
+            "mismatches": session.mismatches,
+        }
+
+
+def _main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="python -m app.services.replay")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("record", help="canlı FullAuto oturumunu kaydet (INSERT başlat/durdur, Ctrl+C bitir)")
+    r.add_argument("dir")
+    p = sub.add_parser("run", help="kayıtlı oturumu sanal saatle oynat, tur metriklerini yaz")
+    p.add_argument("dir")
+    p.add_argument("--cycles", type=int, default=None)
+    p.add_argument("--verbose", action="store_true")
+    p.add_argument("--profile", action="store_true", help="span p50/p95 (gerçek hesap süresi)")
+    p.add_argument("--trace", default=None, help="adım trace'ini bu dosyaya yaz (JSONL, .gz destekli)")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "record":
+        from .fullauto import FullAutoService
+        with recording(Path(args.dir)) as rec:
+            FullAutoService()
+            print("Kayıt açık. INSERT ile FullAuto'yu başlat/durdur, Ctrl+C ile kaydı bitir.")
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                pass
+        print(rec.stats())
+        return 0
+
+    if args.profile:
+        from app.profiler import PROFILER
+        PROFILER.enable()
+    if args.trace:
+        from .trace import start_trace
+        start_trace(Path(args.trace))
+    try:
+        res = Replayer(Path(args.dir), max_cycles=args.cycles,
+                       log=(lambda m: print(f"  {m}")) if args.verbose else None).run()
+    finally:
+        if args.trace:
+            from .trace import stop_trace
+            print(stop_trace().stats())
+    print(f"bitiş: {res['reason']}")
+    for i, c in enumerate(res["cycles"], 1):
+        parts = "  ".join(f"{k}: {v:.2f}s sanal / {w * 1000:.0f} ms gerçek / {n} girdi" for k, (v, w, n) in c.items())
+        print(f"tur {i}: {parts}")
+    speed = res["virtual_s"] / res["wall_s"] if res["wall_s"] else 0.0
+    print(f"toplam: sanal {res['virtual_s']:.1f}s (kayıt {res['recorded_s']:.1f}s), gerçek {res['wall_s']:.2f}s "
+          f"→ x{speed:.0f}; girdi {res['inputs']}/{res['recorded_inputs']}, uyuşmazlık {res['mismatches']}")
+    if args.profile:
+        from app.profiler import PROFILER
+        for name, (n, p50, p95) in sorted(PROFILER.stats().items()):
+            print(f"  {name}: n={n} p50={p50 * 1000:.2f} ms p95={p95 * 1000:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
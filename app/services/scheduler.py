@@ -0,0 +1,69 @@
+"""
+Buy order yerleştirme için kayan pencereli hız sınırlayıcı.
+
+Sabit "her 5 item'da 65 sn bekle" yerine sunucunun limitini birebir izler:
+son `window` saniyede en fazla `max_orders` order verilir. Verilen son
+order'ların zamanları tutulur; pencere doluysa en eskisi `window` saniyelik
+olana kadar beklenir. Böylece hangi 65 sn'lik aralığa bakılırsa bakılsın 5'ten
+fazla order düşmez (token-bucket'ın dolu kova + dolum ile verdiği fazlalık
+yok). Varsayılanlar 5 order / 65 sn; config.json → buy.max_orders /
+buy.window_seconds ile değiştirilir.
+
+Yer yoksa bekleme süresi (wait_time) çağırana döner; BuyService bu boş
+süreyi orkestratöre (FullAuto) devreder, orada collect/sell turu çalışabilir.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+
+
+class OrderWindow:
+    def __init__(self, max_orders: float = 5, window: float = 65.0):
+        self._lock = threading.Lock()
+        self.max_orders = max(1, int(max_orders))
+        self.window = max(1e-3, float(window))   # saniye
+        self._times: deque = deque()              # pencere içindeki order zamanları (monotonic)
+        self.acquired = 0
+        self.waited = 0.0
+
+    def _prune(self, now: float):
+        while self._times and now - self._times[0] >= self.window:
+            self._times.popleft()
+
+    def configure(self, max_orders: float, window: float):
+        """Limitleri değiştirir; pencere içindeki order'lar sayılmaya devam eder."""
+        with self._lock:
+            self.max_orders = max(1, int(max_orders))
+            self.window = max(1e-3, float(window))
+            self._prune(time.monotonic())
+
+    def available(self) -> int:
+        with self._lock:
+            self._prune(time.monotonic())
+            return max(0, self.max_orders - len(self._times))
+
+    def wait_time(self, n: int = 1) -> float:
+        """n order'lık yer açılması için beklenmesi gereken süre (saniye); hemen varsa 0."""
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            k = len(self._times) + min(max(1, int(n)), self.max_orders) - self.max_orders
+            if k <= 0:
+                return 0.0
+            return max(0.0, self._times[k - 1] + self.window - now)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            if len(self._times) >= self.max_orders:
+                return False
+            self._times.append(now)
+            self.acquired += 1
+            return True
+
+    def stats(self) -> str:
+        return (f"limit: {self.max_orders} order / {self.window:.0f} sn (kayan pencere); "
+                f"verilen={self.acquired}, limit beklemesi={self.waited:.0f} sn")
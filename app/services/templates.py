@@ -0,0 +1,84 @@
+"""
+Paylaşılan şablon (template) bankası.
+
+Matcher'lar her denemede cv2.imread yapmak yerine buradan alır:
+  - şablon bir kez okunur; BGR, gray ve gray piramit seviyeleri bellekte tutulur
+  - her get() çağrısında sadece os.stat yapılır; dosyanın mtime'ı değiştiyse
+    yeniden okunur (oyun içi ekran değişince PNG'yi değiştirmek yeterli)
+"""
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+try:
+    import cv2  # type: ignore
+except Exception:
+    cv2 = None  # type: ignore
+
+TEMPLATE_DIR = Path("app/data/template")
+
+GREEN_TEMPLATES = [TEMPLATE_DIR / f"green{i}.png" for i in range(1, 5)]
+YUZDE_TEMPLATES = [TEMPLATE_DIR / f"yuzde{i}.png" for i in range(1, 4)]
+ORANGE_TEMPLATE = TEMPLATE_DIR / "turuncu.png"
+
+
+class Template:
+    """Bir şablonun önceden dönüştürülmüş halleri."""
+
+    __slots__ = ("path", "name", "mtime", "bgr", "gray", "pyramid", "h", "w")
+
+    def __init__(self, path: Path, mtime: float, bgr, levels: int):
+        self.path = path
+        self.name = path.name
+        self.mtime = mtime
+        self.bgr = bgr
+        self.gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+        self.h, self.w = bgr.shape[:2]
+        # pyramid[0] = gray (tam çözünürlük), pyramid[i] = 2^i küçültülmüş
+        self.pyramid = [self.gray]
+        for _ in range(levels):
+            prev = self.pyramid[-1]
+            if min(prev.shape[:2]) < 8:
+                break
+            self.pyramid.append(cv2.pyrDown(prev))
+
+
+class TemplateBank:
+    def __init__(self, pyramid_levels: int = 2):
+        self.pyramid_levels = int(pyramid_levels)
+        self._cache: dict[str, Template] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: Path) -> Optional[Template]:
+        """Şablonu döner; dosya yoksa/okunamazsa None. mtime değiştiyse yeniden yükler."""
+        if cv2 is None:
+            return None
+        key = str(path)
+        try:
+            mtime = os.stat(key).st_mtime
+        except OSError:
+            return None
+        tpl = self._cache.get(key)
+        if tpl is not None and tpl.mtime == mtime:
+            return tpl
+        with self._lock:
+            tpl = self._cache.get(key)
+            if tpl is not None and tpl.mtime == mtime:
+                return tpl
+            bgr = cv2.imread(key, cv2.IMREAD_COLOR)
+            if bgr is None:
+                self._cache.pop(key, None)
+                return None
+            tpl = Template(Path(path), mtime, bgr, self.pyramid_levels)
+            self._cache[key] = tpl
+            return tpl
+
+    def preload(self, paths) -> int:
+        """Verilen şablonları önceden yükler; yüklenebilen sayısını döner."""
+        return sum(1 for p in paths if self.get(Path(p)) is not None)
+
+
+TEMPLATES = TemplateBank()
@@ -0,0 +1,227 @@
+"""
+Yapılandırılmış adım trace'i (JSON-lines, istenirse gzip).
+
+Profiler'a sink olarak bağlanır: her span (yakalama, eşleştirme + skor, OCR,
+tık, tuş, bekleme, faz) ve event() tek satır olur:
+
+    {"t": 12.034512, "d": 0.004211, "n": "auto.match", "th": "fullauto", "f": {"score": 0.91}}
+
+  t  : trace başlangıcına göre monotonic başlangıç (sn)   d : süre (sn, event'te 0)
+  n  : span/event adı   th : thread adı   f : alanlar (yoksa yazılmaz)
+
+İlk satır başlık: {"trace": 1, "wall": <unix zamanı>}. Yazım ayrı bir thread'de
+yapılır; kuyruk doluysa olay düşürülür (sıcak yol beklemez). Yol .gz ile
+bitiyorsa gzip'lenir.
+
+Özet:
+
+    python -m app.services.trace summarize app/data/trace/fullauto.jsonl
+
+faz (phase.buy / phase.collect / phase.orange) süre histogramları, adım başına
+p50/p95 ve "tur süresi nereye gitti" dökümünü (thread başına öz-süre) yazar.
+"""
+from __future__ import annotations
+
+import bisect
+import gzip
+import json
+import math
+import queue
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+
+from app.profiler import PROFILER
+
+TRACE_DIR = Path("app/data/trace")
+PHASE_PREFIX = "phase."
+
+
+def _open(path: Path, mode: str):
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class TraceWriter:
+    def __init__(self, path: Path, max_queue: int = 65536):
+        self.path = Path(path)
+        self._q: queue.Queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self.t0 = time.perf_counter()
+        self.written = 0
+        self.dropped = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = _open(self.path, "w")
+        self._fh.write(json.dumps({"trace": 1, "wall": round(time.time(), 3)}) + "\n")
+        self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def __call__(self, name: str, t0: float, dur: float, fields: Optional[dict]):
+        try:
+            self._q.put_nowait((name, t0, dur, threading.current_thread().name, fields))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            item = self._q.get()
+            if item is None:
+                break
+            name, t0, dur, th, fields = item
+            rec = {"t": round(t0 - self.t0, 6), "d": round(dur, 6), "n": name, "th": th}
+            if fields:
+                rec["f"] = fields
+            try:
+                self._fh.write(json.dumps(rec, separators=(",", ":"), default=str) + "\n")
+                self.written += 1
+            except Exception:
+                self.dropped += 1
+            if self._q.empty():
+                self._fh.flush()
+
+    def close(self):
+        self._q.put(None)
+        self._thread.join(timeout=5)
+        self._fh.close()
+
+    def stats(self) -> str:
+        return f"trace {self.path}: yazılan={self.written}, düşürülen={self.dropped}"
+
+
+_ACTIVE: Optional[TraceWriter] = None
+
+
+def start_trace(path: Optional[Path] = None) -> TraceWriter:
+    """Trace'i başlatır (profiler sink'i bağlanır). path yoksa app/data/trace/trace_<zaman>.jsonl."""
+    global _ACTIVE
+    stop_trace()
+    path = Path(path) if path else TRACE_DIR / f"trace_{time.strftime('%Y%m%d_%H%M%S')}.jsonl"
+    _ACTIVE = TraceWriter(path)
+    PROFILER.set_sink(_ACTIVE)
+    return _ACTIVE
+
+
+def stop_trace() -> Optional[TraceWriter]:
+    global _ACTIVE
+    writer, _ACTIVE = _ACTIVE, None
+    if writer is not None:
+        PROFILER.set_sink(None)
+        writer.close()
+    return writer
+
+
+# ---------- okuma / özet ----------
+def load_trace(path: Path) -> list[dict]:
+    events = []
+    with _open(Path(path), "r") as fh:
+        for line in fh:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue   # yarım kalan son satır
+            if "n" in rec:
+                events.append(rec)
+    return events
+
+
+def _pct(vals: list[float], q: float) -> float:
+    return vals[min(len(vals) - 1, int(len(vals) * q))] if vals else 0.0
+
+
+def _histogram(vals: list[float], width: int = 30) -> list[str]:
+    """Süre histogramı: log2 ms kovaları (1, 2, 4, ... ms), ASCII çubuk."""
+    buckets: dict[int, int] = defaultdict(int)
+    for v in vals:
+        buckets[max(0, math.ceil(math.log2(max(v * 1000, 1e-3))))] += 1
+    top = max(buckets.values())
+    lines = []
+    for b in range(min(buckets), max(buckets) + 1):
+        n = buckets.get(b, 0)
+        lines.append(f"    ≤{2 ** b:>7} ms | {'#' * max(1 if n else 0, round(n * width / top)):<{width}} {n}")
+    return lines
+
+
+def self_times(events: list[dict]) -> list[tuple[dict, float]]:
+    """Her span için öz-süre (aynı thread'de içine düşen alt span'ler çıkarılmış)."""
+    out = []
+    by_thread: dict[str, list[dict]] = defaultdict(list)
+    for e in events:
+        if e.get("d", 0) > 0:
+            by_thread[e.get("th", "")].append(e)
+    for spans in by_thread.values():
+        spans.sort(key=lambda e: (e["t"], -e["d"]))
+        stack: list[list] = []   # [span, kalan öz-süre, bitiş]
+        for e in spans:
+            end = e["t"] + e["d"]
+            while stack and e["t"] >= stack[-1][2] - 1e-9:
+                s = stack.pop()
+                out.append((s[0], max(0.0, s[1])))
+            if stack:
+                stack[-1][1] -= e["d"]
+            stack.append([e, e["d"], end])
+        out.extend((s[0], max(0.0, s[1])) for s in stack)
+    return out
+
+
+def summarize(events: list[dict], top: int = 8) -> str:
+    phases = sorted((e for e in events if e["n"].startswith(PHASE_PREFIX) and e.get("d", 0) > 0),
+                    key=lambda e: e["t"])
+    lines = []
+    if not events:
+        return "trace boş"
+    span_s = max(e["t"] + e.get("d", 0) for e in events) - min(e["t"] for e in events)
+    cycles = sum(1 for e in phases if e["n"] == PHASE_PREFIX + "orange")
+    lines.append(f"{len(events)} olay, {span_s:.1f} sn, {cycles} tur"
+                 + (f" (ortalama tur {sum(e['d'] for e in phases) / cycles:.1f} sn)" if cycles else ""))
+
+    # faz başına süre payı + histogram
+    by_phase: dict[str, list[float]] = defaultdict(list)
+    for e in phases:
+        by_phase[e["n"][len(PHASE_PREFIX):]].append(e["d"])
+    total = sum(sum(v) for v in by_phase.values()) or 1.0
+    for name, vals in sorted(by_phase.items(), key=lambda kv: -sum(kv[1])):
+        vals.sort()
+        lines.append(f"\n[{name}] {len(vals)}x, toplam {sum(vals):.1f} sn (%{sum(vals) * 100 / total:.0f}), "
+                     f"p50={_pct(vals, 0.5):.2f} sn, p95={_pct(vals, 0.95):.2f} sn")
+        lines.extend(_histogram(vals))
+
+    # tur süresi nereye gitti: faz penceresine düşen span'lerin öz-süreleri
+    windows = [(e["t"], e["t"] + e["d"], e["n"][len(PHASE_PREFIX):]) for e in phases]
+    starts = [w[0] for w in windows]
+    spent: dict[str, dict[tuple[str, str], list[float]]] = defaultdict(lambda: defaultdict(list))
+    for e, own in self_times(events):
+        if e["n"].startswith(PHASE_PREFIX):
+            key = ("(faz, ölçülmeyen)", e.get("th", ""))
+        else:
+            key = (e["n"], e.get("th", ""))
+        i = bisect.bisect_right(starts, e["t"]) - 1
+        phase = windows[i][2] if i >= 0 and e["t"] < windows[i][1] else "(faz dışı)"
+        spent[phase][key].append(own)
+    lines.append("\nTur süresi dökümü (öz-süre; thread'ler paralel olabilir):")
+    for phase, rows in sorted(spent.items(), key=lambda kv: -sum(map(sum, kv[1].values()))):
+        ptotal = sum(by_phase.get(phase, [])) or sum(map(sum, rows.values())) or 1.0
+        lines.append(f"  [{phase}]")
+        for (name, th), vals in sorted(rows.items(), key=lambda kv: -sum(kv[1]))[:top]:
+            vals.sort()
+            lines.append(f"    {name:<24} {th:<14} {sum(vals):8.2f} sn %{sum(vals) * 100 / ptotal:5.1f}  "
+                         f"n={len(vals):<5} p50={_pct(vals, 0.5) * 1000:7.1f} ms p95={_pct(vals, 0.95) * 1000:7.1f} ms")
+    return "\n".join(lines)
+
+
+def _main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="python -m app.services.trace")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("summarize", help="faz histogramları + tur süresi dökümü")
+    s.add_argument("path")
+    s.add_argument("--top", type=int, default=8, help="faz başına gösterilecek adım sayısı")
+    args = ap.parse_args(argv)
+    if args.cmd == "summarize":
+        print(summarize(load_trace(Path(args.path)), top=args.top))
+
+
+if __name__ == "__main__":
+    _main()
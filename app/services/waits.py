@@ -0,0 +1,90 @@
+"""
+Koşul tabanlı bekleme primitifleri.
+
+Sabit time.sleep yerine beklenen UI durumu gelene kadar bölgeyi yakalayıp
+koşulu kontrol ederiz. Her adımın timeout'u eskiden kullanılan sabit bekleme
+süresidir: GUI 50 ms'de tepki verirse 50 ms beklenir, hiç tepki vermezse en
+kötü durumda eski süre kadar.
+
+Koşullar beklenen UI durumunu kontrol eder: şablonun belirmesi (present) /
+kaybolması (absent, istenirse sadece tıklanan item'ın yerinde) ya da GUI'nin
+açılıp kapanması gibi bölgenin çoğunu değiştiren geçişler (replaced_from).
+İmleç hareketi veya tooltip bölgenin küçük bir kısmını değiştirir; bunlar
+bekleme koşulunu sağlamaz.
+"""
+from __future__ import annotations
+
+import time
+from typing import Callable, Optional
+
+try:
+    import numpy as np
+except Exception:
+    np = None         # type: ignore
+
+from .frame_change import FrameChangeDetector
+from .matcher import match_best
+from .templates import TEMPLATES
+
+
+def wait_until(predicate: Callable[[], bool], timeout: float, poll: float = 0.03,
+               stop: Optional[Callable[[], bool]] = None) -> bool:
+    """predicate() True dönene kadar poll eder. Koşul sağlandıysa True, timeout/stop'ta False."""
+    t_end = time.monotonic() + max(0.0, float(timeout))
+    while True:
+        if predicate():
+            return True
+        if time.monotonic() >= t_end or (stop and stop()):
+            return False
+        time.sleep(poll)
+
+
+class FrameProbe:
+    """Bekleme koşulları için bölge yakalayıcı; son yakalanan frame'i saklar
+    (koşul sağlandığında aynı frame üzerinde eşleştirme yapılabilsin diye)."""
+
+    def __init__(self, grab: Callable[[], object]):
+        self.grab = grab
+        self.frame = None
+
+    def take(self):
+        self.frame = self.grab()
+        return self.frame
+
+    # --- hazır koşullar ---
+    def changed_from(self, ref_frame) -> Callable[[], bool]:
+        """ref_frame'den farklı bir frame görülünce True (herhangi bir değişim;
+        UI geçişi beklerken replaced_from / present / absent tercih edilmeli)."""
+        det = FrameChangeDetector()
+        det.mark(ref_frame)
+        return lambda: det.changed(self.take())
+
+    def replaced_from(self, ref_frame, min_frac: float = 0.5, delta: int = 12) -> Callable[[], bool]:
+        """Bölgenin en az min_frac'ı değişince True (GUI açıldı / kapandı / ekran değişti).
+        İmleç ve tooltip bölgenin küçük bir kısmını değiştirdiğinden koşulu sağlamaz."""
+        det = FrameChangeDetector()
+        ref = det.signature(ref_frame)
+
+        def _pred():
+            sig = det.signature(self.take())
+            return float((np.abs(sig - ref) > delta).mean()) >= min_frac
+        return _pred
+
+    def _match(self, tpl_paths, thresh: float, roi=None) -> bool:
+        frame = self.take()
+        if roi is not None:
+            x, y, w, h = (int(v) for v in roi)
+            frame = frame[max(0, y):y + h, max(0, x):x + w]
+        fh, fw = frame.shape[:2]
+        tpls = [t for t in (TEMPLATES.get(p) for p in tpl_paths)
+                if t is not None and t.h <= fh and t.w <= fw]   # kırpılan ROI şablondan küçükse eşleşme yok
+        hit, _ = match_best(frame, tpls, thresh)
+        return hit is not None
+
+    def present(self, tpl_paths, thresh: float, roi=None) -> Callable[[], bool]:
+        """Şablonlardan herhangi biri eşiği geçince True. roi=(x, y, w, h): frame içinde sadece bu alan."""
+        return lambda: self._match(tpl_paths, thresh, roi)
+
+    def absent(self, tpl_paths, thresh: float, roi=None) -> Callable[[], bool]:
+        """Şablonların hiçbiri eşiği geçmiyorsa True (örn. tıklanan item'ın yerinden kayboldu)."""
+        return lambda: not self._match(tpl_paths, thresh, roi)
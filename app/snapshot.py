@@ -0,0 +1,51 @@
+"""
+Son tarama sonucunun (rows) diskte kompakt binary saklanması.
+
+Açılışta UI, HTTP taraması bitmeden bu snapshot'ı yükleyip hemen çizer
+("eski veri" işaretiyle); taze tarama normal yoldan üzerine yazar.
+
+Format: MAGIC + zlib(marshal((ts, keys, columns)))
+  - satırlar sütun bazında tutulur (anahtarlar tek sefer yazılır)
+  - marshal Python sürümüne bağlıdır; okunamazsa snapshot yok sayılır
+"""
+from __future__ import annotations
+
+import marshal
+import zlib
+from pathlib import Path
+from typing import Optional
+
+SNAPSHOT_PATH = Path("app/data/last_snapshot.bin")
+MAGIC = b"BZS1"
+
+
+def save_snapshot(rows: list[dict], path: Path = SNAPSHOT_PATH) -> bool:
+    if not rows:
+        return False
+    keys = list(rows[0].keys())
+    columns = [[r.get(k) for r in rows] for k in keys]
+    ts = int(rows[0].get("timestamp") or 0)
+    blob = MAGIC + zlib.compress(marshal.dumps((ts, keys, columns)), 1)
+    path = Path(path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_bytes(blob)
+        tmp.replace(path)
+        return True
+    except Exception:
+        return False
+
+
+def load_snapshot(path: Path = SNAPSHOT_PATH) -> Optional[tuple[int, list[dict]]]:
+    """(timestamp, rows) döner; dosya yoksa/bozuksa None."""
+    path = Path(path)
+    try:
+        blob = path.read_bytes()
+        if not blob.startswith(MAGIC):
+            return None
+        ts, keys, columns = marshal.loads(zlib.decompress(blob[len(MAGIC):]))
+        rows = [dict(zip(keys, vals)) for vals in zip(*columns)]
+        return int(ts), rows
+    except Exception:
+        return None
@@ -1,20 +1,26 @@
-import sys, json
+import sys, time
 from pathlib import Path
 from app.services.fullauto import FullAutoService
 
 
-from PySide6.QtCore import Qt, QThread, QTimer, QSize, Slot, QFile, QTextStream
-from PySide6.QtGui import QFont, QColor
+from PySide6.QtCore import Qt, QThread, QTimer, QSize, Slot, QFile, QTextStream, QPointF, QObject, Signal
+from PySide6.QtGui import QFont, QColor, QPainter, QPen, QPolygonF
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QTextEdit, QLabel, QLineEdit, QSpinBox, QDoubleSpinBox, QTabWidget,
-    QScrollArea, QGridLayout, QFrame, QMessageBox, QGraphicsDropShadowEffect
+    QScrollArea, QGridLayout, QFrame, QMessageBox, QGraphicsDropShadowEffect, QComboBox
 )
 
 from app.workers import ScanWorker
+from app.history import PriceHistory, WINDOWS
+from app.snapshot import load_snapshot
+from app.profiler import PROFILER, span
+from app.config import CONFIG
+from app.selection import SELECTION
 from app.fastsell import FastSellWorker
 from app.services.collect_service import CollectAndSellService
 from app.services.buy_service import BuyService
+from app.services.name_index import normalize
 
 
 # ------ formatting helpers ------
@@ -28,9 +34,45 @@ def fmt_int(n):
 def fmt_no_decimal(n):
     return fmt_int(n)
 
+# ------ sparkline widget ------
+SPARK_COLORS = {"buy": "#3b7cff", "sell": "#17d88b", "margin": "#ff9f43"}
+
+class Sparkline(QWidget):
+    """Bir veya birkaç (t, v) serisini ortak ölçekte çizen küçük çizgi grafik.
+
+    Seriler PriceHistory.sparkline() tarafından zaten LTTB ile indirilmiş gelir,
+    burada sadece ölçekleyip polyline çiziyoruz.
+    """
+    def __init__(self, series: list[tuple[list, str]], height=26):
+        super().__init__()
+        self.series = [(pts, QColor(color)) for pts, color in series if pts and len(pts) >= 2]
+        self.setFixedHeight(height)
+        self.setMinimumWidth(60)
+        self.setAttribute(Qt.WA_TranslucentBackground, True)
+
+    def paintEvent(self, e):
+        if not self.series:
+            return
+        xs = [p[0] for pts, _ in self.series for p in pts]
+        ys = [p[1] for pts, _ in self.series for p in pts]
+        x0, x1 = min(xs), max(xs)
+        y0, y1 = min(ys), max(ys)
+        dx = (x1 - x0) or 1
+        dy = (y1 - y0) or 1
+        w = self.width() - 2
+        h = self.height() - 2
+
+        qp = QPainter(self)
+        qp.setRenderHint(QPainter.Antialiasing, True)
+        for pts, color in self.series:
+            poly = QPolygonF([QPointF(1 + (x - x0) / dx * w, 1 + h - (y - y0) / dy * h) for x, y in pts])
+            qp.setPen(QPen(color, 1.4))
+            qp.drawPolyline(poly)
+        qp.end()
+
 # ------ card widget ------
 class Card(QFrame):
-    def __init__(self, payload: dict, lines: list[tuple[str,str]], on_click=None, font_scale=1.0, is_selected=False):
+    def __init__(self, payload: dict, lines: list[tuple[str,str]], on_click=None, font_scale=1.0, is_selected=False, spark=None):
         super().__init__()
         self.payload = payload
         self.on_click = on_click
@@ -74,6 +116,10 @@ class Card(QFrame):
             row.addWidget(lv)
             lay.addLayout(row)
 
+        # fiyat geçmişi: alış/satış tek grafikte, marj ayrı
+        if spark:
+            lay.addWidget(Sparkline([(spark["buy"], SPARK_COLORS["buy"]), (spark["sell"], SPARK_COLORS["sell"])]))
+            lay.addWidget(Sparkline([(spark["margin"], SPARK_COLORS["margin"])], height=18))
 
     def mousePressEvent(self, e):
         if e.button()==Qt.LeftButton and self.on_click:
@@ -96,20 +142,31 @@ class CardsTab(QWidget):
         v.addWidget(self.scroll)
 
     def populate(self, cards, cols=4):
-        while self.grid.count():
-            it = self.grid.takeAt(0)
-            w = it.widget()
-            if w:
-                w.deleteLater()
-        r=c=0
-        for card in cards:
-            self.grid.addWidget(card, r, c)
-            c+=1
-            if c>=cols:
-                c=0
-                r+=1
+        with span("cards.populate"):
+            while self.grid.count():
+                it = self.grid.takeAt(0)
+                w = it.widget()
+                if w:
+                    w.deleteLater()
+            r=c=0
+            for card in cards:
+                self.grid.addWidget(card, r, c)
+                c+=1
+                if c>=cols:
+                    c=0
+                    r+=1
 
 # ------ MISC tab (FastSell settings) ------
+class ConfigBridge(QObject):
+    """ConfigService bildirimlerini (izleyici thread'i) UI thread'ine taşır."""
+    changed = Signal(dict)
+
+
+class SelectionBridge(QObject):
+    """SelectionStore bildirimlerini (değiştiren thread) UI thread'ine taşır."""
+    changed = Signal(list)
+
+
 class MiscTab(QWidget):
     def __init__(self, load_config, save_config, service: CollectAndSellService):
         super().__init__()
@@ -148,10 +205,20 @@ class MiscTab(QWidget):
         self.btn_collect_toggle.clicked.connect(self.service.toggle)
         QTimer.singleShot(0, self._load_now)
 
+        # config.json dışarıdan değişirse spin kutusu güncellensin
+        self._bridge = ConfigBridge(self)
+        self._bridge.changed.connect(self._apply_config)
+        CONFIG.subscribe(self._bridge.changed.emit)
+
     def _load_now(self):
-        cfg = self.load_config()
+        self._apply_config(self.load_config())
+
+    @Slot(dict)
+    def _apply_config(self, cfg: dict):
         fs = cfg.get("fastsell", {})
+        self.spin_interval.blockSignals(True)
         self.spin_interval.setValue(float(fs.get("interval", 0.3)))
+        self.spin_interval.blockSignals(False)
 
     def _on_save(self):
         val = float(self.spin_interval.value())
@@ -180,6 +247,13 @@ class MainWindow(QMainWindow):
         self.spin_min_vol.setValue(500)
         self.txt_search = QLineEdit()
         self.txt_search.setPlaceholderText("Ara: İsim")
+        self.cmb_spark_window = QComboBox()
+        self.cmb_spark_window.addItems(list(WINDOWS.keys()))
+        self.cmb_spark_window.setCurrentText("24 saat")
+        self.cmb_spark_window.setToolTip("Sparkline zaman penceresi")
+        self.lbl_stale = QLabel("")
+        self.lbl_stale.setStyleSheet("color:#ff9f43;")
+        self.lbl_stale.hide()
 
         # --- Sort controls (multi-key) ---
         self.sort_bar = QHBoxLayout()
@@ -243,6 +317,10 @@ class MainWindow(QMainWindow):
         top.addWidget(self.spin_min_vol)
         top.addSpacing(8)
         top.addWidget(self.txt_search, 1)
+        top.addSpacing(8)
+        top.addWidget(self.cmb_spark_window)
+        top.addSpacing(8)
+        top.addWidget(self.lbl_stale)
 
         root = QWidget()
         v = QVBoxLayout(root)
@@ -252,8 +330,18 @@ class MainWindow(QMainWindow):
         v.addWidget(self.log)
         self.setCentralWidget(root)
 
+        # --profile: status bar'da canlı p50/p95 paneli
+        if PROFILER.enabled:
+            self._init_profile_panel()
+
         # data
         self.raw_rows = []
+        # yerel fiyat geçmişi (sparkline kaynağı)
+        self.history = PriceHistory()
+        try:
+            self.history.load()
+        except Exception as e:
+            self._log_msg(f"Fiyat geçmişi okunamadı: {e}")
         self.sort_orders = {"baz": [], "npc": [], "rev": []}
 
         # --- expected amount heuristics ---
@@ -264,9 +352,17 @@ class MainWindow(QMainWindow):
 
         # --- selections storage ---
         # store as dict: id -> {"name": str, "expected_amount": int}
+        # kalıcılık paylaşılan SelectionStore'da (FullAuto/BuyService ile aynı liste)
         self._selected = {}
-        self._selected_path = Path("app/data/selecteditems.json")
         self._selected_load()
+        self._sel_bridge = SelectionBridge(self)
+        self._sel_bridge.changed.connect(self._on_selection_changed)
+        SELECTION.subscribe(self._sel_bridge.changed.emit)
+
+        # --- warm start: son snapshot'ı hemen çiz, taze tarama üzerine yazar ---
+        self._stale_ts = None
+        self._stale_timer = QTimer(self)
+        self._stale_timer.timeout.connect(self._update_stale_label)
 
         # wiring
         self.btn_scan.clicked.connect(self.start_scan)
@@ -277,6 +373,7 @@ class MainWindow(QMainWindow):
         self.spin_min_pct.valueChanged.connect(lambda *_: self._schedule_rebuild())
         self.spin_min_vol.valueChanged.connect(lambda *_: self._schedule_rebuild())
         self.txt_search.textChanged.connect(lambda *_: self._schedule_rebuild())
+        self.cmb_spark_window.currentTextChanged.connect(lambda *_: self._schedule_rebuild())
         self.tabs.currentChanged.connect(self._on_tab_changed)
 
         # sort btns
@@ -287,7 +384,8 @@ class MainWindow(QMainWindow):
         self.btn_sort_ibuy.clicked.connect(lambda *_: self._push_sort_key("hourly_buy"))
         self.btn_sort_clear.clicked.connect(self._clear_sort_keys)
 
-        # initial scan
+        # warm start (timer'lar hazır olduktan sonra) + initial scan
+        self._warm_start()
         QTimer.singleShot(300, self.start_scan)
 
         # Load dark theme
@@ -317,28 +415,64 @@ QFrame#card[selected=\"true\"]:hover { border: 1px solid #22f0a0; background: rg
             except Exception:
                 pass
 
+    # ----- Profiler panel (--profile) -----
+    def _init_profile_panel(self):
+        sb = self.statusBar()
+        self.lbl_prof = QLabel("profiler: veri yok")
+        self.lbl_prof.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        sb.addWidget(self.lbl_prof, 1)
+        self.btn_cprof = QPushButton("cProfile başlat")
+        self.btn_tmalloc = QPushButton("tracemalloc")
+        btn_reset = QPushButton("Sıfırla")
+        for b in (self.btn_cprof, self.btn_tmalloc, btn_reset):
+            sb.addPermanentWidget(b)
+        self.btn_cprof.clicked.connect(self._on_cprofile_toggle)
+        self.btn_tmalloc.clicked.connect(self._on_tracemalloc_dump)
+        btn_reset.clicked.connect(PROFILER.reset)
+        self._prof_timer = QTimer(self)
+        self._prof_timer.timeout.connect(self._update_profile_panel)
+        self._prof_timer.start(1000)
+
+    def _update_profile_panel(self):
+        stats = PROFILER.stats()
+        if not stats:
+            return
+        # en pahalı (p95) span'ler önce; tam tablo tooltip'te
+        ordered = sorted(stats.items(), key=lambda kv: -kv[1][2])
+        def fmt(name, st):
+            n, p50, p95 = st
+            return f"{name} p50 {p50*1000:.1f}ms p95 {p95*1000:.1f}ms (n={n})"
+        self.lbl_prof.setText(" | ".join(fmt(k, v) for k, v in ordered[:4]))
+        self.lbl_prof.setToolTip("\n".join(fmt(k, v) for k, v in sorted(stats.items())))
+
+    def _on_cprofile_toggle(self):
+        path = PROFILER.toggle_cprofile()
+        if path is None:
+            self.btn_cprof.setText("cProfile durdur + kaydet")
+            self._log_msg("cProfile başladı (UI thread).")
+        else:
+            self.btn_cprof.setText("cProfile başlat")
+            self._log_msg(f"cProfile kaydedildi: {path}")
+
+    def _on_tracemalloc_dump(self):
+        path = PROFILER.dump_tracemalloc()
+        if path is None:
+            self._log_msg("tracemalloc başladı; snapshot için tekrar basın.")
+        else:
+            self._log_msg(f"tracemalloc snapshot kaydedildi: {path}")
+
     # ----- Config helpers -----
     def _cfg_path(self):
-        return Path("app/data/config.json")
+        return CONFIG.path
 
     def _load_config(self):
-        p = self._cfg_path()
-        if not p.exists():
-            return {"fastsell": {"interval": 0.3}}
-        try:
-            return json.loads(p.read_text(encoding="utf-8"))
-        except Exception:
-            return {"fastsell": {"interval": 0.3}}
+        return CONFIG.get()
 
     def _save_config(self, cfg):
-        try:
-            p = self._cfg_path()
-            p.parent.mkdir(parents=True, exist_ok=True)
-            p.write_text(json.dumps(cfg, indent=2), encoding="utf-8")
-            return True
-        except Exception as e:
-            self._log_msg(f"Ayar kaydedilemedi: {e}")
-            return False
+        ok = CONFIG.save(cfg)
+        if not ok:
+            self._log_msg(f"Ayar kaydedilemedi: {self._cfg_path()}")
+        return ok
 
     # ----- Worker
     def start_scan(self):
@@ -355,6 +489,32 @@ QFrame#card[selected=\"true\"]:hover { border: 1px solid #22f0a0; background: rg
         self._thread.finished.connect(self._cleanup_thread)
         self._thread.start()
 
+    def _warm_start(self):
+        snap = load_snapshot()
+        if not snap:
+            return
+        ts, rows = snap
+        if not rows:
+            return
+        self.raw_rows = rows
+        self._stale_ts = ts
+        self._update_stale_label()
+        self.lbl_stale.show()
+        self._stale_timer.start(1000)
+        self._log_msg(f"Son snapshot yüklendi: {len(rows)} ürün (eski veri, taze tarama bekleniyor)")
+        self._schedule_rebuild()
+
+    def _update_stale_label(self):
+        if self._stale_ts is None:
+            return
+        age = max(0, int(time.time()) - int(self._stale_ts))
+        self.lbl_stale.setText(f"eski veri, {age} sn önce")
+
+    def _clear_stale(self):
+        self._stale_ts = None
+        self._stale_timer.stop()
+        self.lbl_stale.hide()
+
     def _cleanup_thread(self):
         self._thread=None
         self._worker=None
@@ -362,6 +522,11 @@ QFrame#card[selected=\"true\"]:hover { border: 1px solid #22f0a0; background: rg
     def on_scan_finished(self, rows, ok):
         if ok:
             self.raw_rows = rows
+            try:
+                self.history.append(rows)
+            except Exception as e:
+                self._log_msg(f"Fiyat geçmişi yazılamadı: {e}")
+            self._clear_stale()
             self._log_msg(f"Güncellendi: {len(rows)} ürün")
             self._schedule_rebuild()
         else:
@@ -420,6 +585,7 @@ QFrame#card[selected=\"true\"]:hover { border: 1px solid #22f0a0; background: rg
             return
         self._is_rebuilding = True
         self.setUpdatesEnabled(False)
+        t_rebuild = time.perf_counter()
 
         try:
             min_pct = float(self.spin_min_pct.value() or 0)
@@ -442,7 +608,8 @@ QFrame#card[selected=\"true\"]:hover { border: 1px solid #22f0a0; background: rg
                 def keyfunc(x):
                     payload = x["payload"]
                     return tuple([-float(payload.get(k, 0)) for k in keys])
-                items.sort(key=keyfunc)
+                with span("rebuild.sort"):
+                    items.sort(key=keyfunc)
                 return items
 
             mode = self._mode_key()
@@ -450,121 +617,130 @@ QFrame#card[selected=\"true\"]:hover { border: 1px solid #22f0a0; background: rg
             # ----- Bazaar cards
             if mode == "baz":
                 baz = []
-                for r in self.raw_rows:
-                    if not ok_common(r):
-                        continue
-                    buy_p = float(r["buy_price"])
-                    sell_p = float(r["sell_price"])
-                    buy_vol = int(r["buy_volume"])
-                    sell_vol = int(r["sell_volume"])
-                    hourly_sell = int(r.get("hourly_sell", sell_vol // 24))
-                    hourly_buy  = int(r.get("hourly_buy",  buy_vol  // 24))
-                    margin = sell_p - buy_p
-                    pct = (margin / buy_p) * 100 if buy_p else 0.0
-                    if pct < min_pct:
-                        continue
-                    coins_h = margin * min(hourly_sell, hourly_buy)
-                    spread_pct = float(r.get("spread_percent",0))
-                    power = coins_h * max(spread_pct, 1)
-                    baz.append({
-                        "payload": {**r, "mode":"baz", "power": power, "unit": margin, "coins_h": coins_h,
-                                    "hourly_sell": hourly_sell, "hourly_buy": hourly_buy},
-                        "lines": [
-                            ("Power Score", fmt_no_decimal(power)),
-                            ("Coins/saat", fmt_no_decimal(coins_h)),
-                            ("Kâr/Item", fmt_no_decimal(margin)),
-                            ("Saatlik InstaSell/Buy", f"{fmt_no_decimal(hourly_sell)} / {fmt_no_decimal(hourly_buy)}"),
-                            ("Alış/Satış", f"{fmt_no_decimal(buy_p)} / {fmt_no_decimal(sell_p)}"),
-                        ]
-                    })
+                with span("rebuild.filter"):
+                    for r in self.raw_rows:
+                        if not ok_common(r):
+                            continue
+                        buy_p = float(r["buy_price"])
+                        sell_p = float(r["sell_price"])
+                        buy_vol = int(r["buy_volume"])
+                        sell_vol = int(r["sell_volume"])
+                        hourly_sell = int(r.get("hourly_sell", sell_vol // 24))
+                        hourly_buy  = int(r.get("hourly_buy",  buy_vol  // 24))
+                        margin = sell_p - buy_p
+                        pct = (margin / buy_p) * 100 if buy_p else 0.0
+                        if pct < min_pct:
+                            continue
+                        coins_h = margin * min(hourly_sell, hourly_buy)
+                        spread_pct = float(r.get("spread_percent",0))
+                        power = coins_h * max(spread_pct, 1)
+                        baz.append({
+                            "payload": {**r, "mode":"baz", "power": power, "unit": margin, "coins_h": coins_h,
+                                        "hourly_sell": hourly_sell, "hourly_buy": hourly_buy},
+                            "lines": [
+                                ("Power Score", fmt_no_decimal(power)),
+                                ("Coins/saat", fmt_no_decimal(coins_h)),
+                                ("Kâr/Item", fmt_no_decimal(margin)),
+                                ("Saatlik InstaSell/Buy", f"{fmt_no_decimal(hourly_sell)} / {fmt_no_decimal(hourly_buy)}"),
+                                ("Alış/Satış", f"{fmt_no_decimal(buy_p)} / {fmt_no_decimal(sell_p)}"),
+                            ]
+                        })
                 baz = sort_by(self.sort_orders["baz"], "power", baz)[:400]
                 def to_cards(data_list, font_scale):
-                    return [Card(d["payload"], d["lines"],
-                                 on_click=lambda p, m=d["payload"]["mode"]: self.card_clicked(p, m),
-                                 font_scale=font_scale,
-                                 is_selected=(str(d["payload"].get("id")) in self._selected)) for d in data_list]
+                    with span("rebuild.cards"):
+                        return [Card(d["payload"], d["lines"],
+                                     on_click=lambda p, m=d["payload"]["mode"]: self.card_clicked(p, m),
+                                     font_scale=font_scale,
+                                     is_selected=(str(d["payload"].get("id")) in self._selected),
+                                     spark=self._spark_for(d["payload"].get("id"))) for d in data_list]
                 self.tab_baz.populate(to_cards(baz, 1.0), cols=4)
 
             elif mode == "npc":
                 npc = []
-                for r in self.raw_rows:
-                    if not ok_common(r):
-                        continue
-                    npc_p = float(r.get("npc_price") or 0)
-                    if npc_p <= 0:
-                        continue
-                    buy_p = float(r["buy_price"])
-                    sell_p = float(r["sell_price"])
-                    unit = npc_p - buy_p
-                    if unit <= 0:
-                        continue
-                    hourly_sell = int(r.get("hourly_sell", int(r["sell_volume"]) // 24))
-                    hourly_buy  = int(r.get("hourly_buy",  int(r["buy_volume"]) // 24))
-                    coins_h = unit * min(hourly_sell, hourly_buy)
-                    pct = (unit / buy_p) * 100 if buy_p else 0.0
-                    if pct < min_pct:
-                        continue
-                    power = coins_h * max(pct, 1)
-                    npc.append({
-                        "payload": {**r, "mode":"npc", "power": power, "unit": unit, "coins_h": coins_h,
-                                    "hourly_sell": hourly_sell, "hourly_buy": hourly_buy},
-                        "lines": [
-                            ("Power Score", fmt_no_decimal(power)),
-                            ("Coins/saat", fmt_no_decimal(coins_h)),
-                            ("Birim Kâr", fmt_no_decimal(unit)),
-                            ("Saatlik InstaSell", fmt_no_decimal(hourly_sell)),
-                            ("Saatlik InstaBuy", fmt_no_decimal(hourly_buy)),
-                            ("NPC", fmt_no_decimal(npc_p)),
-                            ("Alış/Satış", f"{fmt_no_decimal(buy_p)} / {fmt_no_decimal(sell_p)}"),
-                        ]
-                    })
+                with span("rebuild.filter"):
+                    for r in self.raw_rows:
+                        if not ok_common(r):
+                            continue
+                        npc_p = float(r.get("npc_price") or 0)
+                        if npc_p <= 0:
+                            continue
+                        buy_p = float(r["buy_price"])
+                        sell_p = float(r["sell_price"])
+                        unit = npc_p - buy_p
+                        if unit <= 0:
+                            continue
+                        hourly_sell = int(r.get("hourly_sell", int(r["sell_volume"]) // 24))
+                        hourly_buy  = int(r.get("hourly_buy",  int(r["buy_volume"]) // 24))
+                        coins_h = unit * min(hourly_sell, hourly_buy)
+                        pct = (unit / buy_p) * 100 if buy_p else 0.0
+                        if pct < min_pct:
+                            continue
+                        power = coins_h * max(pct, 1)
+                        npc.append({
+                            "payload": {**r, "mode":"npc", "power": power, "unit": unit, "coins_h": coins_h,
+                                        "hourly_sell": hourly_sell, "hourly_buy": hourly_buy},
+                            "lines": [
+                                ("Power Score", fmt_no_decimal(power)),
+                                ("Coins/saat", fmt_no_decimal(coins_h)),
+                                ("Birim Kâr", fmt_no_decimal(unit)),
+                                ("Saatlik InstaSell", fmt_no_decimal(hourly_sell)),
+                                ("Saatlik InstaBuy", fmt_no_decimal(hourly_buy)),
+                                ("NPC", fmt_no_decimal(npc_p)),
+                                ("Alış/Satış", f"{fmt_no_decimal(buy_p)} / {fmt_no_decimal(sell_p)}"),
+                            ]
+                        })
                 npc = sort_by(self.sort_orders["npc"], "power", npc)[:400]
                 def to_cards(data_list, font_scale):
-                    return [Card(d["payload"], d["lines"],
-                                 on_click=lambda p, m=d["payload"]["mode"]: self.card_clicked(p, m),
-                                 font_scale=font_scale,
-                                 is_selected=(str(d["payload"].get("id")) in self._selected)) for d in data_list]
+                    with span("rebuild.cards"):
+                        return [Card(d["payload"], d["lines"],
+                                     on_click=lambda p, m=d["payload"]["mode"]: self.card_clicked(p, m),
+                                     font_scale=font_scale,
+                                     is_selected=(str(d["payload"].get("id")) in self._selected),
+                                     spark=self._spark_for(d["payload"].get("id"))) for d in data_list]
                 self.tab_npc.populate(to_cards(npc, 1.0))
 
             elif mode == "rev":
                 rev = []
-                for r in self.raw_rows:
-                    if not ok_common(r):
-                        continue
-                    npc_p = float(r.get("npc_price") or 0)
-                    if npc_p <= 0:
-                        continue
-                    sell_p = float(r["sell_price"])
-                    buy_p  = float(r["buy_price"])
-                    unit = sell_p - npc_p
-                    if unit <= 0:
-                        continue
-                    hourly_buy  = int(r.get("hourly_buy",  int(r["buy_volume"]) // 24))
-                    hourly_sell = int(r.get("hourly_sell", int(r["sell_volume"]) // 24))
-                    coins_h = unit * min(hourly_buy, hourly_sell)
-                    pct = (unit / npc_p) * 100 if npc_p else 0.0
-                    if pct < min_pct:
-                        continue
-                    power = coins_h * max(pct, 1)
-                    rev.append({
-                        "payload": {**r, "mode":"rev", "power": power, "unit": unit, "coins_h": coins_h,
-                                    "hourly_sell": hourly_sell, "hourly_buy": hourly_buy},
-                        "lines": [
-                            ("Power Score", fmt_no_decimal(power)),
-                            ("Coins/saat", fmt_no_decimal(coins_h)),
-                            ("Birim Kâr", fmt_no_decimal(unit)),
-                            ("Saatlik InstaBuy", fmt_no_decimal(hourly_buy)),
-                            ("Saatlik InstaSell", fmt_no_decimal(hourly_sell)),
-                            ("NPC", fmt_no_decimal(npc_p)),
-                            ("Alış/Satış", f"{fmt_no_decimal(buy_p)} / {fmt_no_decimal(sell_p)}"),
-                        ]
-                    })
+                with span("rebuild.filter"):
+                    for r in self.raw_rows:
+                        if not ok_common(r):
+                            continue
+                        npc_p = float(r.get("npc_price") or 0)
+                        if npc_p <= 0:
+                            continue
+                        sell_p = float(r["sell_price"])
+                        buy_p  = float(r["buy_price"])
+                        unit = sell_p - npc_p
+                        if unit <= 0:
+                            continue
+                        hourly_buy  = int(r.get("hourly_buy",  int(r["buy_volume"]) // 24))
+                        hourly_sell = int(r.get("hourly_sell", int(r["sell_volume"]) // 24))
+                        coins_h = unit * min(hourly_buy, hourly_sell)
+                        pct = (unit / npc_p) * 100 if npc_p else 0.0
+                        if pct < min_pct:
+                            continue
+                        power = coins_h * max(pct, 1)
+                        rev.append({
+                            "payload": {**r, "mode":"rev", "power": power, "unit": unit, "coins_h": coins_h,
+                                        "hourly_sell": hourly_sell, "hourly_buy": hourly_buy},
+                            "lines": [
+                                ("Power Score", fmt_no_decimal(power)),
+                                ("Coins/saat", fmt_no_decimal(coins_h)),
+                                ("Birim Kâr", fmt_no_decimal(unit)),
+                                ("Saatlik InstaBuy", fmt_no_decimal(hourly_buy)),
+                                ("Saatlik InstaSell", fmt_no_decimal(hourly_sell)),
+                                ("NPC", fmt_no_decimal(npc_p)),
+                                ("Alış/Satış", f"{fmt_no_decimal(buy_p)} / {fmt_no_decimal(sell_p)}"),
+                            ]
+                        })
                 rev = sort_by(self.sort_orders["rev"], "power", rev)[:400]
                 def to_cards(data_list, font_scale):
-                    return [Card(d["payload"], d["lines"],
-                                 on_click=lambda p, m=d["payload"]["mode"]: self.card_clicked(p, m),
-                                 font_scale=font_scale,
-                                 is_selected=(str(d["payload"].get("id")) in self._selected)) for d in data_list]
+                    with span("rebuild.cards"):
+                        return [Card(d["payload"], d["lines"],
+                                     on_click=lambda p, m=d["payload"]["mode"]: self.card_clicked(p, m),
+                                     font_scale=font_scale,
+                                     is_selected=(str(d["payload"].get("id")) in self._selected),
+                                     spark=self._spark_for(d["payload"].get("id"))) for d in data_list]
                 self.tab_rev.populate(to_cards(rev, 1.0))
 
         except Exception as e:
@@ -573,6 +749,15 @@ QFrame#card[selected=\"true\"]:hover { border: 1px solid #22f0a0; background: rg
         finally:
             self.setUpdatesEnabled(True)
             self._is_rebuilding = False
+            PROFILER.record("rebuild.total", time.perf_counter() - t_rebuild)
+
+    def _spark_window(self) -> int:
+        return int(WINDOWS.get(self.cmb_spark_window.currentText(), 24 * 3600))
+
+    def _spark_for(self, item_id, points=None):
+        if not item_id:
+            return None
+        return self.history.sparkline(str(item_id), self._spark_window(), points)
 
     def card_clicked(self, payload, mode):
         name = payload.get("name","?")
@@ -590,48 +775,53 @@ QFrame#card[selected=\"true\"]:hover { border: 1px solid #22f0a0; background: rg
 
     # ----- Selected helpers -----
     def _selected_save(self):
+        # bellek içi store'a yazılır; diske debounce edilmiş atomik yazım gider
         try:
-            self._selected_path.parent.mkdir(parents=True, exist_ok=True)
             items = [
-                {"id": i, "name": d.get("name", i), "expected_amount": int(d.get("expected_amount", 1))}
+                {"id": d.get("id", i), "name": d.get("name", i), "expected_amount": int(d.get("expected_amount", 1))}
                 for i,d in sorted(self._selected.items())
             ]
-            payload = {
-                "items": items,
-                "saved_at": int(__import__("time").time())
-            }
-            self._selected_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+            SELECTION.replace(items)
             return True
         except Exception as e:
             self._log_msg(f"Seçimler kaydedilemedi: {e}")
             return False
 
+    def _selected_from_items(self, items: list) -> dict:
+        # anahtar item id; id'siz kayıtlar (FullAuto'nun OCR ile eklediği) normalize isimle ayrışır
+        out = {}
+        for it in items:
+            item_id = str(it.get("id") or "").strip()
+            name = str(it.get("name") or item_id)
+            sid = item_id or f"name:{normalize(name)}"
+            exp = it.get("expected_amount")
+            if exp is None:
+                # compute from current market rows if available
+                r = self._rows_by_id().get(item_id) if item_id else None
+                exp = self._calc_expected_amount(r) if r else 1
+            out[sid] = {"id": item_id, "name": name, "expected_amount": int(exp)}
+        return out
+
     def _selected_load(self):
         try:
-            if not self._selected_path.exists():
-                return
-            data = json.loads(self._selected_path.read_text(encoding="utf-8"))
-            # Backward compatible
-            out = {}
-            if "items" in data:
-                for it in (data.get("items") or []):
-                    sid = str(it.get("id"))
-                    name = str(it.get("name", sid))
-                    exp = it.get("expected_amount")
-                    if exp is None:
-                        # compute from current market rows if available
-                        r = self._rows_by_id().get(sid)
-                        exp = self._calc_expected_amount(r) if r else 1
-                    out[sid] = {"name": name, "expected_amount": int(exp)}
-            elif "ids" in data:
-                for sid in (data.get("ids") or []):
-                    sid = str(sid)
-                    out[sid] = {"name": sid, "expected_amount": 1}
-            self._selected = out
+            self._selected = self._selected_from_items(SELECTION.items())
             self._log_msg(f"Seçimler yüklendi: {len(self._selected)} adet.")
         except Exception as e:
             self._log_msg(f"Seçimler okunamadı: {e}")
 
+    @Slot(list)
+    def _on_selection_changed(self, items: list):
+        """Store başka yerden (FullAuto orange phase vb.) değişti → kartları tazele."""
+        try:
+            new = self._selected_from_items(items)
+        except Exception:
+            return
+        if new == self._selected:
+            return
+        self._selected = new
+        if hasattr(self, "_ui_timer"):
+            self._schedule_rebuild()
+
     def _update_expected_amount(self, sid: str, new_val: int):
         if sid in self._selected:
             self._selected[sid]["expected_amount"] = max(1, int(new_val))
@@ -663,7 +853,7 @@ QFrame#card[selected=\"true\"]:hover { border: 1px solid #22f0a0; background: rg
             # mevcut piyasa verisinden expected_amount öner
             r = self._rows_by_id().get(item_id)
             exp = self._calc_expected_amount(r) if r else 1
-            self._selected[item_id] = {"name": name or item_id, "expected_amount": int(exp)}
+            self._selected[item_id] = {"id": item_id, "name": name or item_id, "expected_amount": int(exp)}
             self._log_msg(f"Seçildi (kaydedildi): {item_id} -> {self._selected[item_id]}")
 
         self._selected_save()
@@ -758,9 +948,22 @@ QFrame#card[selected=\"true\"]:hover { border: 1px solid #22f0a0; background: rg
                             f"  NPC: {npc_p}\n"
                             f"  Saatlik InstaSell/Buy: {hs} / {hb}")
                     row = QHBoxLayout()
+                    left = QVBoxLayout()
                     lbl = QLabel(text)
                     lbl.setWordWrap(True)
-                    row.addWidget(lbl, 1)
+                    left.addWidget(lbl)
+
+                    # fiyat geçmişi (seçili pencere, daha çok nokta)
+                    spark = self._spark_for(sid, points=120)
+                    if spark:
+                        for key, title in (("buy", "Alış"), ("sell", "Satış"), ("margin", "Marj")):
+                            srow = QHBoxLayout()
+                            st = QLabel(title)
+                            st.setFixedWidth(42)
+                            srow.addWidget(st)
+                            srow.addWidget(Sparkline([(spark[key], SPARK_COLORS[key])], height=30), 1)
+                            left.addLayout(srow)
+                    row.addLayout(left, 1)
 
                     # expected_amount düzenleme
                     sub = QVBoxLayout()
@@ -812,10 +1015,24 @@ QFrame#card[selected=\"true\"]:hover { border: 1px solid #22f0a0; background: rg
 
 
 def main():
-    app = QApplication(sys.argv)
+    argv = list(sys.argv)
+    if "--profile" in argv:
+        argv.remove("--profile")
+        PROFILER.enable()
+    # --trace[=yol]: yapılandırılmış adım trace'i (JSONL; .gz ile biterse gzip)
+    trace = next((a for a in argv if a == "--trace" or a.startswith("--trace=")), None)
+    if trace:
+        argv.remove(trace)
+        from app.services.trace import start_trace, stop_trace
+        print(f"trace: {start_trace(trace.partition('=')[2] or None).path}")
+    app = QApplication(argv)
     w = MainWindow()
     w.show()
-    sys.exit(app.exec())
+    code = app.exec()
+    if trace:
+        writer = stop_trace()
+        print(writer.stats() if writer else "trace kapalı")
+    sys.exit(code)
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,6 @@
 from PySide6.QtCore import QObject, Signal, Slot
 from app.bazaar import Bazaar
+from app.snapshot import save_snapshot
 
 class ScanWorker(QObject):
     started = Signal()
@@ -14,6 +15,8 @@ class ScanWorker(QObject):
         try:
             rows = bz.analyze_bazaar()
             self.progress.emit(f"{len(rows)} ürün alındı.")
+            # bir sonraki açılışta warm start için (UI thread'ini bekletmeden)
+            save_snapshot(rows)
             self.finished.emit(rows, True)
         except Exception as e:
             self.progress.emit(f"Hata: {e}")